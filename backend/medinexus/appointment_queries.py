@@ -0,0 +1,93 @@
+from django.db.models import Case, CharField, Q, Value, When
+from django.db.models.functions import Concat
+from django.utils.dateparse import parse_datetime
+
+from .cursors import InvalidCursor, decode_cursor, encode_cursor
+from .models import Appointment, DoctorProfile
+
+# Keyset ordering for appointment history; (date_time, id) is unique and
+# matches the (doctor|patient, date_time, id) indexes on Appointment
+HISTORY_ORDERING = ('date_time', 'id')
+
+def with_display_fields(appointments):
+    """
+    Annotate an appointment queryset with the columns AppointmentSerializer
+    renders, so names and specializations come back in the same query
+    instead of one lookup per row through patient.user / doctor.user
+    """
+    specialization_display = Case(
+        *[
+            When(doctor__specialization=value, then=Value(str(label)))
+            for value, label in DoctorProfile.SPECIALIZATION_CHOICES
+        ],
+        default='doctor__specialization',
+        output_field=CharField(),
+    )
+
+    return appointments.annotate(
+        patient_name=Concat(
+            'patient__user__first_name', Value(' '), 'patient__user__last_name',
+            output_field=CharField(),
+        ),
+        doctor_name=Concat(
+            Value('Dr. '), 'doctor__user__first_name', Value(' '), 'doctor__user__last_name',
+            output_field=CharField(),
+        ),
+        doctor_specialization=specialization_display,
+    )
+
+def appointments_for_doctor(doctor_id):
+    """Appointments of a doctor, ready for serialization"""
+    return with_display_fields(Appointment.objects.filter(doctor_id=doctor_id))
+
+def appointments_for_patient(patient_id):
+    """Appointments of a patient, ready for serialization"""
+    return with_display_fields(Appointment.objects.filter(patient_id=patient_id))
+
+def overlapping_appointments(doctor_id, start, end, exclude_id=None):
+    """
+    Blocking appointments of a doctor that overlap the [start, end) window
+    """
+    appointments = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        status__in=Appointment.BLOCKING_STATUSES,
+        date_time__lt=end,
+        end_time__gt=start
+    )
+    if exclude_id is not None:
+        appointments = appointments.exclude(id=exclude_id)
+    return appointments
+
+def page_after(appointments, cursor, limit):
+    """
+    Return one keyset page of an appointment queryset
+
+    Args:
+        appointments: Appointment queryset (unordered)
+        cursor (str): Opaque cursor from a previous page, or None
+        limit (int): Page size
+
+    Returns:
+        tuple: (list of appointments, next cursor or None)
+    """
+    appointments = appointments.order_by(*HISTORY_ORDERING)
+
+    if cursor:
+        date_time, appointment_id = decode_cursor(cursor, 2)
+        date_time = parse_datetime(date_time) if isinstance(date_time, str) else None
+        if date_time is None or not isinstance(appointment_id, int):
+            raise InvalidCursor(cursor)
+        appointments = appointments.filter(
+            Q(date_time__gt=date_time) |
+            Q(date_time=date_time, id__gt=appointment_id)
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(appointments[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.date_time.isoformat(), last.id)
+
+    return rows, next_cursor
@@ -2,11 +2,28 @@ from rest_framework import status, serializers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q
 from datetime import datetime, timedelta
+import json
 
 from .models import Appointment, DoctorProfile, PatientProfile, DoctorAvailability
+from .appointment_queries import (
+    HISTORY_ORDERING, appointments_for_doctor, appointments_for_patient,
+    overlapping_appointments, page_after
+)
+from .cursors import InvalidCursor
+from .languages import language_code
+from .roles import request_role
+from . import search, slots, thumbnails
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_CHUNK_SIZE = 500
 
 class AppointmentSerializer(serializers.ModelSerializer):
     patient_name = serializers.SerializerMethodField()
@@ -22,13 +39,21 @@ class AppointmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'video_call_id']
     
+    # Querysets built by appointment_queries carry these as annotated columns;
+    # the relation walk is only the fallback for freshly saved instances
     def get_patient_name(self, obj):
+        if hasattr(obj, 'patient_name'):
+            return obj.patient_name
         return f"{obj.patient.user.first_name} {obj.patient.user.last_name}"
     
     def get_doctor_name(self, obj):
+        if hasattr(obj, 'doctor_name'):
+            return obj.doctor_name
         return f"Dr. {obj.doctor.user.first_name} {obj.doctor.user.last_name}"
     
     def get_doctor_specialization(self, obj):
+        if hasattr(obj, 'doctor_specialization'):
+            return obj.doctor_specialization
         return obj.doctor.get_specialization_display()
 
 @api_view(['GET'])
@@ -36,20 +61,25 @@ class AppointmentSerializer(serializers.ModelSerializer):
 def list_appointments(request):
     """
     List appointments for the current user based on their role
+
+    Results are keyset-paginated on (date_time, id): pass the returned
+    next_cursor back as ?cursor= to get the following page. With
+    ?stream=ndjson the full history is streamed one JSON object per line
+    from a server-side cursor instead.
     """
-    user = request.user
+    role = request_role(request)
     
     # Filter parameters
     status_filter = request.query_params.get('status')
     date_from = request.query_params.get('date_from')
     date_to = request.query_params.get('date_to')
     
-    if hasattr(user, 'doctor_profile'):
+    if role.is_doctor:
         # Doctor's appointments
-        appointments = Appointment.objects.filter(doctor=user.doctor_profile)
-    elif hasattr(user, 'patient_profile'):
+        appointments = appointments_for_doctor(role.doctor.id)
+    elif role.is_patient:
         # Patient's appointments
-        appointments = Appointment.objects.filter(patient=user.patient_profile)
+        appointments = appointments_for_patient(role.patient.id)
     else:
         return Response(
             {'error': _('User is neither a doctor nor a patient')},
@@ -75,11 +105,39 @@ def list_appointments(request):
         except ValueError:
             pass
     
-    # Order by date_time
-    appointments = appointments.order_by('date_time')
+    if request.query_params.get('stream') == 'ndjson':
+        return StreamingHttpResponse(
+            _stream_appointments(appointments.order_by(*HISTORY_ORDERING)),
+            content_type='application/x-ndjson'
+        )
     
-    serializer = AppointmentSerializer(appointments, many=True)
-    return Response(serializer.data)
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    try:
+        page, next_cursor = page_after(appointments, request.query_params.get('cursor'), limit)
+    except InvalidCursor:
+        return Response(
+            {'error': _('Invalid cursor')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = AppointmentSerializer(page, many=True)
+    return Response({
+        'results': serializer.data,
+        'next_cursor': next_cursor
+    })
+
+def _stream_appointments(appointments):
+    """
+    Yield appointments as NDJSON lines without materializing the queryset
+    """
+    for appointment in appointments.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        data = AppointmentSerializer(appointment).data
+        yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -87,9 +145,9 @@ def create_appointment(request):
     """
     Create a new appointment request
     """
-    user = request.user
+    role = request_role(request)
     
-    if not hasattr(user, 'patient_profile'):
+    if not role.is_patient:
         return Response(
             {'error': _('Only patients can request appointments')},
             status=status.HTTP_403_FORBIDDEN
@@ -107,7 +165,7 @@ def create_appointment(request):
     
     # Create appointment data
     appointment_data = {
-        'patient': user.patient_profile.id,
+        'patient': role.patient.id,
         'doctor': doctor.id,
         'date_time': request.data.get('date_time'),
         'appointment_type': request.data.get('appointment_type', 'video'),
@@ -115,10 +173,12 @@ def create_appointment(request):
         'status': 'requested'
     }
     
-    # Calculate end time (default to 30 minutes)
+    # Calculate end time (one slot, 30 minutes by default)
     try:
         date_time = datetime.fromisoformat(request.data.get('date_time').replace('Z', '+00:00'))
-        end_time = date_time + timedelta(minutes=30)
+        if timezone.is_naive(date_time):
+            date_time = timezone.make_aware(date_time)
+        end_time = date_time + slots.slot_length()
         appointment_data['end_time'] = end_time.isoformat()
     except (ValueError, AttributeError):
         return Response(
@@ -126,16 +186,50 @@ def create_appointment(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Validate and save
+    # Validate
     serializer = AppointmentSerializer(data=appointment_data)
-    if serializer.is_valid():
-        serializer.save()
-        
-        # TODO: Send notification to doctor
-        
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Reserve the slot atomically. Locking the doctor's row serializes
+    # bookings for that doctor only; bookings for other doctors proceed in
+    # parallel. The exclusion constraint on Appointment backs this up at
+    # the database level. Alternatives for a lost race are only looked up
+    # once the lock is released.
+    try:
+        with transaction.atomic():
+            DoctorProfile.objects.select_for_update().get(id=doctor.id)
+            slot_taken = overlapping_appointments(doctor.id, date_time, end_time).exists()
+            if not slot_taken:
+                serializer.save()
+    except IntegrityError:
+        slot_taken = True
+    
+    if slot_taken:
+        return _slot_taken_response(doctor.id, date_time)
+    
+    # TODO: Send notification to doctor
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+def _slot_taken_response(doctor_id, date_time):
+    """
+    Build the 409 returned when a booking loses the race for a slot
+    """
+    alternatives = []
+    for start, end in slots.free_slots(doctor_id, start=max(date_time, timezone.now()), limit=3):
+        alternatives.append({
+            'start_datetime': start.isoformat(),
+            'end_datetime': end.isoformat()
+        })
+    
+    return Response(
+        {
+            'error': _('This time slot is no longer available'),
+            'alternatives': alternatives
+        },
+        status=status.HTTP_409_CONFLICT
+    )
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -143,14 +237,14 @@ def get_appointment(request, appointment_id):
     """
     Get appointment details
     """
-    user = request.user
+    role = request_role(request)
     
     try:
         # Check if user has access to this appointment
-        if hasattr(user, 'doctor_profile'):
-            appointment = Appointment.objects.get(id=appointment_id, doctor=user.doctor_profile)
-        elif hasattr(user, 'patient_profile'):
-            appointment = Appointment.objects.get(id=appointment_id, patient=user.patient_profile)
+        if role.is_doctor:
+            appointment = appointments_for_doctor(role.doctor.id).get(id=appointment_id)
+        elif role.is_patient:
+            appointment = appointments_for_patient(role.patient.id).get(id=appointment_id)
         else:
             return Response(
                 {'error': _('User is neither a doctor nor a patient')},
@@ -171,7 +265,7 @@ def update_appointment_status(request, appointment_id):
     """
     Update appointment status
     """
-    user = request.user
+    role = request_role(request)
     new_status = request.data.get('status')
     
     if not new_status:
@@ -182,16 +276,16 @@ def update_appointment_status(request, appointment_id):
     
     try:
         # Check if user has access to this appointment
-        if hasattr(user, 'doctor_profile'):
-            appointment = Appointment.objects.get(id=appointment_id, doctor=user.doctor_profile)
+        if role.is_doctor:
+            appointment = Appointment.objects.get(id=appointment_id, doctor=role.doctor)
             # Doctors can update to any status
             valid_transitions = {
                 'requested': ['scheduled', 'cancelled'],
                 'scheduled': ['in_progress', 'cancelled', 'no_show'],
                 'in_progress': ['completed', 'cancelled']
             }
-        elif hasattr(user, 'patient_profile'):
-            appointment = Appointment.objects.get(id=appointment_id, patient=user.patient_profile)
+        elif role.is_patient:
+            appointment = Appointment.objects.get(id=appointment_id, patient=role.patient)
             # Patients can only cancel appointments
             valid_transitions = {
                 'requested': ['cancelled'],
@@ -231,42 +325,45 @@ def get_doctor_availability(request, doctor_id):
     Get doctor's availability
     """
     try:
-        doctor = DoctorProfile.objects.get(id=doctor_id)
+        doctor = DoctorProfile.objects.select_related('user').get(id=doctor_id)
     except DoctorProfile.DoesNotExist:
         return Response(
             {'error': _('Doctor not found')},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get doctor's availability
-    availability = DoctorAvailability.objects.filter(doctor=doctor, is_available=True)
+    # Weekly templates, booked intervals and free slots come from the
+    # per-doctor slot cache instead of fresh queries on every page view
+    schedule = slots.doctor_schedule(doctor.id)
+    day_names = dict(DoctorAvailability.DAY_CHOICES)
     
     # Format response
     availability_data = []
-    for slot in availability:
+    for day_of_week, start_time, end_time in schedule['windows']:
         availability_data.append({
-            'day_of_week': slot.day_of_week,
-            'day_name': slot.get_day_of_week_display(),
-            'start_time': slot.start_time.strftime('%H:%M'),
-            'end_time': slot.end_time.strftime('%H:%M')
+            'day_of_week': day_of_week,
+            'day_name': day_names[day_of_week],
+            'start_time': start_time.strftime('%H:%M'),
+            'end_time': end_time.strftime('%H:%M')
         })
     
-    # Get doctor's booked appointments for the next 7 days
-    today = datetime.now().date()
-    next_week = today + timedelta(days=7)
-    
-    booked_slots = Appointment.objects.filter(
-        doctor=doctor,
-        date_time__date__gte=today,
-        date_time__date__lt=next_week,
-        status__in=['scheduled', 'in_progress']
-    ).values('date_time', 'end_time')
+    # Booked appointments and free slots for the next 7 days
+    now = timezone.now()
+    next_week = now + timedelta(days=7)
     
     booked_data = []
-    for slot in booked_slots:
-        booked_data.append({
-            'start_datetime': slot['date_time'].isoformat(),
-            'end_datetime': slot['end_time'].isoformat() if slot['end_time'] else None
+    for start, end in schedule['booked']:
+        if end > now and start < next_week:
+            booked_data.append({
+                'start_datetime': start.isoformat(),
+                'end_datetime': end.isoformat()
+            })
+    
+    available_data = []
+    for start, end in slots.free_slots(doctor.id, start=now, end=next_week):
+        available_data.append({
+            'start_datetime': start.isoformat(),
+            'end_datetime': end.isoformat()
         })
     
     return Response({
@@ -274,45 +371,107 @@ def get_doctor_availability(request, doctor_id):
         'doctor_name': f"Dr. {doctor.user.first_name} {doctor.user.last_name}",
         'specialization': doctor.get_specialization_display(),
         'weekly_availability': availability_data,
-        'booked_slots': booked_data
+        'booked_slots': booked_data,
+        'available_slots': available_data
     })
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def next_available_slots(request):
+    """
+    Get the next free slots across all doctors of a specialization
+    """
+    specialization = request.query_params.get('specialization', '')
+    if specialization not in dict(DoctorProfile.SPECIALIZATION_CHOICES):
+        return Response(
+            {'error': _('Invalid specialization')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        count = max(1, min(int(request.query_params.get('count', 10)), 100))
+    except ValueError:
+        count = 10
+    
+    after = request.query_params.get('after')
+    if after:
+        after = parse_datetime(after)
+        if after is None:
+            return Response(
+                {'error': _('Invalid after format')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(after):
+            after = timezone.make_aware(after)
+    
+    slots_data = []
+    for start, end, doctor_id in slots.next_free_slots(specialization, count, after):
+        slots_data.append({
+            'doctor_id': doctor_id,
+            'start_datetime': start.isoformat(),
+            'end_datetime': end.isoformat()
+        })
+    
+    return Response(slots_data)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_doctors(request):
     """
     Search for doctors based on name, specialization, or languages
+
+    The free-text query is matched against the doctor search index (name,
+    bio, specialization and languages, with Hindi/Punjabi transliterated)
+    and results are ranked. Use ?page= and ?page_size= to paginate.
     """
     query = request.query_params.get('query', '')
     specialization = request.query_params.get('specialization', '')
     language = request.query_params.get('language', '')
     
-    doctors = DoctorProfile.objects.all()
-    
-    # Apply filters
-    if query:
-        doctors = doctors.filter(
-            Q(user__first_name__icontains=query) | 
-            Q(user__last_name__icontains=query)
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+        page_size = max(1, min(int(request.query_params.get('page_size', 20)), 100))
+    except ValueError:
+        return Response(
+            {'error': _('Invalid page or page_size')},
+            status=status.HTTP_400_BAD_REQUEST
         )
     
+    doctors = DoctorProfile.objects.select_related('user')
+    
+    # Apply filters
     if specialization:
         doctors = doctors.filter(specialization=specialization)
     
     if language:
-        doctors = doctors.filter(languages_spoken__icontains=language)
+        # Exact match on the GIN-indexed language codes
+        code = language_code(language)
+        if code:
+            doctors = doctors.filter(languages__contains=[code])
+    
+    doctors = search.search(query, doctors)
+    
+    # Fetch one extra row to learn whether another page exists
+    offset = (page - 1) * page_size
+    page_doctors = list(doctors[offset:offset + page_size + 1])
+    has_next = len(page_doctors) > page_size
     
     # Format response
     doctors_data = []
-    for doctor in doctors:
+    for doctor in page_doctors[:page_size]:
         doctors_data.append({
             'id': doctor.id,
             'name': f"Dr. {doctor.user.first_name} {doctor.user.last_name}",
             'specialization': doctor.get_specialization_display(),
             'experience_years': doctor.experience_years,
             'languages_spoken': doctor.languages_spoken,
+            'languages': doctor.languages,
             'consultation_fee': str(doctor.consultation_fee),
-            'profile_picture': doctor.profile_picture.url if doctor.profile_picture else None
+            'profile_picture': thumbnails.thumbnail_url(doctor, size='small')
         })
     
-    return Response(doctors_data)
\ No newline at end of file
+    return Response({
+        'results': doctors_data,
+        'page': page,
+        'has_next': has_next
+    })
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+class MedinexusConfig(AppConfig):
+    name = 'medinexus'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
+        from . import checks  # noqa: F401
+
+        # Dedicated chatbot workers warm the model instead of loading it on
+        # the first request
+        from django.conf import settings
+        if settings.CHATBOT_PRELOAD:
+            from . import chatbot
+            chatbot.warm_up()
@@ -1,21 +1,41 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework import authentication, exceptions
 from rest_framework_simplejwt.tokens import RefreshToken
 import jwt
 
+from .roles import resolve_role
+
 User = get_user_model()
 
-def generate_tokens_for_user(user):
+# Authenticated users and their roles are cached in the shared cache, keyed
+# by user id. Entries are dropped from signals once a change to the user or
+# their profiles commits; the TTL bounds staleness if an invalidation is lost.
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TTL', 300)
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+def generate_tokens_for_user(user, role=None):
     """
-    Generate JWT tokens for a user
+    Generate JWT tokens for a user, embedding their role and profile id
     """
+    role = role or resolve_role(user)
     refresh = RefreshToken.for_user(user)
+    refresh['role'] = role.kind
+    refresh['profile_id'] = role.profile_id
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
     }
 
+def invalidate_cached_user(user_id):
+    """
+    Drop a user from the authentication cache
+    """
+    cache.delete(_user_key(user_id))
+
 class JWTAuthentication(authentication.BaseAuthentication):
     """
     Custom JWT authentication for the API
@@ -28,22 +48,88 @@ class JWTAuthentication(authentication.BaseAuthentication):
         try:
             # Get the token
             token = auth_header.split(' ')[1]
+        except IndexError:
+            raise exceptions.AuthenticationFailed('Invalid token. Please log in again.')
+
+        user, role = self.authenticate_credentials(token)
+
+        # Resolve the role once; views read it through roles.request_role()
+        request.role = role
+
+        return (user, token)
+
+    def authenticate_token(self, token):
+        """
+        Validate a raw JWT and return its active user
+
+        Also used outside DRF, e.g. to authenticate WebSocket connections.
+        """
+        return self.authenticate_credentials(token)[0]
+
+    def authenticate_credentials(self, token):
+        """
+        Validate a raw JWT
+
+        Returns:
+            tuple: The active user and their UserRole
+        """
+        try:
             payload = jwt.decode(
-                token, 
-                settings.SECRET_KEY, 
+                token,
+                settings.SECRET_KEY,
                 algorithms=['HS256']
             )
         except jwt.ExpiredSignatureError:
             raise exceptions.AuthenticationFailed('Token expired. Please log in again.')
-        except (jwt.DecodeError, IndexError):
+        except jwt.InvalidTokenError:
             raise exceptions.AuthenticationFailed('Invalid token. Please log in again.')
 
-        try:
-            user = User.objects.get(id=payload['user_id'])
-        except User.DoesNotExist:
-            raise exceptions.AuthenticationFailed('User not found')
+        user, role = self.get_user_and_role(payload)
 
         if not user.is_active:
             raise exceptions.AuthenticationFailed('User inactive or deleted')
 
-        return (user, token)
\ No newline at end of file
+        return user, role
+
+    def get_user_and_role(self, payload):
+        user = self.get_user(payload)
+        return user, resolve_role(user)
+
+    def get_user(self, payload):
+        try:
+            return User.objects.select_related('doctor_profile', 'patient_profile').get(id=payload['user_id'])
+        except (User.DoesNotExist, KeyError):
+            raise exceptions.AuthenticationFailed('User not found')
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves users and roles from the shared cache
+
+    On a cache miss the user is loaded together with their doctor/patient
+    profile in one query and cached with their resolved role, so a warm
+    request does no auth-related queries and no role resolution. Tokens
+    whose role claim no longer matches the user's profile are rejected.
+
+    The cache is the shared Django cache rather than a per-process one, so
+    that deactivations and role changes are seen by every worker at once;
+    benchmark_auth measures the per-request saving.
+    """
+    def get_user_and_role(self, payload):
+        if payload.get('token_type', 'access') != 'access':
+            raise exceptions.AuthenticationFailed('Invalid token. Please log in again.')
+
+        user_id = payload.get('user_id')
+        entry = cache.get(_user_key(user_id))
+        if entry is None:
+            try:
+                user = User.objects.select_related('doctor_profile', 'patient_profile').get(id=user_id)
+            except User.DoesNotExist:
+                raise exceptions.AuthenticationFailed('User not found')
+            entry = (user, resolve_role(user))
+            cache.set(_user_key(user_id), entry, USER_CACHE_TIMEOUT)
+
+        user, role = entry
+        if 'role' in payload and payload['role'] != role.kind:
+            raise exceptions.AuthenticationFailed('Token is out of date. Please log in again.')
+
+        return user, role
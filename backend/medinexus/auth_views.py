@@ -7,7 +7,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .auth import generate_tokens_for_user
+from .roles import request_role, resolve_role
 from .models import PatientProfile, DoctorProfile
+from .thumbnails import thumbnail_url
 
 class UserSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
@@ -63,7 +65,9 @@ def login_view(request):
             status=status.HTTP_401_UNAUTHORIZED
         )
     
-    tokens = generate_tokens_for_user(user)
+    # Load both profiles with one joined query
+    role = resolve_role(user)
+    tokens = generate_tokens_for_user(user, role)
     
     # Get user profile data
     user_data = {
@@ -72,27 +76,30 @@ def login_view(request):
         'email': user.email,
         'first_name': user.first_name,
         'last_name': user.last_name,
-        'is_doctor': hasattr(user, 'doctor_profile'),
-        'is_patient': hasattr(user, 'patient_profile')
+        'is_doctor': role.is_doctor,
+        'is_patient': role.is_patient
     }
     
     # Add profile-specific data
-    if hasattr(user, 'doctor_profile'):
-        doctor = user.doctor_profile
+    if role.is_doctor:
+        doctor = role.doctor
         user_data['profile'] = {
             'specialization': doctor.specialization,
             'experience_years': doctor.experience_years,
             'phone_number': doctor.phone_number,
             'bio': doctor.bio,
             'languages_spoken': doctor.languages_spoken,
-            'profile_picture': doctor.profile_picture.url if doctor.profile_picture else None
+            'languages': doctor.languages,
+            'profile_picture': thumbnail_url(doctor, size='medium'),
+            'profile_picture_original': doctor.profile_picture.url if doctor.profile_picture else None
         }
-    elif hasattr(user, 'patient_profile'):
-        patient = user.patient_profile
+    elif role.is_patient:
+        patient = role.patient
         user_data['profile'] = {
             'phone_number': patient.phone_number,
             'preferred_language': patient.preferred_language,
-            'profile_picture': patient.profile_picture.url if patient.profile_picture else None
+            'profile_picture': thumbnail_url(patient, size='medium'),
+            'profile_picture_original': patient.profile_picture.url if patient.profile_picture else None
         }
     
     return Response({
@@ -197,19 +204,20 @@ def user_profile_view(request):
     Get the current user's profile
     """
     user = request.user
+    role = request_role(request)
     user_data = {
         'id': user.id,
         'username': user.username,
         'email': user.email,
         'first_name': user.first_name,
         'last_name': user.last_name,
-        'is_doctor': hasattr(user, 'doctor_profile'),
-        'is_patient': hasattr(user, 'patient_profile')
+        'is_doctor': role.is_doctor,
+        'is_patient': role.is_patient
     }
     
     # Add profile-specific data
-    if hasattr(user, 'doctor_profile'):
-        doctor = user.doctor_profile
+    if role.is_doctor:
+        doctor = role.doctor
         user_data['profile'] = {
             'specialization': doctor.specialization,
             'license_number': doctor.license_number,
@@ -218,10 +226,12 @@ def user_profile_view(request):
             'bio': doctor.bio,
             'consultation_fee': str(doctor.consultation_fee),
             'languages_spoken': doctor.languages_spoken,
-            'profile_picture': doctor.profile_picture.url if doctor.profile_picture else None
+            'languages': doctor.languages,
+            'profile_picture': thumbnail_url(doctor, size='medium'),
+            'profile_picture_original': doctor.profile_picture.url if doctor.profile_picture else None
         }
-    elif hasattr(user, 'patient_profile'):
-        patient = user.patient_profile
+    elif role.is_patient:
+        patient = role.patient
         user_data['profile'] = {
             'phone_number': patient.phone_number,
             'address': patient.address,
@@ -229,7 +239,8 @@ def user_profile_view(request):
             'preferred_language': patient.preferred_language,
             'emergency_contact_name': patient.emergency_contact_name,
             'emergency_contact_number': patient.emergency_contact_number,
-            'profile_picture': patient.profile_picture.url if patient.profile_picture else None
+            'profile_picture': thumbnail_url(patient, size='medium'),
+            'profile_picture_original': patient.profile_picture.url if patient.profile_picture else None
         }
     
     return Response(user_data, status=status.HTTP_201_CREATED)
\ No newline at end of file
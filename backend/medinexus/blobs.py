@@ -0,0 +1,164 @@
+"""
+Content-addressed, deduplicated file storage
+
+Files are stored once under blobs/<sha256><extension> through the record
+storage backend and shared by reference: each record (or any other owner)
+that uses a blob holds one reference in StoredBlob.ref_count. Blobs whose last
+reference was dropped more than BLOB_GC_GRACE_HOURS ago are removed by the
+collect_blobs management command.
+"""
+
+import logging
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import StoredBlob
+from .record_storage import get_record_storage
+
+logger = logging.getLogger(__name__)
+
+def blob_name(digest, filename=''):
+    """
+    Storage name for content, keeping the upload's extension so the file
+    type can still be told from the name (e.g. by thumbnails.is_image)
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+        extension = ''
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+def _take_reference(blob):
+    StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+    blob.refresh_from_db(fields=['ref_count', 'updated_at'])
+    return blob
+
+def store_file(path, digest, size, content_type='', filename=''):
+    """
+    Store a local file under its digest and take a reference to it
+
+    Must not run inside a transaction: the file is written before its row
+    is committed, so no blob row ever points at a file that is not there,
+    and no transaction is held open while the file is written. If the
+    content is already stored, the local file is deleted instead and the
+    blob keeps the name it was first stored under.
+
+    Returns:
+        StoredBlob: The blob holding the content
+    """
+    storage = get_record_storage()
+
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(sha256=digest).first()
+        if blob is not None:
+            revived = blob.ref_count == 0
+            _take_reference(blob)
+
+    if blob is not None:
+        if not revived:
+            os.remove(path)
+            return blob
+        # The reference keeps the garbage collector away; rewrite the file
+        # in case a collection deleted it but failed to delete the row
+        try:
+            storage.save(blob.storage_name, path, content_type=blob.content_type or None)
+        except Exception:
+            release(blob.pk)
+            raise
+        return blob
+
+    # Same content, same name: a concurrent upload of this file writes
+    # identical bytes to the same place
+    name = storage.save(blob_name(digest, filename), path, content_type=content_type or None)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                return StoredBlob.objects.create(
+                    sha256=digest, size=size, storage_name=name, content_type=content_type, ref_count=1
+                )
+        except IntegrityError:
+            blob = StoredBlob.objects.select_for_update().get(sha256=digest)
+            return _take_reference(blob)
+
+def acquire_known(patient, digest, size):
+    """
+    Take a reference to content the patient has uploaded before, so a
+    re-upload completes without sending the file
+
+    Only the patient's own records are considered: a digest alone must not
+    grant access to another patient's file.
+
+    Returns:
+        StoredBlob: The blob, or None if the patient has no such file
+    """
+    with transaction.atomic():
+        blob = (
+            StoredBlob.objects.select_for_update(of=('self',))
+            .filter(sha256=digest.lower(), size=size, records__patient=patient)
+            .first()
+        )
+        if blob is None:
+            return None
+        return _take_reference(blob)
+
+def release(blob_id):
+    """
+    Drop one reference to a blob
+    """
+    StoredBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, updated_at=timezone.now()
+    )
+
+def recount():
+    """
+    Reset every ref_count to the number of records using the blob
+
+    Returns:
+        int: Number of blobs whose count was corrected
+    """
+    fixed = 0
+    for blob in StoredBlob.objects.annotate(actual=Count('records')).exclude(ref_count=F('actual')).iterator():
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=blob.actual, updated_at=timezone.now())
+        fixed += 1
+    return fixed
+
+def collect_garbage(grace_hours=None, now=None):
+    """
+    Delete unreferenced blobs and their files
+
+    Each blob's file is deleted while its row is locked and before the row
+    is, so an upload of the same content either waits for the collection
+    and stores the file again, or takes a reference first and the blob is
+    skipped.
+
+    Returns:
+        int: Number of blobs deleted
+    """
+    grace = timedelta(hours=settings.BLOB_GC_GRACE_HOURS if grace_hours is None else grace_hours)
+    cutoff = (now or timezone.now()) - grace
+    storage = get_record_storage()
+
+    deleted = 0
+    candidates = StoredBlob.objects.filter(ref_count=0, updated_at__lte=cutoff).values_list('pk', flat=True)
+    for blob_id in list(candidates):
+        with transaction.atomic():
+            # Re-check under the lock; an upload may have taken a reference
+            blob = (
+                StoredBlob.objects.select_for_update(skip_locked=True)
+                .filter(pk=blob_id, ref_count=0, updated_at__lte=cutoff)
+                .first()
+            )
+            if blob is None:
+                continue
+            if blob.records.exists():
+                logger.warning("Blob %s has ref_count 0 but is still used; run with --recount", blob.sha256)
+                continue
+            storage.delete(blob.storage_name)
+            blob.delete()
+            deleted += 1
+    return deleted
@@ -0,0 +1,204 @@
+"""
+Chatbot inference service
+
+The ML stack (transformers and its TensorFlow backend) is imported the first
+time a reply is needed, never when this module is imported, so Django workers
+that only serve appointments boot without it. Each process holds at most one
+warm model, shared by every request it serves.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .languages import LANGUAGE_NAMES
+from .transliteration import transliterate
+
+logger = logging.getLogger(__name__)
+
+# Modules that must not be imported while Django starts up
+# (see the check_import_budget management command)
+HEAVY_MODULES = ('tensorflow', 'transformers', 'torch')
+
+PROMPT_TEMPLATE = (
+    "You are a symptom screening assistant for a telemedicine service. "
+    "Ask about symptoms, suggest whether the patient should book a doctor, "
+    "and tell them to seek emergency care for severe symptoms. "
+    "Do not diagnose. Answer briefly in {language}.\n"
+    "{context}"
+    "Patient: {message}\n"
+    "Assistant:"
+)
+
+# A failed load is not retried on every batch: the next attempt waits
+# CHATBOT_LOAD_RETRY_SECONDS, doubling after each further failure up to
+# MAX_LOAD_RETRY_SECONDS
+MAX_LOAD_RETRY_SECONDS = 15 * 60
+
+_model = None
+_model_lock = threading.Lock()
+# (error message, monotonic time of the next attempt, current delay)
+_load_failure = None
+
+class ChatbotUnavailable(Exception):
+    """The model could not be loaded in this process"""
+
+class ChatbotModel:
+    """
+    A loaded sequence-to-sequence model, decoded greedily one step at a time
+
+    Args:
+        model_name (str): Hugging Face model id or local path
+            (default: CHATBOT_MODEL)
+        max_new_tokens (int): Reply length limit
+    """
+    def __init__(self, model_name=None, max_new_tokens=None):
+        # Imported here so that importing this module stays cheap
+        from transformers import AutoTokenizer, TFAutoModelForSeq2SeqLM
+
+        self.model_name = model_name or settings.CHATBOT_MODEL
+        self.max_new_tokens = max_new_tokens or settings.CHATBOT_MAX_NEW_TOKENS
+
+        started = time.perf_counter()
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = TFAutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Loaded chatbot model %s in %.1fs", self.model_name, self.load_seconds)
+
+    def generate(self, prompts):
+        """
+        Generate one reply per prompt in a single batch
+
+        Returns:
+            list: Reply texts, in prompt order
+        """
+        prompts = list(prompts)
+        replies = [''] * len(prompts)
+        for deltas in self.generate_stream(prompts):
+            replies = [reply + delta for reply, delta in zip(replies, deltas)]
+        return [reply.strip() for reply in replies]
+
+    def generate_stream(self, prompts):
+        """
+        Decode a batch of prompts together, one token per step
+
+        The encoder runs once per batch and the decoder reuses its cached
+        keys and values, so each step costs one decoder pass for the whole
+        batch. Sequences that finish early are fed padding until the
+        longest one is done.
+
+        Yields:
+            list: The text each prompt gained in this step ('' when none),
+                in prompt order
+        """
+        import tensorflow as tf
+
+        prompts = list(prompts)
+        inputs = self.tokenizer(prompts, return_tensors='tf', padding=True, truncation=True)
+        encoder_outputs = self.model.get_encoder()(
+            input_ids=inputs['input_ids'], attention_mask=inputs['attention_mask']
+        )
+        config = self.model.config
+        next_ids = tf.fill([len(prompts), 1], config.decoder_start_token_id)
+        past_key_values = None
+
+        token_ids = [[] for _ in prompts]
+        emitted = [''] * len(prompts)
+        finished = [False] * len(prompts)
+
+        def delta(index, final=False):
+            text = self.tokenizer.decode(token_ids[index], skip_special_tokens=True)
+            # Hold text back while a partial character would still change
+            # what was already emitted
+            if not text.startswith(emitted[index]) or (text.endswith('\ufffd') and not final):
+                return ''
+            new_text = text[len(emitted[index]):]
+            emitted[index] = text
+            return new_text
+
+        for _ in range(self.max_new_tokens):
+            outputs = self.model(
+                input_ids=None,
+                encoder_outputs=encoder_outputs,
+                attention_mask=inputs['attention_mask'],
+                decoder_input_ids=next_ids,
+                past_key_values=past_key_values,
+                use_cache=True
+            )
+            past_key_values = outputs.past_key_values
+            chosen = tf.argmax(outputs.logits[:, -1, :], axis=-1, output_type=tf.int32).numpy()
+
+            deltas = []
+            for index, token_id in enumerate(chosen):
+                if finished[index]:
+                    chosen[index] = config.pad_token_id
+                    deltas.append('')
+                elif token_id == config.eos_token_id:
+                    finished[index] = True
+                    chosen[index] = config.pad_token_id
+                    deltas.append(delta(index, final=True))
+                else:
+                    token_ids[index].append(int(token_id))
+                    deltas.append(delta(index))
+            yield deltas
+
+            if all(finished):
+                return
+            next_ids = tf.constant(chosen[:, None], dtype=tf.int32)
+
+        # Replies cut off at max_new_tokens
+        yield [delta(index, final=True) if not finished[index] else '' for index in range(len(prompts))]
+
+def get_model():
+    """
+    Get this process's model, loading it on first use
+
+    After a failed load, calls fail fast until the retry delay has passed.
+
+    Raises:
+        ChatbotUnavailable: If the ML stack or the model cannot be loaded
+    """
+    global _model, _load_failure
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if _load_failure is not None and time.monotonic() < _load_failure[1]:
+                    raise ChatbotUnavailable(_load_failure[0])
+                try:
+                    _model = ChatbotModel()
+                except (ImportError, OSError) as e:
+                    delay = settings.CHATBOT_LOAD_RETRY_SECONDS
+                    if _load_failure is not None:
+                        delay = min(_load_failure[2] * 2, MAX_LOAD_RETRY_SECONDS)
+                    _load_failure = (str(e), time.monotonic() + delay, delay)
+                    logger.exception("Could not load chatbot model; retrying in %ss", delay)
+                    raise ChatbotUnavailable(str(e)) from e
+                _load_failure = None
+    return _model
+
+def is_loaded():
+    return _model is not None
+
+def warm_up():
+    """Load the model in a background thread so the first reply is fast"""
+    thread = threading.Thread(target=get_model, name='chatbot-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def build_prompt(message, language='en', context=''):
+    """
+    Build the model prompt for one patient message
+
+    Native-script Hindi and Punjabi is romanized, since the model is
+    trained on Latin-script text.
+
+    Args:
+        context (str): Earlier conversation, one line per entry
+    """
+    return PROMPT_TEMPLATE.format(
+        language=LANGUAGE_NAMES.get(language, 'English'),
+        context=transliterate(context),
+        message=transliterate(message.strip())
+    )
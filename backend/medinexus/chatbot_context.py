@@ -0,0 +1,141 @@
+"""
+Bounded conversation context for the chatbot
+
+Each prompt carries a rolling summary (key symptom words from messages that
+have left the window) plus the last CHATBOT_CONTEXT_MESSAGES messages, each
+cut to CHATBOT_CONTEXT_MESSAGE_CHARS, so the prompt, and with it the cost of
+a turn, stays the same size however long the conversation runs.
+
+Contexts are cached per conversation. On a miss they are rebuilt from
+ChatbotConversation.context_summary and one query for the newest messages
+on the (conversation, timestamp) index. Every turn bumps
+ChatbotConversation.last_updated, which tells other worker processes that
+their cached copy is stale.
+"""
+
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import TTLCache
+from .inference import canonical_words
+from .models import ChatbotConversation, ChatbotMessage
+
+SPEAKERS = {'user': 'Patient', 'bot': 'Assistant', 'system': 'System'}
+
+# Per-process contexts keyed by conversation pk
+context_cache = TTLCache(
+    maxsize=getattr(settings, 'CHATBOT_CONTEXT_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'CHATBOT_CONTEXT_CACHE_TTL', 30 * 60)
+)
+
+class ConversationContext:
+    """
+    Rolling summary plus the most recent messages of one conversation
+
+    Args:
+        summary (str): Key words from messages older than the window
+        messages: (message_type, content) pairs, oldest first
+        version: ChatbotConversation.last_updated this context matches
+    """
+    def __init__(self, summary='', messages=(), version=None):
+        self.window = settings.CHATBOT_CONTEXT_MESSAGES
+        self.max_chars = settings.CHATBOT_CONTEXT_MESSAGE_CHARS
+        self.summary_words = settings.CHATBOT_SUMMARY_WORDS
+        self.summary = summary
+        self.version = version
+        self.messages = deque(self._entry(message_type, content) for message_type, content in messages)
+        self._lock = threading.Lock()
+
+    def _entry(self, message_type, content):
+        # Patient words are taken from the full text, before it is cut
+        words = canonical_words(content) if message_type == 'user' else []
+        return message_type, self._compact(content), words
+
+    def _compact(self, content):
+        content = ' '.join(content.split())
+        if len(content) <= self.max_chars:
+            return content
+        return content[:self.max_chars - 1] + '…'
+
+    def _fold(self, words):
+        """Merge a message's words into the summary, keeping the newest ones"""
+        kept = []
+        for word in reversed(self.summary.split() + words):
+            if word not in kept:
+                kept.append(word)
+        return ' '.join(reversed(kept[:self.summary_words]))
+
+    def add(self, message_type, content):
+        """
+        Append a message, folding patient messages that leave the window
+        into the summary
+
+        Returns:
+            bool: Whether the summary changed
+        """
+        changed = False
+        with self._lock:
+            self.messages.append(self._entry(message_type, content))
+            while len(self.messages) > self.window:
+                old_type, _, old_words = self.messages.popleft()
+                if old_words:
+                    summary = self._fold(old_words)
+                    changed = changed or summary != self.summary
+                    self.summary = summary
+        return changed
+
+    def render(self):
+        """
+        Format the context for the prompt, one line per entry
+
+        Returns:
+            str: The context, or '' for a new conversation
+        """
+        with self._lock:
+            lines = [f"Earlier symptoms: {self.summary}"] if self.summary else []
+            lines += [f"{SPEAKERS.get(message_type, 'System')}: {content}" for message_type, content, _ in self.messages]
+        return ''.join(line + '\n' for line in lines)
+
+def get_context(conversation):
+    """
+    Get the context of a conversation, rebuilding it when missing or stale
+
+    Returns:
+        ConversationContext: The cached or rebuilt context
+    """
+    context = context_cache.get(conversation.pk)
+    if context is None or context.version != conversation.last_updated:
+        recent = (
+            ChatbotMessage.objects.filter(conversation=conversation)
+            .order_by('-timestamp', '-id')
+            .values_list('message_type', 'content')[:settings.CHATBOT_CONTEXT_MESSAGES]
+        )
+        context = ConversationContext(
+            summary=conversation.context_summary,
+            messages=reversed(list(recent)),
+            version=conversation.last_updated
+        )
+        context_cache.set(conversation.pk, context)
+    return context
+
+def record_turn(conversation, context, *messages):
+    """
+    Add the turn's (message_type, content) pairs to a context
+
+    Bumps last_updated, and saves the summary when it changed, in one update.
+    """
+    changes = [context.add(message_type, content) for message_type, content in messages]
+
+    now = timezone.now()
+    fields = {'last_updated': now}
+    if any(changes):
+        fields['context_summary'] = context.summary
+    ChatbotConversation.objects.filter(pk=conversation.pk).update(**fields)
+
+    for name, value in fields.items():
+        setattr(conversation, name, value)
+    context.version = now
+    context_cache.set(conversation.pk, context)
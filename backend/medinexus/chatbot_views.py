@@ -0,0 +1,114 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+import json
+import uuid
+
+from .models import ChatbotConversation, ChatbotMessage
+from .roles import request_role
+from . import chatbot_context, inference
+
+MAX_MESSAGE_LENGTH = 2000
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def send_chatbot_message(request):
+    """
+    Send a message to the symptom screening chatbot and get its reply
+
+    The reply comes from the reply cache or the batched model, or from the
+    rule-based triage for red-flag symptoms and when the model is busy or
+    unavailable. Every reply is stored in the conversation history. With
+    ?stream=ndjson the model's reply is sent one chunk per line as it is
+    decoded, followed by a final line with the conversation details.
+    """
+    role = request_role(request)
+    if not role.is_patient:
+        return Response(
+            {'error': _('Only patients can use the chatbot')},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    message = (request.data.get('message') or '').strip()
+    if not message:
+        return Response(
+            {'error': _('Message is required')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(message) > MAX_MESSAGE_LENGTH:
+        return Response(
+            {'error': _('Message is too long')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    conversation_id = request.data.get('conversation_id')
+    if conversation_id:
+        try:
+            conversation = ChatbotConversation.objects.get(
+                conversation_id=conversation_id, patient=role.patient
+            )
+        except ChatbotConversation.DoesNotExist:
+            return Response(
+                {'error': _('Conversation not found')},
+                status=status.HTTP_404_NOT_FOUND
+            )
+    else:
+        conversation = ChatbotConversation.objects.create(
+            patient=role.patient, conversation_id=uuid.uuid4().hex
+        )
+
+    context = chatbot_context.get_context(conversation)
+
+    ChatbotMessage.objects.create(conversation=conversation, message_type='user', content=message)
+
+    language = role.patient.preferred_language
+
+    if request.query_params.get('stream') == 'ndjson':
+        return StreamingHttpResponse(
+            _stream_answer(
+                inference.stream_answer(message, language, context=context.render()),
+                conversation, context, message
+            ),
+            content_type='application/x-ndjson'
+        )
+
+    answer = inference.answer(message, language, context=context.render())
+    _record_reply(conversation, context, message, answer.reply)
+    return Response(_result(conversation, answer))
+
+def _record_reply(conversation, context, message, reply):
+    ChatbotMessage.objects.create(conversation=conversation, message_type='bot', content=reply)
+    chatbot_context.record_turn(conversation, context, ('user', message), ('bot', reply))
+
+def _result(conversation, answer):
+    return {
+        'conversation_id': conversation.conversation_id,
+        'reply': answer.reply,
+        'source': answer.source,
+        'triage_level': answer.level
+    }
+
+def _stream_answer(answer, conversation, context, message):
+    """
+    Yield the reply as NDJSON chunk lines while it is generated, then store
+    it and yield the full result
+    """
+    for token in answer:
+        yield json.dumps({'token': token}, ensure_ascii=False) + '\n'
+    _record_reply(conversation, context, message, answer.reply)
+    yield json.dumps(dict(_result(conversation, answer), done=True), ensure_ascii=False) + '\n'
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def chatbot_metrics(request):
+    """
+    Inference throughput, latency, fallback and reply cache figures for this
+    worker process
+    """
+    return Response({
+        **inference.get_engine().metrics(),
+        'cache': inference.reply_cache.stats()
+    })
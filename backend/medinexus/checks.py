@@ -0,0 +1,21 @@
+"""
+Deployment checks, run by `manage.py check --deploy`
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cache invalidation (slots, auth users, timelines) only reaches other
+    workers through a shared cache
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend.endswith('LocMemCache'):
+        return [Error(
+            'The default cache is local to each process.',
+            hint='Set REDIS_URL, or run a single worker process.',
+            id='medinexus.E001',
+        )]
+    return []
@@ -0,0 +1,114 @@
+import asyncio
+import uuid
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+import jwt
+
+from .auth import StatelessJWTAuthentication
+from .realtime import user_group
+
+# Events buffered per connection before a slow client is told to resync
+MAX_PENDING_EVENTS = getattr(settings, 'WEBSOCKET_MAX_PENDING_EVENTS', 100)
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate WebSocket connections from a ?token=<access token> query
+    parameter, since browsers cannot set headers on WebSocket requests
+
+    The token is either one of our access tokens, which sets scope['user'],
+    or a Supabase access token, which sets scope['supabase_user_id'] to the
+    Supabase auth user UUID that notifications and chat rows refer to.
+    """
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+        scope['user'] = await self._get_user(token) if token else AnonymousUser()
+        scope['supabase_user_id'] = None
+        if token and not scope['user'].is_authenticated:
+            scope['supabase_user_id'] = self._get_supabase_user_id(token)
+        return await super().__call__(scope, receive, send)
+
+    @database_sync_to_async
+    def _get_user(self, token):
+        try:
+            return StatelessJWTAuthentication().authenticate_token(token)
+        except exceptions.AuthenticationFailed:
+            return AnonymousUser()
+
+    def _get_supabase_user_id(self, token):
+        if not settings.SUPABASE_JWT_SECRET:
+            return None
+        try:
+            payload = jwt.decode(
+                token,
+                settings.SUPABASE_JWT_SECRET,
+                algorithms=['HS256'],
+                audience='authenticated'
+            )
+            return str(uuid.UUID(payload['sub']))
+        except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+            return None
+
+class UserEventsConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes the authenticated user's notifications and chat messages
+
+    Connections authenticated with our tokens join the group of the Django
+    user id; those authenticated with a Supabase token join the group of the
+    Supabase user UUID.
+
+    Events are queued per connection and written by a sender task. When a
+    slow client lets the queue fill up, further events are dropped and the
+    client receives a single 'resync' event telling it to refetch over REST,
+    so one stalled socket cannot grow memory without bound.
+    """
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            user_id = user.id
+        else:
+            # Supabase rows address users by their auth UUID
+            user_id = self.scope.get('supabase_user_id')
+        if user_id is None:
+            await self.close(code=4401)
+            return
+
+        self.group_name = user_group(user_id)
+        self.pending = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.overflowed = False
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self.sender = asyncio.create_task(self._send_pending())
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if hasattr(self, 'sender'):
+            self.sender.cancel()
+
+    async def receive_json(self, content):
+        # Clients only listen; answer pings so they can detect dead sockets
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def push_event(self, event):
+        """Handler for 'push.event' messages sent to the user's group"""
+        try:
+            self.pending.put_nowait({'type': event['event'], 'data': event['payload']})
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def _send_pending(self):
+        while True:
+            message = await self.pending.get()
+            await self.send_json(message)
+            if self.overflowed and self.pending.empty():
+                self.overflowed = False
+                await self.send_json({'type': 'resync'})
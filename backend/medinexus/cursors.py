@@ -0,0 +1,39 @@
+import base64
+import json
+
+class InvalidCursor(ValueError):
+    """Raised when a client-supplied cursor cannot be decoded"""
+
+def encode_cursor(*values):
+    """
+    Encode a keyset position as an opaque, URL-safe token
+
+    Args:
+        *values: JSON-serializable sort key values (datetimes as ISO strings)
+
+    Returns:
+        str: Cursor token
+    """
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, size):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        token (str): Cursor token
+        size (int): Expected number of key values
+
+    Returns:
+        list: The decoded key values
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(token)
+    return values
@@ -0,0 +1,84 @@
+"""
+Thumbnail rendering with Pillow
+
+Runs in pool processes (see medinexus.thumbnails), so this module imports
+nothing from Django. Output names are derived from the SHA-256 of the
+source bytes and the target size, so identical images share thumbnails and
+an existing thumbnail is never rendered twice.
+"""
+
+import hashlib
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+READ_BUFFER_SIZE = 64 * 1024
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for piece in iter(lambda: file.read(READ_BUFFER_SIZE), b''):
+            digest.update(piece)
+    return digest.hexdigest()
+
+def output_format(preferred):
+    """Use WebP when requested and supported by this Pillow build, else JPEG"""
+    if preferred.upper() == 'WEBP' and features.check('webp'):
+        return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+def render_thumbnails(source_path, output_root, sizes, preferred_format='WEBP', quality=80, crop=True):
+    """
+    Render fixed-size thumbnails of an image
+
+    Args:
+        source_path (str): Image to read
+        output_root (str): Directory thumbnail names are relative to
+        sizes (dict): Size name -> (width, height)
+        preferred_format (str): 'WEBP' or 'JPEG'
+        quality (int): Encoder quality
+        crop (bool): Crop to exactly width x height (profile pictures)
+            instead of fitting inside it (record previews)
+
+    Returns:
+        dict: Size name -> thumbnail name relative to output_root; empty if
+            the source is not an image Pillow can read
+    """
+    image_format, extension = output_format(preferred_format)
+    digest = file_digest(source_path)
+    mode = 'c' if crop else 'f'
+
+    names = {}
+    missing = []
+    for size_name, (width, height) in sizes.items():
+        name = f"thumbnails/{digest[:2]}/{digest}-{width}x{height}{mode}.{extension}"
+        names[size_name] = name
+        if not os.path.exists(os.path.join(output_root, name)):
+            missing.append((name, (width, height)))
+
+    if not missing:
+        return names
+
+    try:
+        with Image.open(source_path) as source:
+            # Let the JPEG decoder downscale while decoding
+            source.draft('RGB', max(size for _, size in missing))
+            image = ImageOps.exif_transpose(source).convert('RGB')
+    except (UnidentifiedImageError, OSError):
+        return {}
+
+    for name, size in missing:
+        if crop:
+            thumbnail = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+        else:
+            thumbnail = image.copy()
+            thumbnail.thumbnail(size, Image.Resampling.LANCZOS)
+
+        path = os.path.join(output_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        thumbnail.save(temp_path, image_format, quality=quality)
+        os.replace(temp_path, path)
+
+    return names
@@ -0,0 +1,468 @@
+"""
+Micro-batching inference engine for the chatbot
+
+Requests from every thread of a worker process go into one bounded queue. A
+single engine thread takes up to CHATBOT_MAX_BATCH_SIZE prompts, waiting at
+most CHATBOT_MAX_WAIT_MS after the oldest one arrived, and decodes them
+together, handing each request its text as every decoding step produces it.
+When the queue is full, the model cannot be loaded or no text arrives within
+CHATBOT_REPLY_TIMEOUT, the rule-based triage answers instead.
+
+Model replies are cached per language and canonical message, so repeated
+questions ("fever and headache", "headache and fever") skip inference.
+"""
+
+import logging
+import math
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from . import chatbot
+from .cache import TTLCache
+from .transliteration import normalize
+from .triage import triage
+
+logger = logging.getLogger(__name__)
+
+MODEL = 'model'
+CACHE = 'cache'
+TRIAGE = 'triage'
+
+# Completions counted for the throughput figure
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# Words that do not change the meaning of a symptom description. Negations
+# ("no", "not", "nahi", "nahin") are deliberately kept.
+STOPWORDS = frozenset("""
+    a an and the i im i've ive am is are was have has had my me with of to in on
+    since from for also very some feel feeling having got get please help doctor
+    aur hai hain tha mujhe mera meri mere ho raha rahi rahe se ka ki ke bhi men
+    ate mainu nu da di de vich riha ji
+""".split())
+
+# Words that negate a nearby symptom; "t" is what is left of "don't" and
+# "isn't" after normalization
+NEGATIONS = frozenset("""
+    no not never without nor neither t nahi nahin na mat bina
+""".split())
+
+# Model replies keyed on language and canonical message (see reply_cache_key)
+reply_cache = TTLCache(
+    maxsize=getattr(settings, 'CHATBOT_CACHE_SIZE', 5000),
+    ttl=getattr(settings, 'CHATBOT_CACHE_TTL', 24 * 60 * 60)
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+class EngineSaturated(Exception):
+    """The inference queue is full"""
+
+# Marks the end of a ReplyStream
+_END = object()
+
+class ReplyStream:
+    """
+    The text of one reply, delivered in chunks as the engine decodes it
+    """
+    def __init__(self):
+        self._chunks = queue.Queue()
+        self.cancelled = False
+
+    def put(self, text):
+        if text:
+            self._chunks.put(text)
+
+    def finish(self):
+        self._chunks.put(_END)
+
+    def fail(self, error):
+        self._chunks.put(error)
+
+    def cancel(self):
+        """Tell the engine the caller has given up on this reply"""
+        self.cancelled = True
+
+    def chunks(self, timeout, deadline=None):
+        """
+        Yield text chunks until the reply is complete
+
+        Args:
+            timeout (float): Longest wait for each chunk, in seconds
+            deadline (float): time.monotonic() by which the whole reply
+                must be complete
+
+        Raises:
+            concurrent.futures.TimeoutError: If a chunk or the reply is late
+            Exception: Whatever made the engine fail the batch
+        """
+        while True:
+            wait = timeout if deadline is None else min(timeout, deadline - time.monotonic())
+            try:
+                chunk = self._chunks.get(timeout=max(0, wait))
+            except queue.Empty:
+                raise FutureTimeout()
+            if chunk is _END:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+@dataclass(frozen=True)
+class Answer:
+    """
+    A chatbot reply and where it came from
+    """
+    reply: str
+    source: str
+    level: str
+
+class InferenceEngine:
+    """
+    Collects concurrent prompts into micro-batches for one model
+
+    Args:
+        model_loader: Callable returning an object with
+            generate_stream(prompts) or generate(prompts)
+            (default: chatbot.get_model)
+        max_batch_size (int): Largest batch run in one forward pass
+        max_wait_ms (float): Longest a prompt waits for a batch to fill
+        max_queue (int): Pending prompts accepted before submit() rejects
+        metrics_window (int): Number of recent requests kept for latency
+            and batch size figures
+    """
+    def __init__(self, model_loader=None, max_batch_size=None, max_wait_ms=None,
+                 max_queue=None, metrics_window=1000):
+        self.model_loader = model_loader or chatbot.get_model
+        self.max_batch_size = max_batch_size or settings.CHATBOT_MAX_BATCH_SIZE
+        self.max_wait = (max_wait_ms or settings.CHATBOT_MAX_WAIT_MS) / 1000
+        self.max_queue = max_queue or settings.CHATBOT_MAX_QUEUE
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=metrics_window)
+        self._first_chunk_latencies = deque(maxlen=metrics_window)
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._completed_at = deque()
+        self.counters = {'completed': 0, 'failed': 0, 'rejected': 0, 'fallbacks': 0}
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name='chatbot-inference', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, prompt):
+        """
+        Queue a prompt for the next batch
+
+        Returns:
+            ReplyStream: The reply text as it is generated
+
+        Raises:
+            EngineSaturated: If the queue is full
+        """
+        stream = ReplyStream()
+        try:
+            self._queue.put_nowait((prompt, stream, time.monotonic()))
+        except queue.Full:
+            self._count('rejected')
+            raise EngineSaturated()
+        return stream
+
+    def record_fallback(self):
+        self._count('fallbacks')
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self.counters[name] += amount
+
+    def _collect(self):
+        """
+        Wait for one prompt, then gather more until the batch is full or the
+        first prompt has waited max_wait
+
+        Prompts already queued are always taken, so a backlog drains in
+        full batches.
+        """
+        batch = [self._queue.get(timeout=1.0)]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                continue
+
+            # Skip prompts whose callers already gave up
+            batch = [item for item in batch if not item[1].cancelled]
+            if not batch:
+                continue
+
+            first_chunk_at = [None] * len(batch)
+            try:
+                model = self.model_loader()
+                prompts = [prompt for prompt, _, _ in batch]
+                if hasattr(model, 'generate_stream'):
+                    steps = model.generate_stream(prompts)
+                else:
+                    steps = [model.generate(prompts)]
+                for texts in steps:
+                    now = time.monotonic()
+                    for index, ((_, stream, _), text) in enumerate(zip(batch, texts)):
+                        if text and first_chunk_at[index] is None:
+                            first_chunk_at[index] = now
+                        stream.put(text)
+                    # Stop decoding once every caller has given up
+                    if all(stream.cancelled for _, stream, _ in batch):
+                        break
+            except Exception as e:
+                if not isinstance(e, chatbot.ChatbotUnavailable):
+                    logger.exception("Chatbot batch of %s failed", len(batch))
+                self._count('failed', len(batch))
+                for _, stream, _ in batch:
+                    stream.fail(e)
+                continue
+
+            now = time.monotonic()
+            for _, stream, _ in batch:
+                stream.finish()
+
+            with self._metrics_lock:
+                self.counters['completed'] += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._latencies.extend(now - submitted_at for _, _, submitted_at in batch)
+                self._first_chunk_latencies.extend(
+                    at - submitted_at for (_, _, submitted_at), at in zip(batch, first_chunk_at) if at is not None
+                )
+                self._completed_at.extend([now] * len(batch))
+                while self._completed_at and self._completed_at[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                    self._completed_at.popleft()
+
+    def metrics(self):
+        """
+        Throughput, latency and queue figures for this process
+
+        Returns:
+            dict: Requests per second over the last minute, p50/p95 latency
+                to the complete reply and to its first chunk in milliseconds,
+                mean batch size, queue depth and counters
+        """
+        now = time.monotonic()
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            first_chunk_latencies = sorted(self._first_chunk_latencies)
+            batch_sizes = list(self._batch_sizes)
+            recent = sum(1 for completed_at in self._completed_at if completed_at >= now - THROUGHPUT_WINDOW_SECONDS)
+            counters = dict(self.counters)
+
+        def percentile(values, p):
+            if not values:
+                return None
+            return round(values[max(0, math.ceil(p * len(values)) - 1)] * 1000, 1)
+
+        return {
+            'throughput_per_second': round(recent / THROUGHPUT_WINDOW_SECONDS, 2),
+            'latency_p50_ms': percentile(latencies, 0.50),
+            'latency_p95_ms': percentile(latencies, 0.95),
+            'first_chunk_p50_ms': percentile(first_chunk_latencies, 0.50),
+            'first_chunk_p95_ms': percentile(first_chunk_latencies, 0.95),
+            'mean_batch_size': round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else None,
+            'queue_depth': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'model_loaded': chatbot.is_loaded(),
+            **counters,
+        }
+
+def get_engine():
+    """
+    Get this process's engine, starting its thread on first use
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = InferenceEngine().start()
+    return _engine
+
+def canonical_words(message):
+    """Romanized, lowercased words of a message without stopwords, in order"""
+    return [word for word in normalize(message).split() if word not in STOPWORDS]
+
+def reply_cache_key(message, language='en'):
+    """
+    Key a message by language and its canonical words
+
+    Without negations the words are deduplicated and sorted, so "fever and
+    headache" and "headache and fever" share a key. A negation's scope
+    depends on word order ("fever but no headache" vs "headache but no
+    fever"; Hindi and Punjabi negate after the symptom), so messages with
+    one keep their words in order.
+
+    Returns:
+        str: The key, or None when nothing meaningful is left to key on
+    """
+    words = canonical_words(message)
+    if not words:
+        return None
+    if NEGATIONS.isdisjoint(words):
+        words = sorted(set(words))
+    return f"{language}:{' '.join(words)}"
+
+class StreamedAnswer:
+    """
+    A chatbot reply that is iterated chunk by chunk as it is generated
+
+    Iterating yields the reply text in chunks; reply and source are final
+    once iteration has finished. Replies from the cache or the triage rules
+    are already complete and are replayed in word chunks.
+
+    Attributes:
+        reply (str): The full reply, once iterated
+        source (str): 'model', 'cache' or 'triage'
+        level (str): The triage level
+    """
+    def __init__(self, screened, source=None, reply=None, stream=None, engine=None, key=None, timeout=None):
+        self.screened = screened
+        self.level = screened.level
+        self.source = source
+        self.reply = reply
+        self._stream = stream
+        self._engine = engine
+        self._key = key
+        self._timeout = timeout or settings.CHATBOT_REPLY_TIMEOUT
+
+    def __iter__(self):
+        return self._chunks()
+
+    def collect(self, timeout=None):
+        """
+        Wait for the whole reply, for at most timeout seconds in total
+
+        Returns:
+            Answer: The complete reply
+        """
+        deadline = time.monotonic() + (timeout or self._timeout)
+        for _ in self._chunks(deadline):
+            pass
+        return Answer(reply=self.reply, source=self.source, level=self.level)
+
+    def _chunks(self, deadline=None):
+        if self._stream is None:
+            yield from reply_chunks(self.reply)
+            return
+
+        parts = []
+        try:
+            for chunk in self._stream.chunks(self._timeout, deadline):
+                parts.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            # The client went away mid-reply
+            self._stream.cancel()
+            raise
+        except FutureTimeout:
+            self._stream.cancel()
+        except chatbot.ChatbotUnavailable:
+            pass
+        except Exception:
+            logger.exception("Chatbot inference failed")
+        else:
+            self.reply = ''.join(parts).strip()
+            if self.reply:
+                self.source = MODEL
+                if self._key is not None:
+                    reply_cache.set(self._key, self.reply)
+                return
+
+        # No complete reply: the triage advice follows whatever was sent
+        self._engine.record_fallback()
+        fallback = f"\n\n{self.screened.reply}" if parts else self.screened.reply
+        yield fallback
+        self.reply = (''.join(parts) + fallback).strip()
+        self.source = TRIAGE
+
+def stream_answer(message, language='en', timeout=None, context=''):
+    """
+    Answer one patient message, streaming the model's reply as it is decoded
+
+    Red-flag symptoms are answered by the triage rules straight away and
+    cached replies are returned without inference; everything else goes
+    through the batched model, falling back to triage when the engine is
+    saturated, unavailable or sends nothing for timeout seconds. Only
+    replies to opening messages (no context) are cached and served from the
+    cache, since later replies depend on the conversation.
+
+    Args:
+        timeout (float): Longest wait for each chunk of a model reply
+            (default: CHATBOT_REPLY_TIMEOUT)
+        context (str): Compact conversation context for the prompt
+            (see chatbot_context.ConversationContext.render)
+
+    Returns:
+        StreamedAnswer: The reply, to be iterated
+    """
+    screened = triage(message, language)
+    if screened.is_emergency:
+        return StreamedAnswer(screened, source=TRIAGE, reply=screened.reply)
+
+    key = None if context else reply_cache_key(message, language)
+    if key is not None:
+        cached = reply_cache.get(key)
+        if cached is not None:
+            return StreamedAnswer(screened, source=CACHE, reply=cached)
+
+    engine = get_engine()
+    try:
+        stream = engine.submit(chatbot.build_prompt(message, language, context))
+    except EngineSaturated:
+        engine.record_fallback()
+        return StreamedAnswer(screened, source=TRIAGE, reply=screened.reply)
+    return StreamedAnswer(screened, stream=stream, engine=engine, key=key, timeout=timeout)
+
+def answer(message, language='en', timeout=None, context=''):
+    """
+    Answer one patient message once the whole reply is ready
+
+    Like stream_answer, except that timeout bounds the whole reply.
+
+    Returns:
+        Answer: The reply, its source ('model', 'cache' or 'triage') and the
+            triage level
+    """
+    return stream_answer(message, language, timeout, context).collect(timeout)
+
+def reply_chunks(text):
+    """
+    Split a finished reply into word chunks that concatenate back to it
+    """
+    return re.findall(r'\S+\s*', text)
@@ -0,0 +1,88 @@
+"""
+Normalization of the languages a doctor speaks into short codes, stored in
+DoctorProfile.languages for indexed exact-match filtering
+"""
+
+import re
+
+from .transliteration import normalize
+
+# Code -> display name
+LANGUAGE_NAMES = {
+    'en': 'English',
+    'hi': 'Hindi',
+    'pa': 'Punjabi',
+    'ur': 'Urdu',
+    'bn': 'Bengali',
+    'gu': 'Gujarati',
+    'mr': 'Marathi',
+    'ta': 'Tamil',
+    'te': 'Telugu',
+    'kn': 'Kannada',
+    'ml': 'Malayalam',
+    'or': 'Odia',
+    'as': 'Assamese',
+    'ne': 'Nepali',
+    'sd': 'Sindhi',
+    'ks': 'Kashmiri',
+    'sa': 'Sanskrit',
+}
+
+# Normalized (romanized, lowercase) spellings -> code, including the native
+# names written in Devanagari or Gurmukhi once transliterated
+LANGUAGE_ALIASES = {
+    'english': 'en', 'angrezi': 'en', 'angreji': 'en', 'angreza': 'en', 'angareji': 'en', 'angarezi': 'en',
+    'hindi': 'hi', 'hindee': 'hi',
+    'punjabi': 'pa', 'panjabi': 'pa', 'punjaabi': 'pa',
+    'urdu': 'ur', 'uradu': 'ur',
+    'bengali': 'bn', 'bangla': 'bn', 'bangali': 'bn',
+    'gujarati': 'gu', 'gujrati': 'gu',
+    'marathi': 'mr',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'odia': 'or', 'oriya': 'or',
+    'assamese': 'as', 'asamiya': 'as',
+    'nepali': 'ne',
+    'sindhi': 'sd',
+    'kashmiri': 'ks',
+    'sanskrit': 'sa', 'sanskrt': 'sa',
+}
+
+# List separators, including "and" in English, Hindi and Punjabi. Words are
+# delimited by whitespace rather than \b, since Indic words may end in a
+# vowel sign, which \b does not treat as a word character (ਅਤੇ).
+_SEPARATORS = re.compile(r'[,;/|&+\n]|(?<!\S)(?:and|और|ਅਤੇ)(?!\S)', re.IGNORECASE)
+
+def language_code(name):
+    """
+    Map one language name or code to its code
+
+    Returns:
+        str: The language code, a slug for unknown languages, or None
+    """
+    normalized = normalize(name)
+    if not normalized:
+        return None
+    if normalized in LANGUAGE_NAMES:
+        return normalized
+    return LANGUAGE_ALIASES.get(normalized, normalized.replace(' ', '-'))
+
+def parse_languages(text):
+    """
+    Parse a free-text language list such as "English, Hindi and ਪੰਜਾਬੀ"
+
+    Returns:
+        list: Unique language codes in the order given
+    """
+    codes = []
+    for part in _SEPARATORS.split(text or ''):
+        code = language_code(part)
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+def language_names(codes):
+    """Display names for a list of language codes"""
+    return [LANGUAGE_NAMES.get(code, code) for code in codes]
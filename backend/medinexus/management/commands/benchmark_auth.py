@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from medinexus.auth import (
+    JWTAuthentication, StatelessJWTAuthentication, generate_tokens_for_user, invalidate_cached_user
+)
+from medinexus.models import PatientProfile
+from medinexus.roles import request_role
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Measure per-request authentication cost with and without the user cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per authentication mode')
+
+    def handle(self, *args, **options):
+        count = max(1, options['requests'])
+
+        # The benchmark user is rolled back afterwards
+        with transaction.atomic():
+            user = User.objects.create_user('benchmark-auth-user')
+            PatientProfile.objects.create(user=user)
+            token = generate_tokens_for_user(user)['access']
+            request = RequestFactory().get('/api/appointments', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+            invalidate_cached_user(user.id)
+            try:
+                for name, authentication in (
+                    ('database', JWTAuthentication()),
+                    ('cached', StatelessJWTAuthentication()),
+                ):
+                    # Warm up, so the cached mode is measured with a hit
+                    self._authenticate(authentication, request)
+                    queries, timings = self._measure(authentication, request, count)
+                    self.stdout.write(
+                        f'{name:9} {queries / count:4.1f} queries/request  '
+                        f'p50 {statistics.median(timings) * 1000:6.3f}ms  '
+                        f'mean {statistics.mean(timings) * 1000:6.3f}ms'
+                    )
+            finally:
+                invalidate_cached_user(user.id)
+                transaction.set_rollback(True)
+
+    def _authenticate(self, authentication, request):
+        # Views then read the role, as list_appointments does
+        request.role = None
+        request.user = authentication.authenticate(request)[0]
+        return request_role(request)
+
+    def _measure(self, authentication, request, count):
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(count):
+                started = time.perf_counter()
+                self._authenticate(authentication, request)
+                timings.append(time.perf_counter() - started)
+        return len(context.captured_queries), timings
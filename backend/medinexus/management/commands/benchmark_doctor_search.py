@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from medinexus import search
+from medinexus.models import DoctorProfile
+
+User = get_user_model()
+
+FIRST_NAMES = [
+    'Aarav', 'Amrit', 'Anjali', 'Arjun', 'Baljit', 'Deepak', 'Gurpreet', 'Harleen',
+    'Ishaan', 'Jaspreet', 'Kavya', 'Manpreet', 'Meera', 'Neha', 'Priya', 'Rahul',
+    'Rajinder', 'Simran', 'Sunil', 'Vikram',
+]
+LAST_NAMES = [
+    'Bains', 'Bhatia', 'Chopra', 'Dhillon', 'Gill', 'Grewal', 'Gupta', 'Kapoor',
+    'Kaur', 'Kumar', 'Malhotra', 'Mehta', 'Sandhu', 'Sharma', 'Sidhu', 'Singh',
+    'Verma',
+]
+LANGUAGES = [['en', 'hi'], ['en', 'pa'], ['hi', 'pa'], ['en', 'hi', 'pa'], ['en'], ['hi', 'ur']]
+BIOS = [
+    'Treats heart and blood pressure problems',
+    'Child health and vaccinations',
+    'Skin, hair and allergy care',
+    'Joint pain, fractures and sports injuries',
+    'Eye care and cataract surgery',
+    'Family medicine for rural clinics',
+]
+
+# Names, a misspelling, English and transliterated Hindi/Punjabi terms
+QUERIES = ['sharma', 'dhilon', 'gurpreet gill', 'cardiology', 'dil', 'ਦਿਲ', 'ankh', 'ਪੰਜਾਬੀ']
+
+class Command(BaseCommand):
+    help = 'Measure doctor search latency against synthetic directories (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='Directory sizes to measure, in doctors')
+        parser.add_argument('--runs', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            created = 0
+            for size in sorted(options['sizes']):
+                self.stdout.write(f'Indexing {size - created} synthetic doctors...')
+                self._create_doctors(rng, created, size)
+                created = size
+                # Fresh statistics, or the planner assumes the tables are empty
+                with connection.cursor() as cursor:
+                    for model in (User, DoctorProfile):
+                        cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+                self.stdout.write(f'{DoctorProfile.objects.count()} doctors:')
+                for query in QUERIES:
+                    timings = self._time_query(query, options['runs'], options['page_size'])
+                    self.stdout.write(
+                        f'  {query!r:18} p50 {statistics.median(timings):7.2f}ms  '
+                        f'p95 {_percentile(timings, 95):7.2f}ms'
+                    )
+
+            # Leave no synthetic doctors behind
+            transaction.set_rollback(True)
+
+    def _create_doctors(self, rng, start, stop, batch_size=2000):
+        for offset in range(start, stop, batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    username=f'benchmark-doctor-{index}',
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    password='!'
+                )
+                for index in range(offset, min(offset + batch_size, stop))
+            ])
+            doctors = DoctorProfile.objects.bulk_create([
+                DoctorProfile(
+                    user=user,
+                    specialization=rng.choice(DoctorProfile.SPECIALIZATION_CHOICES)[0],
+                    languages=rng.choice(LANGUAGES),
+                    bio=rng.choice(BIOS)
+                )
+                for user in users
+            ])
+            # bulk_create skips the signals that maintain the index
+            for doctor in doctors:
+                search.refresh_doctor_index(doctor)
+
+    def _time_query(self, query, runs, page_size):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            list(search.search(query, DoctorProfile.objects.select_related('user'))[:page_size + 1])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
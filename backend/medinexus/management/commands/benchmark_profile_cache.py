@@ -0,0 +1,82 @@
+import os
+import random
+import statistics
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from .benchmark_supabase import PostgRESTStandIn
+
+class NullStore:
+    """Profile cache store that never holds anything, i.e. no caching"""
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+class Command(BaseCommand):
+    help = 'Measure get_user_profile latency with and without the profile cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=20.0, help='Simulated round trip in milliseconds')
+        parser.add_argument('--lookups', type=int, default=500, help='Profile lookups per store')
+        parser.add_argument('--users', type=int, default=50, help='Distinct users looked up')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (PostgRESTStandIn,), {'latency': options['latency'] / 1000})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # The Supabase client is created on import, so point it at the
+        # stand-in before the first import
+        os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{server.server_port}'
+        os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+        from medinexus import supabase
+
+        try:
+            self.stdout.write(f"PostgREST stand-in with {options['latency']:.0f}ms latency")
+            rng = random.Random(options['seed'])
+            lookups = [
+                (f"user-{rng.randrange(options['users'])}", rng.choice(['patient', 'doctor']))
+                for _ in range(options['lookups'])
+            ]
+            for name, store in (
+                ('uncached', NullStore()),
+                ('in-process', None),
+                ('shared', supabase.SharedCacheStore(cache)),
+            ):
+                supabase.configure_profile_cache(store)
+                if store is not None:
+                    for user_id, user_type in set(lookups):
+                        store.delete(supabase.ProfileCache.key(user_id, user_type))
+                timings = []
+                for user_id, user_type in lookups:
+                    started = time.perf_counter()
+                    supabase.get_user_profile(user_id, user_type)
+                    timings.append((time.perf_counter() - started) * 1000)
+                stats = supabase.profile_cache_stats()
+                self.stdout.write(
+                    f"  {name:10} p50 {statistics.median(timings):7.3f}ms  "
+                    f"mean {statistics.mean(timings):7.3f}ms  "
+                    f"hits {stats['hits']}  misses {stats['misses']}  hit rate {stats['hit_rate']:.0%}"
+                )
+
+            # A write refreshes the entry, so the next read is a hit
+            supabase.configure_profile_cache(None)
+            supabase.update_user_profile('user-0', {'bio': 'Updated'}, 'patient')
+            supabase.get_user_profile('user-0', 'patient')
+            stats = supabase.profile_cache_stats()
+            self.stdout.write(f"  read after update: hits {stats['hits']}  misses {stats['misses']}")
+        finally:
+            supabase.configure_profile_cache(None)
+            server.shutdown()
+            server.server_close()
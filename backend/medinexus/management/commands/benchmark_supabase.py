@@ -0,0 +1,113 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from medinexus import supabase_async
+from medinexus.supabase_async import AsyncSupabase
+
+class PostgRESTStandIn(BaseHTTPRequestHandler):
+    """
+    Minimal local stand-in for the PostgREST API
+
+    Every request waits for the simulated network latency. GETs then
+    return a single row, and writes echo their rows back as PostgREST
+    does with return=representation.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_GET(self):
+        self._reply([{'id': 1, 'user_id': 'benchmark'}])
+
+    def do_POST(self):
+        rows = self._body()
+        self._reply(rows if isinstance(rows, list) else [rows])
+
+    def do_PATCH(self):
+        self._reply([self._body()])
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+
+    def _reply(self, rows):
+        time.sleep(self.latency)
+        body = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class Command(BaseCommand):
+    help = 'Measure AsyncSupabase throughput against a local PostgREST stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=20.0, help='Simulated round trip in milliseconds')
+        parser.add_argument('--recipients', type=int, default=100, help='Users to notify')
+        parser.add_argument('--dashboards', type=int, default=50, help='Dashboards to load')
+        parser.add_argument('--max-connections', type=int, default=supabase_async.MAX_CONNECTIONS)
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (PostgRESTStandIn,), {'latency': options['latency'] / 1000})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.stdout.write(f"PostgREST stand-in with {options['latency']:.0f}ms latency")
+            asyncio.run(self._benchmark(f'http://127.0.0.1:{server.server_port}', options))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    async def _benchmark(self, url, options):
+        db = AsyncSupabase(url=url, key='benchmark', max_connections=options['max_connections'])
+        # The module-level helpers use the stand-in for this event loop
+        supabase_async._clients[asyncio.get_running_loop()] = db
+        try:
+            user_ids = [f'user-{index}' for index in range(options['recipients'])]
+
+            async def one_by_one():
+                for user_id in user_ids:
+                    await db.insert('notifications', {'user_id': user_id, 'type': 'system', 'message': 'Hello'})
+
+            self._report(f'{len(user_ids)} notifications, one insert each', len(user_ids), await _timed(one_by_one()))
+            self._report(
+                f'{len(user_ids)} notifications, bulk insert', len(user_ids),
+                await _timed(supabase_async.create_notifications(user_ids, 'system', 'Hello'))
+            )
+
+            async def sequential_dashboard():
+                await db.select('patient_profiles', {'user_id': 'user-0'})
+                await db.select('appointments', {'patient_id': 'user-0'}, order='appointment_date')
+                await db.select('notifications', {'user_id': 'user-0'}, order='updated_at.desc', limit=20)
+
+            timings = [await _timed(sequential_dashboard()) for _ in range(10)]
+            self._report('dashboard, sequential reads', 1, statistics.median(timings))
+            timings = [await _timed(supabase_async.get_dashboard('user-0')) for _ in range(10)]
+            self._report('dashboard, concurrent reads', 1, statistics.median(timings))
+
+            count = options['dashboards']
+            self._report(
+                f'{count} dashboards at once', count,
+                await _timed(db.gather(*(supabase_async.get_dashboard(f'user-{index}') for index in range(count))))
+            )
+        finally:
+            del supabase_async._clients[asyncio.get_running_loop()]
+            await db.aclose()
+
+    def _report(self, name, operations, seconds):
+        self.stdout.write(f'  {name:42} {seconds * 1000:8.1f}ms  {operations / seconds:8.1f} ops/s')
+
+async def _timed(awaitable):
+    started = time.perf_counter()
+    await awaitable
+    return time.perf_counter() - started
@@ -0,0 +1,84 @@
+import asyncio
+import resource
+import statistics
+import time
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from medinexus.realtime import apush_to_users
+from medinexus.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Measure how many concurrent WebSocket connections one worker holds and how fast it fans out'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, nargs='+', default=[500, 1000, 2000],
+                            help='Concurrent connections to open')
+        parser.add_argument('--batch-size', type=int, default=500, help='Connections opened at once')
+        parser.add_argument('--rounds', type=int, default=3, help='Fan-out rounds per connection count')
+
+    def handle(self, *args, **options):
+        layer = get_channel_layer()
+        self.stdout.write(f'Channel layer: {type(layer).__name__}')
+        # Ascending, so peak RSS growth is attributable to the larger count
+        for count in sorted(options['connections']):
+            asyncio.run(self._benchmark(count, options['batch_size'], options['rounds']))
+
+    async def _benchmark(self, count, batch_size, rounds):
+        # Consumers only see the authenticated user, so skip the token
+        # middleware and hand each connection an unsaved user
+        application = URLRouter(websocket_urlpatterns)
+        rss_before = _rss_kb()
+        communicators = []
+        started = time.perf_counter()
+        try:
+            for offset in range(0, count, batch_size):
+                batch = []
+                for user_id in range(offset + 1, min(offset + batch_size, count) + 1):
+                    communicator = WebsocketCommunicator(application, '/ws/events')
+                    communicator.scope['user'] = User(id=user_id)
+                    batch.append(communicator)
+                communicators.extend(batch)
+                results = await asyncio.gather(*(communicator.connect(timeout=30) for communicator in batch))
+                if not all(connected for connected, _code in results):
+                    raise CommandError('A connection was rejected')
+            connect_seconds = time.perf_counter() - started
+            rss_growth = max(0, _rss_kb() - rss_before)
+
+            # Push one event to every user and time its delivery to each socket
+            latencies = []
+            fanouts = []
+            user_ids = range(1, count + 1)
+            for round_number in range(rounds):
+                sent = time.perf_counter()
+                await apush_to_users(user_ids, 'notification', {'round': round_number})
+                received = await asyncio.gather(
+                    *(_receive(communicator, sent) for communicator in communicators)
+                )
+                latencies.extend(received)
+                fanouts.append(time.perf_counter() - sent)
+
+            latencies.sort()
+            self.stdout.write(
+                f'{count} connections: opened {count / connect_seconds:7.0f}/s, '
+                f'~{rss_growth / count:5.1f} KB RSS each; '
+                f'fan-out to all {statistics.median(fanouts) * 1000:7.1f}ms '
+                f'(delivery p50 {statistics.median(latencies) * 1000:6.1f}ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.1f}ms)'
+            )
+        finally:
+            await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+
+async def _receive(communicator, sent):
+    await communicator.receive_json_from(timeout=60)
+    return time.perf_counter() - sent
+
+def _rss_kb():
+    # Peak resident set size; kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from medinexus.chatbot import HEAVY_MODULES
+
+# Boots Django and loads every URL pattern (and so every view module) in a
+# fresh interpreter, the way a worker does before serving its first request
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))
+"""
+
+class Command(BaseCommand):
+    help = 'Measure worker startup time and check that the chatbot ML stack is not imported'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Number of cold starts to measure')
+        parser.add_argument('--budget', type=float, default=None, help='Maximum median startup time in seconds')
+
+    def handle(self, *args, **options):
+        budget = options['budget'] or settings.IMPORT_BUDGET_SECONDS
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'medinexus.settings'))
+
+        timings = []
+        heavy = set()
+        for _ in range(max(1, options['runs'])):
+            result = subprocess.run(
+                [sys.executable, '-c', PROBE],
+                capture_output=True, text=True, env=env, cwd=settings.BASE_DIR
+            )
+            if result.returncode != 0:
+                raise CommandError(f'Startup probe failed:\n{result.stderr}')
+            probe = json.loads(result.stdout.strip().splitlines()[-1])
+            timings.append(probe['seconds'])
+            heavy.update(
+                name for name in probe['modules']
+                if name.split('.')[0] in HEAVY_MODULES
+            )
+
+        median = statistics.median(timings)
+        self.stdout.write(
+            f'Startup over {len(timings)} runs: median {median:.2f}s, '
+            f'min {min(timings):.2f}s, max {max(timings):.2f}s (budget {budget:.2f}s)'
+        )
+
+        if heavy:
+            roots = sorted({name.split('.')[0] for name in heavy})
+            raise CommandError(f"Heavy modules imported at startup: {', '.join(roots)}")
+        if median > budget:
+            raise CommandError(f'Median startup time {median:.2f}s exceeds the {budget:.2f}s budget')
+
+        self.stdout.write(self.style.SUCCESS('Startup is within budget'))
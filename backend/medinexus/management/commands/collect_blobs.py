@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from medinexus.blobs import collect_garbage, recount
+
+class Command(BaseCommand):
+    help = 'Delete stored medical record files that no record references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=None, help='Keep unreferenced files this long')
+        parser.add_argument('--recount', action='store_true', help='Recompute reference counts from the records first')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = recount()
+            self.stdout.write(f'Corrected {fixed} reference counts')
+        count = collect_garbage(grace_hours=options['grace_hours'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} unreferenced files'))
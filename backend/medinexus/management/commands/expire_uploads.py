@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from medinexus.uploads import expire_sessions
+
+class Command(BaseCommand):
+    help = 'Expire unfinished medical record uploads and delete their chunks'
+
+    def handle(self, *args, **options):
+        count = expire_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Expired {count} uploads'))
@@ -0,0 +1,35 @@
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from medinexus import thumbnails
+from medinexus.models import DoctorProfile, MedicalRecord, PatientProfile
+
+class Command(BaseCommand):
+    help = 'Render missing thumbnails for profile pictures and image records'
+
+    def handle(self, *args, **options):
+        futures = []
+        targets = [
+            (DoctorProfile, 'profile_picture', True),
+            (PatientProfile, 'profile_picture', True),
+            (MedicalRecord, 'file', False),
+        ]
+        for model, field, crop in targets:
+            for instance in model.objects.exclude(**{field: ''}).iterator(chunk_size=500):
+                if thumbnails.is_current(instance, field):
+                    continue
+                file = getattr(instance, field)
+                if not crop and not thumbnails.is_image(file.name):
+                    continue
+                try:
+                    path = file.path
+                except NotImplementedError:
+                    continue
+                futures.append(thumbnails.schedule(model, instance.pk, field, file.name, path, crop))
+
+        wait(futures)
+        failed = sum(1 for future in futures if future.exception() is not None)
+        if failed:
+            self.stderr.write(f'{failed} files could not be rendered')
+        self.stdout.write(self.style.SUCCESS(f'Rendered thumbnails for {len(futures)} files'))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from medinexus.realtime_listener import RealtimeListener
+
+class Command(BaseCommand):
+    help = 'Push chat messages and notifications written to Supabase to WebSocket clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dsn', default=None, help='Supabase database URL (default: SUPABASE_DB_URL)')
+
+    def handle(self, *args, **options):
+        dsn = options['dsn'] or settings.SUPABASE_DB_URL
+        if not dsn:
+            raise CommandError('Set SUPABASE_DB_URL or pass --dsn')
+
+        self.stdout.write('Realtime listener started')
+        try:
+            RealtimeListener(dsn).run_forever()
+        except KeyboardInterrupt:
+            pass
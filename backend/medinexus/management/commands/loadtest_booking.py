@@ -0,0 +1,152 @@
+import queue
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from medinexus.appointment_views import create_appointment
+from medinexus.models import Appointment, DoctorProfile, PatientProfile
+
+User = get_user_model()
+
+PREFIX = 'loadtest-booking-'
+
+class Command(BaseCommand):
+    help = 'Fire concurrent bookings at the appointment API and check that each slot is booked once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=300, help='Bookings per scenario')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients')
+        parser.add_argument('--doctors', type=int, default=20, help='Doctors in the spread scenario')
+
+    def handle(self, *args, **options):
+        bookings = max(2, options['bookings'])
+        concurrency = max(2, options['concurrency'])
+        doctor_count = max(2, options['doctors'])
+
+        if User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError(f'Users named {PREFIX}* exist; remove them first')
+
+        # Clients run on their own connections, so the data is committed and
+        # deleted again afterwards
+        try:
+            doctors = [
+                DoctorProfile.objects.create(user=User.objects.create_user(f'{PREFIX}doctor-{index}'))
+                for index in range(doctor_count)
+            ]
+            patients = [
+                User.objects.select_related('patient_profile', 'doctor_profile').get(
+                    pk=PatientProfile.objects.create(
+                        user=User.objects.create_user(f'{PREFIX}patient-{index}')
+                    ).user_id
+                )
+                for index in range(concurrency)
+            ]
+            start = (timezone.now() + timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+
+            # Everyone wants the same slot: exactly one booking may win
+            results, elapsed = self._run(
+                [(patients[i % concurrency], doctors[0], start) for i in range(bookings)], concurrency
+            )
+            self._report('one slot', results, elapsed)
+            won = sum(1 for code, _latency in results if code == 201)
+            booked = Appointment.objects.filter(doctor=doctors[0], date_time=start).count()
+            if won != 1 or booked != 1:
+                raise CommandError(f'{won} bookings won and {booked} were stored; expected exactly 1')
+            if any(code not in (201, 409) for code, _latency in results):
+                raise CommandError('Unexpected responses for the contended slot')
+
+            # Distinct slots of one doctor: bookings serialize on the doctor's row
+            later = start + timedelta(days=1)
+            results, single = self._run(
+                [(patients[i % concurrency], doctors[1], later + timedelta(minutes=30 * i)) for i in range(bookings)],
+                concurrency
+            )
+            self._report('one doctor', results, single)
+
+            # Distinct slots spread over many doctors: only same-doctor
+            # bookings wait for each other
+            latest = later + timedelta(days=bookings)
+            results, spread = self._run(
+                [
+                    (patients[i % concurrency], doctors[i % doctor_count],
+                     latest + timedelta(minutes=30 * (i // doctor_count)))
+                    for i in range(bookings)
+                ],
+                concurrency
+            )
+            self._report(f'{doctor_count} doctors', results, spread)
+            if any(code != 201 for code, _latency in results):
+                raise CommandError('Bookings for free slots were rejected')
+
+            self.stdout.write(self.style.SUCCESS('Each slot was booked exactly once'))
+        finally:
+            User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _run(self, jobs, concurrency):
+        """
+        Book every (user, doctor, start) job from concurrency client threads
+        that start together
+
+        Returns:
+            tuple: (list of (status code, seconds), wall-clock seconds)
+        """
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+        results = []
+        results_lock = threading.Lock()
+        ready = threading.Barrier(concurrency + 1)
+        factory = APIRequestFactory()
+
+        def client():
+            try:
+                connection.ensure_connection()
+                ready.wait()
+                while True:
+                    try:
+                        user, doctor, start = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    request = factory.post(
+                        '/api/appointments/create',
+                        {'doctor': doctor.id, 'date_time': start.isoformat()},
+                        format='json'
+                    )
+                    force_authenticate(request, user=user)
+                    started = time.perf_counter()
+                    response = create_appointment(request)
+                    with results_lock:
+                        results.append((response.status_code, time.perf_counter() - started))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        ready.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if len(results) != len(jobs):
+            raise CommandError(f'{len(jobs) - len(results)} bookings failed with an exception')
+        return results, elapsed
+
+    def _report(self, name, results, elapsed):
+        codes = {}
+        for code, _latency in results:
+            codes[code] = codes.get(code, 0) + 1
+        latencies = sorted(latency for _code, latency in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{name:12} {len(results) / elapsed:7.1f} bookings/s  '
+            f'p50 {statistics.median(latencies) * 1000:6.1f}ms  p95 {p95 * 1000:6.1f}ms  '
+            f'responses {dict(sorted(codes.items()))}'
+        )
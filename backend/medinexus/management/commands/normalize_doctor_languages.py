@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from medinexus.languages import parse_languages
+from medinexus.models import DoctorProfile
+
+class Command(BaseCommand):
+    help = 'Parse every doctor\'s languages_spoken into indexed language codes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+
+        for doctor in DoctorProfile.objects.only('id', 'languages_spoken', 'languages').iterator(chunk_size=batch_size):
+            codes = parse_languages(doctor.languages_spoken)
+            if codes != doctor.languages:
+                doctor.languages = codes
+                batch.append(doctor)
+
+            if len(batch) >= batch_size:
+                DoctorProfile.objects.bulk_update(batch, ['languages'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            DoctorProfile.objects.bulk_update(batch, ['languages'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Normalized languages for {updated} doctors'))
+        if updated:
+            self.stdout.write('Run rebuild_search_index to refresh the search documents')
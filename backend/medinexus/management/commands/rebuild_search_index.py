@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from medinexus import search
+from medinexus.models import DoctorProfile
+
+class Command(BaseCommand):
+    help = 'Rebuild the doctor search index for every doctor'
+
+    def handle(self, *args, **options):
+        count = 0
+        for doctor in DoctorProfile.objects.select_related('user').iterator(chunk_size=500):
+            search.refresh_doctor_index(doctor)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {count} doctors'))
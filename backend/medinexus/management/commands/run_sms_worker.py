@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from medinexus.notifications import get_sms_provider
+from medinexus.sms_outbox import OutboxWorker
+
+class Command(BaseCommand):
+    help = 'Send queued SMS messages from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None, help='Number of sender threads')
+        parser.add_argument('--rate', type=float, default=None, help='Maximum messages per second')
+        parser.add_argument('--provider', default=None, help="SMS provider ('twilio' or 'fake')")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            provider=get_sms_provider(options['provider']),
+            concurrency=options['concurrency'],
+            rate_per_second=options['rate']
+        )
+
+        try:
+            if options['once']:
+                count = worker.run_once()
+                self.stdout.write(self.style.SUCCESS(f'Processed {count} messages'))
+            else:
+                self.stdout.write('SMS worker started')
+                worker.run_forever(poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
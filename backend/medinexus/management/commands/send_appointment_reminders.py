@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from medinexus.reminders import dispatch_reminders
+
+class Command(BaseCommand):
+    help = 'Queue SMS reminders for upcoming scheduled appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-hours', type=float, default=24, help='Remind appointments starting within this many hours')
+        parser.add_argument('--bucket-minutes', type=int, default=60, help='Width of each scanned time bucket')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Appointments claimed per query')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a daemon')
+        parser.add_argument('--interval', type=int, default=300, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            totals = dispatch_reminders(
+                lead=timedelta(hours=options['lead_hours']),
+                bucket=timedelta(minutes=options['bucket_minutes']),
+                batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Queued {totals['queued']} reminders "
+                f"({totals['claimed']} appointments, {totals['skipped']} without a phone number)"
+            ))
+
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
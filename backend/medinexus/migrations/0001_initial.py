@@ -0,0 +1,287 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:38
+
+from django.conf import settings
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension, TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import medinexus.models
+import uuid
+
+TRIGRAM_OPERATOR_COST_SQL = """
+DO $$
+BEGIN
+    ALTER FUNCTION word_similarity_commutator_op(text, text) COST {cost};
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE WARNING 'Could not set the cost of the pg_trgm %%> operator';
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # GiST equality on doctor_id in appointment_no_overlap
+        BtreeGistExtension(),
+        # gin_trgm_ops in doctor_search_trgm_idx and TrigramWordSimilarity in search
+        TrigramExtension(),
+        # pg_trgm prices %> like a comparison, so the planner would rather
+        # compute word_similarity for every doctor in a sequential scan than
+        # use doctor_search_trgm_idx (see benchmark_doctor_search). Skipped
+        # where the database role does not own the extension's functions.
+        migrations.RunSQL(
+            TRIGRAM_OPERATOR_COST_SQL.format(cost=100),
+            TRIGRAM_OPERATOR_COST_SQL.format(cost=1),
+        ),
+        migrations.CreateModel(
+            name='Appointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('requested', 'Requested'), ('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('no_show', 'No Show')], default='requested', max_length=20)),
+                ('appointment_type', models.CharField(choices=[('video', 'Video Call'), ('chat', 'Chat Consultation'), ('in_person', 'In-Person Visit')], default='video', max_length=20)),
+                ('symptoms', models.TextField(blank=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('video_call_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('reminded_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChatbotConversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversation_id', models.CharField(max_length=100, unique=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('context_summary', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PatientProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(blank=True, max_length=15)),
+                ('address', models.TextField(blank=True)),
+                ('date_of_birth', models.DateField(blank=True, null=True)),
+                ('preferred_language', models.CharField(choices=[('en', 'English'), ('hi', 'Hindi'), ('pa', 'Punjabi')], default='en', max_length=10)),
+                ('emergency_contact_name', models.CharField(blank=True, max_length=100)),
+                ('emergency_contact_number', models.CharField(blank=True, max_length=15)),
+                ('profile_picture', models.ImageField(blank=True, null=True, upload_to='patient_profiles/')),
+                ('thumbnails', models.JSONField(blank=True, default=dict)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='patient_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('storage_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='stored_blob_orphan_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SMSOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=128, unique=True)),
+                ('to_number', models.CharField(max_length=20)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('message_sid', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'SMS Outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Prescription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('medications', models.TextField()),
+                ('instructions', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('follow_up_date', models.DateField(blank=True, null=True)),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prescription', to='medinexus.appointment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('appointment', 'Appointment Reminder'), ('prescription', 'New Prescription'), ('message', 'New Message'), ('system', 'System Notification')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('related_object_id', models.IntegerField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MedicalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('file', models.FileField(upload_to='medical_records/')),
+                ('record_date', models.DateField()),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('record_type', models.CharField(blank=True, max_length=50)),
+                ('thumbnails', models.JSONField(blank=True, default=dict)),
+                ('blob', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='medinexus.storedblob')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medical_records', to='medinexus.patientprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DoctorProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(choices=[('general', 'General Physician'), ('cardiology', 'Cardiology'), ('dermatology', 'Dermatology'), ('neurology', 'Neurology'), ('pediatrics', 'Pediatrics'), ('psychiatry', 'Psychiatry'), ('orthopedics', 'Orthopedics'), ('gynecology', 'Gynecology'), ('ophthalmology', 'Ophthalmology'), ('ent', 'ENT Specialist')], default='general', max_length=50)),
+                ('license_number', models.CharField(blank=True, max_length=50)),
+                ('experience_years', models.PositiveIntegerField(default=0)),
+                ('phone_number', models.CharField(blank=True, max_length=15)),
+                ('bio', models.TextField(blank=True)),
+                ('consultation_fee', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('languages_spoken', models.CharField(blank=True, help_text='Comma separated languages', max_length=200)),
+                ('languages', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=20), blank=True, default=list, editable=False, size=None)),
+                ('profile_picture', models.ImageField(blank=True, null=True, upload_to='doctor_profiles/')),
+                ('thumbnails', models.JSONField(blank=True, default=dict)),
+                ('search_document', models.TextField(blank=True, editable=False)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='doctor_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DoctorAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('is_available', models.BooleanField(default=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='medinexus.doctorprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Doctor Availabilities',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChatbotMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_type', models.CharField(choices=[('user', 'User Message'), ('bot', 'Bot Message'), ('system', 'System Message')], max_length=10)),
+                ('content', models.TextField()),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='medinexus.chatbotconversation')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='chatbotconversation',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chatbot_conversations', to='medinexus.patientprofile'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='medinexus.doctorprofile'),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='medinexus.patientprofile'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.BigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('chunk_checksums', models.JSONField(blank=True, default=dict)),
+                ('record_fields', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('expired', 'Expired')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='medinexus.patientprofile')),
+                ('record', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='medinexus.medicalrecord')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='upload_session_expiry_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['patient', 'uploaded_at', 'id'], name='medical_record_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='doctor_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='doctor_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='doctorprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['languages'], name='doctor_languages_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctorprofile',
+            index=models.Index(fields=['specialization'], name='doctor_specialization_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='doctoravailability',
+            unique_together={('doctor', 'day_of_week', 'start_time', 'end_time')},
+        ),
+        migrations.AddIndex(
+            model_name='chatbotmessage',
+            index=models.Index(fields=['conversation', 'timestamp'], name='chatbot_message_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date_time'], name='appointment_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date_time', 'id'], name='appointment_doctor_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date_time', 'id'], name='appointment_patient_hist_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('end_time__isnull', False), ('status__in', ['requested', 'scheduled', 'in_progress'])), expressions=[('doctor', '='), (medinexus.models.TsTzRange('date_time', 'end_time'), '&&')], name='appointment_no_overlap'),
+        ),
+    ]
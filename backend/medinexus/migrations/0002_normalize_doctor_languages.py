@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from medinexus.languages import parse_languages
+
+
+def normalize_languages(apps, schema_editor):
+    """Parse existing languages_spoken text into indexed language codes"""
+    DoctorProfile = apps.get_model('medinexus', 'DoctorProfile')
+    batch = []
+    for doctor in DoctorProfile.objects.only('id', 'languages_spoken', 'languages').iterator(chunk_size=500):
+        codes = parse_languages(doctor.languages_spoken)
+        if codes != doctor.languages:
+            doctor.languages = codes
+            batch.append(doctor)
+        if len(batch) >= 500:
+            DoctorProfile.objects.bulk_update(batch, ['languages'])
+            batch = []
+    if batch:
+        DoctorProfile.objects.bulk_update(batch, ['languages'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medinexus', '0001_initial'),
+    ]
+
+    operations = [
+        # languages is left as parsed on reverse; languages_spoken is untouched
+        migrations.RunPython(normalize_languages, migrations.RunPython.noop),
+    ]
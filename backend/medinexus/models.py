@@ -1,7 +1,22 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+# Appointment statuses that occupy the doctor's time slot; a pending request
+# holds the slot so two patients cannot both request it
+BLOCKING_APPOINTMENT_STATUSES = ['requested', 'scheduled', 'in_progress']
+
+class TsTzRange(models.Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
 class PatientProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='patient_profile')
     phone_number = models.CharField(max_length=15, blank=True)
@@ -15,6 +30,9 @@ class PatientProfile(models.Model):
     emergency_contact_name = models.CharField(max_length=100, blank=True)
     emergency_contact_number = models.CharField(max_length=15, blank=True)
     profile_picture = models.ImageField(upload_to='patient_profiles/', null=True, blank=True)
+    # Size name -> thumbnail name, plus the source they were made from
+    # (see medinexus.thumbnails)
+    thumbnails = models.JSONField(default=dict, blank=True)
     
     def __str__(self):
         return f"{self.user.username}'s Patient Profile"
@@ -41,7 +59,23 @@ class DoctorProfile(models.Model):
     bio = models.TextField(blank=True)
     consultation_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     languages_spoken = models.CharField(max_length=200, blank=True, help_text="Comma separated languages")
+    # Language codes parsed from languages_spoken on save (see medinexus.languages)
+    languages = ArrayField(models.CharField(max_length=20), default=list, blank=True, editable=False)
     profile_picture = models.ImageField(upload_to='doctor_profiles/', null=True, blank=True)
+    thumbnails = models.JSONField(default=dict, blank=True)
+    
+    # Maintained by medinexus.search; requires the pg_trgm extension,
+    # installed by migration 0001_initial
+    search_document = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='doctor_search_vector_idx'),
+            GinIndex(fields=['search_document'], opclasses=['gin_trgm_ops'], name='doctor_search_trgm_idx'),
+            GinIndex(fields=['languages'], name='doctor_languages_idx'),
+            models.Index(fields=['specialization'], name='doctor_specialization_idx'),
+        ]
     
     def __str__(self):
         return f"Dr. {self.user.username} ({self.get_specialization_display()})"
@@ -80,6 +114,8 @@ class Appointment(models.Model):
         ('no_show', 'No Show'),
     ]
     
+    BLOCKING_STATUSES = BLOCKING_APPOINTMENT_STATUSES
+    
     APPOINTMENT_TYPE_CHOICES = [
         ('video', 'Video Call'),
         ('chat', 'Chat Consultation'),
@@ -97,18 +133,72 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     video_call_id = models.CharField(max_length=100, blank=True, null=True)
+    # Set by the send_appointment_reminders command once a reminder is queued
+    reminded_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'date_time'], name='appointment_status_time_idx'),
+            models.Index(fields=['doctor', 'date_time', 'id'], name='appointment_doctor_history_idx'),
+            models.Index(fields=['patient', 'date_time', 'id'], name='appointment_patient_hist_idx'),
+        ]
+        constraints = [
+            # Requires the btree_gist extension, installed by migration 0001_initial
+            ExclusionConstraint(
+                name='appointment_no_overlap',
+                expressions=[
+                    ('doctor', RangeOperators.EQUAL),
+                    (TsTzRange('date_time', 'end_time'), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=BLOCKING_APPOINTMENT_STATUSES, end_time__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"Appointment: {self.patient.user.username} with Dr. {self.doctor.user.username} on {self.date_time}"
 
+class StoredBlob(models.Model):
+    """
+    A file stored once under the SHA-256 of its content and shared by every
+    record that references it (see medinexus.blobs)
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    storage_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time a reference was taken or dropped, for garbage collection
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='stored_blob_orphan_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.ref_count} refs)"
+
 class MedicalRecord(models.Model):
     patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE, related_name='medical_records')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     file = models.FileField(upload_to='medical_records/')
+    # Set for files uploaded since deduplicated storage; file then holds
+    # the blob's storage name
+    blob = models.ForeignKey(
+        StoredBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='records'
+    )
     record_date = models.DateField()
     uploaded_at = models.DateTimeField(auto_now_add=True)
     record_type = models.CharField(max_length=50, blank=True)
+    # Preview images of image records (see medinexus.thumbnails)
+    thumbnails = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'uploaded_at', 'id'], name='medical_record_timeline_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.patient.user.username}"
@@ -129,6 +219,9 @@ class ChatbotConversation(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Key symptom words from messages older than the context window
+    # (see medinexus.chatbot_context)
+    context_summary = models.TextField(blank=True, default='')
     
     def __str__(self):
         return f"Conversation with {self.patient.user.username} ({self.conversation_id})"
@@ -145,6 +238,11 @@ class ChatbotMessage(models.Model):
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp'], name='chatbot_message_history_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.get_message_type_display()} in {self.conversation.conversation_id}"
 
@@ -165,4 +263,84 @@ class Notification(models.Model):
     related_object_id = models.IntegerField(null=True, blank=True)
     
     def __str__(self):
-        return f"{self.notification_type} for {self.user.username}: {self.title}"
\ No newline at end of file
+        return f"{self.notification_type} for {self.user.username}: {self.title}"
+
+class SMSOutbox(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    idempotency_key = models.CharField(max_length=128, unique=True)
+    to_number = models.CharField(max_length=20)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    message_sid = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name_plural = 'SMS Outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"SMS to {self.to_number} ({self.status})"
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload of a medical record file
+    (see medinexus.uploads)
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('expired', 'Expired'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Optional SHA-256 of the whole file, checked when the upload completes
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Chunk index (as a string) -> SHA-256 of each chunk received so far
+    chunk_checksums = models.JSONField(default=dict, blank=True)
+    # Title, description, record_date and record_type for the MedicalRecord
+    record_fields = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    record = models.OneToOneField(
+        MedicalRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='upload_session_expiry_idx'),
+        ]
+    
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def chunk_length(self, index):
+        """Expected size in bytes of chunk index"""
+        if index == self.chunk_count - 1:
+            return self.total_size - self.chunk_size * index
+        return self.chunk_size
+    
+    @property
+    def missing_chunks(self):
+        return [index for index in range(self.chunk_count) if str(index) not in self.chunk_checksums]
+    
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.status})"
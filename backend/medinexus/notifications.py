@@ -1,4 +1,5 @@
 import os
+import threading
 from twilio.rest import Client
 from dotenv import load_dotenv
 
@@ -10,13 +11,107 @@ TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
 
+# SMS provider: 'twilio', or 'fake' to record messages in process
+SMS_PROVIDER = os.getenv('SMS_PROVIDER', 'twilio')
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+# Appointment reminder text per PatientProfile.preferred_language
+REMINDER_TEMPLATES = {
+    'en': (
+        "Reminder: Hello {patient_name}, you have an appointment with Dr. {doctor_name} "
+        "on {date} at {time}. "
+        "Please login to MediNexus 10 minutes before your appointment time."
+    ),
+    'hi': (
+        "अनुस्मारक: नमस्ते {patient_name}, आपकी डॉ. {doctor_name} के साथ "
+        "{date} को {time} बजे अपॉइंटमेंट है। "
+        "कृपया अपॉइंटमेंट के समय से 10 मिनट पहले MediNexus में लॉगिन करें।"
+    ),
+    'pa': (
+        "ਯਾਦ-ਦਹਾਨੀ: ਸਤ ਸ੍ਰੀ ਅਕਾਲ {patient_name}, ਤੁਹਾਡੀ ਡਾ. {doctor_name} ਨਾਲ "
+        "{date} ਨੂੰ {time} ਵਜੇ ਮੁਲਾਕਾਤ ਹੈ। "
+        "ਕਿਰਪਾ ਕਰਕੇ ਮੁਲਾਕਾਤ ਦੇ ਸਮੇਂ ਤੋਂ 10 ਮਿੰਟ ਪਹਿਲਾਂ MediNexus ਵਿੱਚ ਲੌਗਇਨ ਕਰੋ।"
+    ),
+}
+
+def appointment_reminder_body(patient_name, doctor_name, date, time, language='en'):
+    """
+    Render the appointment reminder in the patient's language
+
+    Falls back to English for unknown languages.
+    """
+    template = REMINDER_TEMPLATES.get(language, REMINDER_TEMPLATES['en'])
+    return template.format(patient_name=patient_name, doctor_name=doctor_name, date=date, time=time)
+
+class TwilioSMSProvider:
+    """
+    Sends SMS through Twilio, reusing one HTTP client for every message
+    """
+    def __init__(self, client=None, from_number=None):
+        self.client = client or Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        self.from_number = from_number or TWILIO_PHONE_NUMBER
+
+    def send(self, to_number, message_body):
+        """
+        Send one message
+
+        Returns:
+            str: The provider message id
+        """
+        message = self.client.messages.create(
+            body=message_body,
+            from_=self.from_number,
+            to=to_number
+        )
+        return message.sid
+
+class FakeSMSProvider:
+    """
+    In-process SMS provider that records messages instead of sending them
+
+    Args:
+        failures (int): Number of sends that should fail before succeeding
+    """
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, to_number, message_body):
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise RuntimeError('Simulated SMS provider failure')
+            sid = f"FAKE{len(self.sent) + 1:08d}"
+            self.sent.append({'sid': sid, 'to': to_number, 'body': message_body})
+            return sid
+
+def get_sms_provider(name=None):
+    """
+    Get the shared provider instance for this process
+
+    Args:
+        name (str): 'twilio' or 'fake' (default: SMS_PROVIDER)
+    """
+    name = name or SMS_PROVIDER
+    with _providers_lock:
+        if name not in _providers:
+            if name == 'fake':
+                _providers[name] = FakeSMSProvider()
+            elif name == 'twilio':
+                _providers[name] = TwilioSMSProvider()
+            else:
+                raise ValueError(f"Unknown SMS provider: {name}")
+        return _providers[name]
+
 class SMSNotification:
     """
     Class to handle SMS notifications using Twilio
     """
-    def __init__(self):
-        self.client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        self.from_number = TWILIO_PHONE_NUMBER
+    def __init__(self, provider=None):
+        self.provider = provider or get_sms_provider()
 
     def send_appointment_confirmation(self, to_number, patient_name, doctor_name, date, time):
         """
@@ -40,7 +135,7 @@ class SMSNotification:
         
         return self._send_sms(to_number, message_body)
     
-    def send_appointment_reminder(self, to_number, patient_name, doctor_name, date, time):
+    def send_appointment_reminder(self, to_number, patient_name, doctor_name, date, time, language='en'):
         """
         Send appointment reminder SMS
         
@@ -50,15 +145,12 @@ class SMSNotification:
             doctor_name (str): Doctor's name
             date (str): Appointment date
             time (str): Appointment time
+            language (str): Message language ('en', 'hi' or 'pa')
         
         Returns:
             dict: Response from Twilio API
         """
-        message_body = (
-            f"Reminder: Hello {patient_name}, you have an appointment with Dr. {doctor_name} "
-            f"tomorrow at {time}. "
-            f"Please login to MediNexus 10 minutes before your appointment time."
-        )
+        message_body = appointment_reminder_body(patient_name, doctor_name, date, time, language)
         
         return self._send_sms(to_number, message_body)
     
@@ -92,14 +184,10 @@ class SMSNotification:
             dict: Response from Twilio API
         """
         try:
-            message = self.client.messages.create(
-                body=message_body,
-                from_=self.from_number,
-                to=to_number
-            )
+            message_sid = self.provider.send(to_number, message_body)
             return {
                 'status': 'success',
-                'message_sid': message.sid,
+                'message_sid': message_sid,
                 'to': to_number
             }
         except Exception as e:
@@ -0,0 +1,51 @@
+"""
+Server push over Channels
+
+Every connected client joins a per-user group, named after the Django user
+id or, for Supabase logins, the Supabase auth UUID; chat messages and
+notifications are fanned out to the groups of the users they concern.
+Pushes are best effort: clients that miss events resync over REST.
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+def user_group(user_id):
+    """Name of the channel layer group a user's connections join"""
+    return f"user.{user_id}"
+
+async def apush_to_users(user_ids, event, payload):
+    """
+    Send an event to every connection of the given users
+
+    Args:
+        user_ids: Recipient Django user ids or Supabase user UUIDs
+        event (str): Event name, e.g. 'notification' or 'chat_message'
+        payload (dict): JSON-serializable event data
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    message = {'type': 'push.event', 'event': event, 'payload': payload}
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        try:
+            await channel_layer.group_send(user_group(user_id), message)
+        except Exception as e:
+            logger.warning("Failed to push %s to user %s: %s", event, user_id, e)
+
+def push_to_users(user_ids, event, payload):
+    """Synchronous wrapper around apush_to_users for views and signals"""
+    async_to_sync(apush_to_users)(user_ids, event, payload)
+
+def push_notification(user_id, notification):
+    """Push a new notification row to its recipient"""
+    push_to_users([user_id], 'notification', notification)
+
+def push_chat_message(participant_ids, message):
+    """Push a new chat message to the conversation participants"""
+    push_to_users(participant_ids, 'chat_message', message)
@@ -0,0 +1,106 @@
+"""
+Push Supabase rows to WebSocket clients
+
+Chat messages and notifications are written to Supabase by the frontend,
+by this backend and by database triggers. A trigger on each table sends the
+new row's id on the medinexus_events channel with NOTIFY; RealtimeListener
+holds a LISTEN connection to the Supabase database, loads each announced
+row and pushes it to the groups of the Supabase users it concerns (see
+consumers.UserEventsConsumer). Events announced while the listener is down
+are not replayed; clients resync over REST.
+"""
+
+import json
+import logging
+import select
+
+import psycopg2
+
+from .realtime import push_chat_message, push_notification
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'medinexus_events'
+
+NOTIFICATION_QUERY = 'SELECT row_to_json(n) FROM notifications n WHERE n.id = %s'
+CHAT_MESSAGE_QUERY = """
+    SELECT row_to_json(m), c.patient_id, c.doctor_id
+    FROM chat_messages m JOIN chat_conversations c ON c.id = m.conversation_id
+    WHERE m.id = %s
+"""
+
+class RealtimeListener:
+    """
+    Relays NOTIFY events from the Supabase database to the channel layer
+
+    Args:
+        dsn (str): Connection string of the Supabase database
+    """
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.connection = None
+
+    def connect(self):
+        self.connection = psycopg2.connect(self.dsn)
+        self.connection.set_session(autocommit=True)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def dispatch(self, event):
+        """
+        Load the row an event announces and push it
+
+        Returns:
+            bool: Whether a row was pushed
+        """
+        table, row_id = event.get('table'), event.get('id')
+        with self.connection.cursor() as cursor:
+            if table == 'notifications':
+                cursor.execute(NOTIFICATION_QUERY, [row_id])
+                row = cursor.fetchone()
+                if row is None:
+                    return False
+                push_notification(row[0]['user_id'], row[0])
+            elif table == 'chat_messages':
+                cursor.execute(CHAT_MESSAGE_QUERY, [row_id])
+                row = cursor.fetchone()
+                if row is None:
+                    return False
+                message, patient_id, doctor_id = row
+                push_chat_message([patient_id, doctor_id], message)
+            else:
+                return False
+        return True
+
+    def run_once(self, timeout=5.0):
+        """
+        Wait up to timeout seconds for events and dispatch them
+
+        Returns:
+            int: Number of rows pushed
+        """
+        if select.select([self.connection], [], [], timeout) == ([], [], []):
+            return 0
+
+        self.connection.poll()
+        pushed = 0
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            try:
+                pushed += self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Failed to push realtime event %s", notify.payload)
+        return pushed
+
+    def run_forever(self, timeout=5.0):
+        self.connect()
+        try:
+            while True:
+                self.run_once(timeout)
+        finally:
+            self.close()
@@ -0,0 +1,182 @@
+"""
+Serving medical record files
+
+Local files are served with ETag revalidation and single-range requests.
+Full responses go through FileResponse, which hands the open file to the
+server's wsgi.file_wrapper (sendfile) where available. When
+RECORD_SENDFILE_HEADER is set (e.g. X-Accel-Redirect behind nginx), the
+response only carries that header and the front-end server sends the bytes,
+ranges included. Files in Supabase Storage are served through short-lived
+signed URLs.
+
+Signed URLs for local files point back at the download endpoint with a
+TimestampSigner token, so they work without an Authorization header (e.g.
+in an <img> tag) until they expire.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+)
+from django.urls import reverse
+from django.utils.http import content_disposition_header, urlencode
+
+from .record_storage import LocalStorage, get_record_storage
+
+SIGNER_SALT = 'medinexus.records.download'
+COPY_BUFFER_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def sign_record(record_id):
+    return signing.TimestampSigner(salt=SIGNER_SALT).sign(str(record_id))
+
+def verify_signature(record_id, token):
+    """Whether token is an unexpired signature for record_id"""
+    try:
+        value = signing.TimestampSigner(salt=SIGNER_SALT).unsign(token, max_age=settings.RECORD_URL_TTL)
+    except signing.BadSignature:
+        return False
+    return value == str(record_id)
+
+def signed_url(request, record):
+    """
+    Get a short-lived URL for a record's file
+
+    Returns:
+        str: An absolute URL valid for RECORD_URL_TTL seconds
+    """
+    storage = get_record_storage()
+    if not isinstance(storage, LocalStorage):
+        return storage.signed_url(record.file.name, settings.RECORD_URL_TTL)
+
+    path = reverse('download_record', args=[record.id])
+    return request.build_absolute_uri(f"{path}?{urlencode({'signature': sign_record(record.id)})}")
+
+def etag_for(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [candidate.strip().removeprefix('W/') for candidate in header.split(',')]
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header
+
+    Returns:
+        tuple: (start, end) inclusive, or None to serve the whole file
+            (no header, or a multi-range or malformed one)
+
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the file
+    """
+    match = _RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or (last and int(last) < start):
+            raise RangeNotSatisfiable()
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            piece = file.read(min(COPY_BUFFER_SIZE, length))
+            if not piece:
+                break
+            length -= len(piece)
+            yield piece
+
+def serve_record(request, record):
+    """
+    Build the response for a record's file: served from local disk, or a
+    redirect to a signed URL for other backends
+    """
+    storage = get_record_storage()
+    if isinstance(storage, LocalStorage):
+        if record.blob is None:
+            return serve_local(request, record.file.name, storage)
+        # Deduplicated files are named by digest: take the name and type
+        # from the upload, and the digest makes a stable ETag
+        session = getattr(record, 'upload_session', None)
+        return serve_local(
+            request,
+            record.file.name,
+            storage,
+            filename=session.filename if session else None,
+            content_type=record.blob.content_type,
+            etag=f'"{record.blob.sha256}"'
+        )
+    return HttpResponseRedirect(storage.signed_url(record.file.name, settings.RECORD_URL_TTL))
+
+def serve_local(request, name, storage, filename=None, content_type=None, etag=None):
+    """
+    Build the response for a file stored on local disk
+
+    The download filename, content type and ETag default to ones derived
+    from the stored name and the file's size and mtime.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = etag or etag_for(stat)
+    filename = filename or os.path.basename(name)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    if settings.RECORD_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        response[settings.RECORD_SENDFILE_HEADER] = settings.RECORD_SENDFILE_PREFIX + quote(name)
+    else:
+        # A stale If-Range means the client's partial copy is outdated
+        if_range = request.META.get('HTTP_IF_RANGE')
+        byte_range = None
+        if not if_range or if_range == etag:
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{stat.st_size}"
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f"bytes {start}-{end}/{stat.st_size}"
+            response['Content-Length'] = str(end - start + 1)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
@@ -0,0 +1,132 @@
+"""
+Storage backends for medical record files
+
+LocalStorage keeps files under MEDIA_ROOT; it is the default and stands in
+for Supabase Storage in development and tests. SupabaseStorage puts files in
+the private medical_records bucket. Both take files that are already on
+local disk and stream them, so no backend needs a whole file in memory.
+"""
+
+import os
+import shutil
+import threading
+
+from django.conf import settings
+
+RECORDS_BUCKET = 'medical_records'
+LIST_PAGE_SIZE = 100
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+class LocalStorage:
+    """
+    Stores files on the local filesystem
+
+    Args:
+        root (str): Directory files are stored under (default: MEDIA_ROOT)
+    """
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or settings.MEDIA_ROOT)
+
+    def path(self, name):
+        """Absolute path of a stored file; rejects names outside the root"""
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage name: {name}")
+        return path
+
+    def save(self, name, source_path, content_type=None):
+        """
+        Move a local file into storage under name
+
+        Returns:
+            str: The stored name
+        """
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source_path, target)
+        return name
+
+    def open(self, name):
+        return open(self.path(name), 'rb')
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+class SupabaseStorage:
+    """
+    Stores files in a Supabase Storage bucket
+
+    Args:
+        bucket (str): Bucket name (default: medical_records)
+    """
+    def __init__(self, bucket=RECORDS_BUCKET):
+        self.bucket = bucket
+
+    @property
+    def client(self):
+        # Imported lazily: the Supabase module requires SUPABASE_KEY
+        from .supabase import supabase
+        return supabase.storage.from_(self.bucket)
+
+    def save(self, name, source_path, content_type='application/octet-stream'):
+        """
+        Upload a local file, streaming it from disk, then remove the local copy
+
+        Returns:
+            str: The stored name
+        """
+        with open(source_path, 'rb') as source:
+            # Upsert: blobs are named by content, so an existing file is identical
+            self.client.upload(name, source, {'content-type': content_type, 'x-upsert': 'true'})
+        os.remove(source_path)
+        return name
+
+    def signed_url(self, name, expires_in):
+        """Get a URL for a private file that expires after expires_in seconds"""
+        from .supabase import get_signed_file_url
+        return get_signed_file_url(self.bucket, name, expires_in)
+
+    def exists(self, name):
+        # list() returns one page of a prefix search; page through the
+        # matches so a full folder cannot hide the file
+        folder, _, filename = name.rpartition('/')
+        offset = 0
+        while True:
+            items = self.client.list(folder, {'search': filename, 'limit': LIST_PAGE_SIZE, 'offset': offset})
+            if any(item.get('name') == filename for item in items):
+                return True
+            if len(items) < LIST_PAGE_SIZE:
+                return False
+            offset += LIST_PAGE_SIZE
+
+    def delete(self, name):
+        self.client.remove([name])
+
+def get_record_storage(name=None):
+    """
+    Get the shared storage backend for medical record files
+
+    Args:
+        name (str): 'local' or 'supabase' (default: RECORD_STORAGE_BACKEND)
+    """
+    name = name or settings.RECORD_STORAGE_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            if name == 'local':
+                _backends[name] = LocalStorage()
+            elif name == 'supabase':
+                _backends[name] = SupabaseStorage()
+            else:
+                raise ValueError(f"Unknown record storage backend: {name}")
+        return _backends[name]
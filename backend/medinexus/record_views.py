@@ -0,0 +1,262 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_date
+from django.utils.translation import gettext_lazy as _
+
+from .models import Appointment, MedicalRecord, UploadSession
+from .record_storage import get_record_storage
+from .roles import request_role
+from .thumbnails import is_image, thumbnail_name
+from . import record_downloads, uploads
+
+def _session_data(session):
+    return {
+        'upload_id': str(session.id),
+        'status': session.status,
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'missing_chunks': session.missing_chunks,
+        'expires_at': session.expires_at,
+        'record_id': session.record_id
+    }
+
+def _record_data(record):
+    return {
+        'id': record.id,
+        'title': record.title,
+        'description': record.description,
+        'record_date': record.record_date,
+        'record_type': record.record_type,
+        'uploaded_at': record.uploaded_at
+    }
+
+def _records_for_role(role):
+    """
+    Records a user may read: a patient's own, and for doctors those of
+    patients they have an appointment with
+    """
+    records = MedicalRecord.objects.select_related('blob', 'upload_session')
+    if role.is_patient:
+        return records.filter(patient=role.patient)
+    if role.is_doctor:
+        return records.filter(Exists(
+            Appointment.objects.filter(patient=OuterRef('patient'), doctor=role.doctor)
+        ))
+    return MedicalRecord.objects.none()
+
+def _get_session(request, upload_id):
+    """
+    Get one of the requesting patient's upload sessions, or None
+    """
+    role = request_role(request)
+    if not role.is_patient:
+        return None
+    try:
+        return UploadSession.objects.get(id=upload_id, patient=role.patient)
+    except UploadSession.DoesNotExist:
+        return None
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """
+    Start a chunked, resumable medical record upload
+
+    If the patient already has a file with the given sha256 on record, the
+    upload is created complete and no chunks need to be sent. Otherwise the
+    client PUTs each chunk of chunk_size bytes to
+    .../chunks/<index> with its SHA-256 in the X-Chunk-SHA256 header, and
+    POSTs .../complete when no chunks are missing.
+    """
+    role = request_role(request)
+    if not role.is_patient:
+        return Response(
+            {'error': _('Only patients can upload medical records')},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    filename = request.data.get('filename')
+    try:
+        total_size = int(request.data.get('size'))
+        chunk_size = int(request.data['chunk_size']) if request.data.get('chunk_size') else None
+    except (TypeError, ValueError):
+        return Response(
+            {'error': _('Invalid file or chunk size')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not filename:
+        return Response(
+            {'error': _('Filename is required')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    record_date = request.data.get('record_date')
+    if record_date and parse_date(record_date) is None:
+        return Response(
+            {'error': _('Invalid record date format. Use YYYY-MM-DD')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        session = uploads.create_session(
+            role.patient,
+            filename,
+            total_size,
+            content_type=request.data.get('content_type', ''),
+            sha256=request.data.get('sha256', ''),
+            chunk_size=chunk_size,
+            record_fields={
+                'title': request.data.get('title', ''),
+                'description': request.data.get('description', ''),
+                'record_date': record_date,
+                'record_type': request.data.get('record_type', '')
+            }
+        )
+    except uploads.UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(_session_data(session), status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_upload(request, upload_id):
+    """
+    Get an upload's status and the chunks still missing, to resume it
+    """
+    session = _get_session(request, upload_id)
+    if session is None:
+        return Response(
+            {'error': _('Upload not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response(_session_data(session))
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def upload_chunk(request, upload_id, index):
+    """
+    Upload one chunk as the raw request body
+
+    The body is streamed to disk rather than read into memory.
+    """
+    session = _get_session(request, upload_id)
+    if session is None:
+        return Response(
+            {'error': _('Upload not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    checksum = request.META.get('HTTP_X_CHUNK_SHA256')
+    if not checksum:
+        return Response(
+            {'error': _('X-Chunk-SHA256 header is required')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if request.stream is None:
+        return Response(
+            {'error': _('Chunk body is required')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        uploads.write_chunk(session, index, request.stream, checksum)
+    except uploads.UploadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(_session_data(session))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_upload(request, upload_id):
+    """
+    Assemble an upload whose chunks have all arrived into a MedicalRecord
+    """
+    session = _get_session(request, upload_id)
+    if session is None:
+        return Response(
+            {'error': _('Upload not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        record = uploads.complete_session(session)
+    except uploads.UploadError as e:
+        return Response(
+            {'error': str(e), 'missing_chunks': session.missing_chunks},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(_record_data(record), status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def download_record(request, record_id):
+    """
+    Download a medical record's file
+
+    Requires either authentication as someone who may read the record, or
+    the signature from a signed URL. Supports Range, If-Range and
+    If-None-Match. With ?preview=small or ?preview=medium the preview image
+    of an image record is served instead, or the image itself until the
+    preview is ready.
+    """
+    signature = request.query_params.get('signature')
+    if signature:
+        if not record_downloads.verify_signature(record_id, signature):
+            return Response(
+                {'error': _('Download link is invalid or has expired')},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        records = MedicalRecord.objects.select_related('blob', 'upload_session')
+    elif request.user.is_authenticated:
+        records = _records_for_role(request_role(request))
+    else:
+        return Response(
+            {'error': _('Authentication credentials were not provided')},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    preview = request.query_params.get('preview')
+    try:
+        record = records.get(id=record_id)
+        if preview:
+            if not is_image(record.file.name):
+                raise FileNotFoundError(preview)
+            # Images are served in full until their preview is rendered
+            name = thumbnail_name(record, 'file', preview)
+            if name is not None:
+                return record_downloads.serve_local(request, name, get_record_storage('local'))
+        return record_downloads.serve_record(request, record)
+    except (MedicalRecord.DoesNotExist, FileNotFoundError):
+        return Response(
+            {'error': _('Medical record not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def record_signed_url(request, record_id):
+    """
+    Get a short-lived download URL for a medical record's file
+    """
+    try:
+        record = _records_for_role(request_role(request)).get(id=record_id)
+    except MedicalRecord.DoesNotExist:
+        return Response(
+            {'error': _('Medical record not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response({
+        'url': record_downloads.signed_url(request, record),
+        'expires_in': settings.RECORD_URL_TTL
+    })
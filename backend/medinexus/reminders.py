@@ -0,0 +1,105 @@
+"""
+Bulk appointment reminders
+
+Scans upcoming scheduled appointments in time buckets, claims each batch by
+setting Appointment.reminded_at, and queues the rendered reminders in the SMS
+outbox with one bulk insert in the same transaction, so a batch is either
+both marked and queued or neither. Sending happens in the SMS worker. The
+marker and the per-appointment idempotency keys make reruns safe.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, SMSOutbox
+from .notifications import appointment_reminder_body
+
+def _claim_batch(bucket_start, bucket_end, after, batch_size, now):
+    """
+    Lock and mark the next batch of unreminded appointments in a bucket
+
+    Must run in the transaction that queues the batch's reminders.
+
+    Returns:
+        list: Appointments with patient and doctor users loaded
+    """
+    appointments = Appointment.objects.filter(
+        status='scheduled',
+        reminded_at__isnull=True,
+        date_time__gte=bucket_start,
+        date_time__lt=bucket_end
+    )
+    if after is not None:
+        appointments = appointments.filter(
+            Q(date_time__gt=after[0]) | Q(date_time=after[0], id__gt=after[1])
+        )
+
+    batch = list(
+        appointments.select_related('patient__user', 'doctor__user')
+        .select_for_update(skip_locked=True, of=('self',))
+        .order_by('date_time', 'id')[:batch_size]
+    )
+    Appointment.objects.filter(id__in=[a.id for a in batch]).update(reminded_at=now)
+    return batch
+
+def _reminder_message(appointment):
+    patient = appointment.patient
+    local_time = timezone.localtime(appointment.date_time)
+    body = appointment_reminder_body(
+        f"{patient.user.first_name} {patient.user.last_name}".strip() or patient.user.username,
+        f"{appointment.doctor.user.first_name} {appointment.doctor.user.last_name}".strip(),
+        local_time.strftime('%d-%m-%Y'),
+        local_time.strftime('%H:%M'),
+        patient.preferred_language
+    )
+    return SMSOutbox(
+        idempotency_key=f"reminder:{appointment.id}",
+        to_number=patient.phone_number,
+        body=body
+    )
+
+def dispatch_reminders(lead=timedelta(hours=24), bucket=timedelta(hours=1), batch_size=1000, now=None):
+    """
+    Queue reminders for scheduled appointments starting within lead
+
+    Args:
+        lead (timedelta): How far ahead to remind
+        bucket (timedelta): Width of each scanned time bucket
+        batch_size (int): Appointments claimed per query
+        now (datetime): Current time (default: timezone.now())
+
+    Returns:
+        dict: Numbers of appointments claimed, reminders queued and
+            appointments skipped for lack of a phone number
+    """
+    now = now or timezone.now()
+    horizon = now + lead
+    totals = {'claimed': 0, 'queued': 0, 'skipped': 0}
+
+    bucket_start = now
+    while bucket_start < horizon:
+        bucket_end = min(bucket_start + bucket, horizon)
+        after = None
+
+        while True:
+            with transaction.atomic():
+                batch = _claim_batch(bucket_start, bucket_end, after, batch_size, now)
+                messages = [_reminder_message(a) for a in batch if a.patient.phone_number]
+                SMSOutbox.objects.bulk_create(messages, ignore_conflicts=True)
+            if not batch:
+                break
+
+            totals['claimed'] += len(batch)
+            totals['queued'] += len(messages)
+            totals['skipped'] += len(batch) - len(messages)
+
+            if len(batch) < batch_size:
+                break
+            after = (batch[-1].date_time, batch[-1].id)
+
+        bucket_start = bucket_end
+
+    return totals
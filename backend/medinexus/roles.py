@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from .models import DoctorProfile, PatientProfile
+
+DOCTOR = 'doctor'
+PATIENT = 'patient'
+
+@dataclass(frozen=True)
+class UserRole:
+    """
+    The role of an authenticated user and the matching profile
+    """
+    kind: Optional[str]
+    doctor: Optional[DoctorProfile] = None
+    patient: Optional[PatientProfile] = None
+
+    @property
+    def is_doctor(self):
+        return self.kind == DOCTOR
+
+    @property
+    def is_patient(self):
+        return self.kind == PATIENT
+
+    @property
+    def profile(self):
+        return self.doctor if self.is_doctor else self.patient
+
+    @property
+    def profile_id(self):
+        profile = self.profile
+        return profile.id if profile is not None else None
+
+def resolve_role(user):
+    """
+    Resolve a user's role from their doctor/patient profiles
+
+    Uses the profiles already loaded through select_related when present,
+    otherwise reloads the user with both profiles in one joined query.
+    Doctors take precedence, as in the original hasattr() checks.
+
+    Returns:
+        UserRole: The resolved role
+    """
+    if not user.is_authenticated:
+        return UserRole(kind=None)
+
+    cls = type(user)
+    if not (cls.doctor_profile.is_cached(user) and cls.patient_profile.is_cached(user)):
+        user = cls.objects.select_related('doctor_profile', 'patient_profile').get(pk=user.pk)
+
+    doctor = getattr(user, 'doctor_profile', None)
+    if doctor is not None:
+        return UserRole(kind=DOCTOR, doctor=doctor)
+
+    patient = getattr(user, 'patient_profile', None)
+    if patient is not None:
+        return UserRole(kind=PATIENT, patient=patient)
+
+    return UserRole(kind=None)
+
+def request_role(request):
+    """
+    Get the role of the requesting user, resolving it once per request
+    """
+    role = getattr(request, 'role', None)
+    if role is None:
+        role = resolve_role(request.user)
+        request.role = role
+    return role
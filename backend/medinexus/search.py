@@ -0,0 +1,89 @@
+"""
+Doctor search index
+
+Each DoctorProfile carries a denormalized, transliterated search_document
+(trigram-indexed for fuzzy matching) and a weighted search_vector
+(GIN-indexed for ranked full-text matching). Both are refreshed from
+signals whenever a doctor or their user account is saved.
+"""
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+)
+from django.db.models import F, Q, TextField, Value
+
+from .languages import language_names
+from .models import DoctorProfile
+from .transliteration import normalize
+
+# Common Hindi/Punjabi terms (already transliterated) for each specialization
+SPECIALIZATION_KEYWORDS = {
+    'general': 'samanya chikitsak doctor vaid',
+    'cardiology': 'hriday dil rog heart',
+    'dermatology': 'tvacha chamdi rog skin',
+    'neurology': 'tantrika dimag nas rog',
+    'pediatrics': 'bal shishu bachche rog',
+    'psychiatry': 'manasik man rog',
+    'orthopedics': 'haddi jod rog',
+    'gynecology': 'stri mahila rog',
+    'ophthalmology': 'netra ankh akh rog',
+    'ent': 'kan nak gala',
+}
+
+def _document_parts(doctor):
+    name = normalize(f"{doctor.user.first_name} {doctor.user.last_name}")
+    specialization = normalize(
+        f"{doctor.specialization} {doctor.get_specialization_display()} "
+        f"{SPECIALIZATION_KEYWORDS.get(doctor.specialization, '')}"
+    )
+    languages = normalize(' '.join(language_names(doctor.languages)))
+    bio = normalize(doctor.bio)
+    return name, specialization, languages, bio
+
+def refresh_doctor_index(doctor):
+    """
+    Rebuild the search document and vector of one doctor
+
+    Uses a queryset update so no save signals fire again.
+    """
+    name, specialization, languages, bio = _document_parts(doctor)
+
+    def vector(text, weight):
+        return SearchVector(Value(text, output_field=TextField()), weight=weight, config='simple')
+
+    DoctorProfile.objects.filter(id=doctor.id).update(
+        search_document=' '.join(part for part in (name, specialization, languages, bio) if part),
+        search_vector=(
+            vector(name, 'A') + vector(specialization, 'B') +
+            vector(languages, 'C') + vector(bio, 'D')
+        )
+    )
+
+def search(query, doctors=None):
+    """
+    Filter and rank doctors for a free-text query
+
+    Matches on prefix full-text terms or on trigram word similarity, so
+    misspellings and Hindi/Punjabi transliterations still hit. Results are
+    ordered by full-text rank, then similarity.
+    """
+    if doctors is None:
+        doctors = DoctorProfile.objects.all()
+
+    normalized = normalize(query)
+    if not normalized:
+        return doctors.order_by('id')
+
+    search_query = SearchQuery(
+        ' & '.join(f'{token}:*' for token in normalized.split()),
+        search_type='raw',
+        config='simple'
+    )
+
+    return doctors.annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+        similarity=TrigramWordSimilarity(normalized, 'search_document'),
+    ).filter(
+        Q(search_vector=search_query) |
+        Q(search_document__trigram_word_similar=normalized)
+    ).order_by('-rank', '-similarity', 'id')
@@ -23,14 +23,17 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
+    'channels',
     'medinexus',
 ]
 
@@ -64,6 +67,61 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'medinexus.wsgi.application'
+ASGI_APPLICATION = 'medinexus.asgi.application'
+
+# Channel layer for WebSocket push; in-memory by default (single process),
+# Redis via channels_redis when REDIS_URL is set
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+                'capacity': 100,
+                'expiry': 60,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {
+                'capacity': 100,
+                'expiry': 60,
+            },
+        },
+    }
+
+# Cache shared by every worker (slot indexes, auth users, timelines): Redis
+# when REDIS_URL is set. The local-memory fallback is per process, so
+# invalidations only reach the process that made the write; it is only
+# suitable for a single-process development server (see checks.py).
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+# Supabase users connect to the WebSocket with their Supabase access token,
+# verified with the project's JWT secret. Rows written to Supabase (by the
+# frontend or by database triggers) are pushed by the listen_realtime_events
+# command, which LISTENs on the Supabase database (see
+# medinexus.realtime_listener).
+SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET', '')
+SUPABASE_DB_URL = os.getenv('SUPABASE_DB_URL', '')
+
+# Events buffered per WebSocket before the client is asked to resync
+WEBSOCKET_MAX_PENDING_EVENTS = 100
 
 # Database
 DATABASES = {
@@ -103,13 +161,42 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Uploaded files
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Thumbnails of profile pictures and record previews (see medinexus.thumbnails)
+THUMBNAIL_SIZES = {'small': (96, 96), 'medium': (320, 320)}
+THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'WEBP')
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '80'))
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))
+
+# Medical record storage ('local' under MEDIA_ROOT, or 'supabase') and
+# chunked uploads (see medinexus.uploads)
+RECORD_STORAGE_BACKEND = os.getenv('RECORD_STORAGE_BACKEND', 'local')
+UPLOAD_STAGING_DIR = os.getenv('UPLOAD_STAGING_DIR', os.path.join(MEDIA_ROOT, 'uploads'))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(5 * 1024 * 1024)))
+UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', str(512 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+# Unreferenced deduplicated files are kept this long before collect_blobs
+# deletes them (see medinexus.blobs)
+BLOB_GC_GRACE_HOURS = int(os.getenv('BLOB_GC_GRACE_HOURS', '24'))
+
+# Record downloads (see medinexus.record_downloads). Set the sendfile header
+# (e.g. X-Accel-Redirect) to let the front-end server send local files from
+# an internal location mapped to MEDIA_ROOT.
+RECORD_URL_TTL = int(os.getenv('RECORD_URL_TTL', '300'))
+RECORD_SENDFILE_HEADER = os.getenv('RECORD_SENDFILE_HEADER', '')
+RECORD_SENDFILE_PREFIX = os.getenv('RECORD_SENDFILE_PREFIX', '/protected-media/')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'medinexus.auth.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -132,6 +219,9 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Authenticated users in the shared cache (see medinexus.auth)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '300'))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 CORS_ALLOWED_ORIGINS = [
@@ -139,7 +229,49 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:5173',
 ]
 
+# Appointment slot engine
+APPOINTMENT_SLOT_MINUTES = int(os.getenv('APPOINTMENT_SLOT_MINUTES', '30'))
+SLOT_HORIZON_DAYS = int(os.getenv('SLOT_HORIZON_DAYS', '28'))
+SLOT_CACHE_TIMEOUT = 60 * 60
+
+# Patient timeline pages (see medinexus.timeline); writes invalidate them,
+# the timeout bounds staleness of doctor names and of writes that skip signals
+TIMELINE_CACHE_TIMEOUT = int(os.getenv('TIMELINE_CACHE_TIMEOUT', '60'))
+
 # Twilio settings
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
\ No newline at end of file
+TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+
+# SMS outbox worker (see medinexus.sms_outbox)
+SMS_PROVIDER = os.getenv('SMS_PROVIDER', 'twilio')
+SMS_WORKER_CONCURRENCY = int(os.getenv('SMS_WORKER_CONCURRENCY', '8'))
+SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', '10'))
+SMS_MAX_ATTEMPTS = int(os.getenv('SMS_MAX_ATTEMPTS', '5'))
+# Identical messages to one number without an idempotency key are only
+# collapsed within this window
+SMS_DEDUPE_WINDOW_SECONDS = int(os.getenv('SMS_DEDUPE_WINDOW_SECONDS', '600'))
+# Chatbot inference (see medinexus.chatbot). The model is loaded on first use;
+# set CHATBOT_PRELOAD on workers dedicated to the chatbot to warm it at startup.
+CHATBOT_MODEL = os.getenv('CHATBOT_MODEL', 'google/flan-t5-small')
+CHATBOT_MAX_NEW_TOKENS = int(os.getenv('CHATBOT_MAX_NEW_TOKENS', '128'))
+CHATBOT_PRELOAD = os.getenv('CHATBOT_PRELOAD', 'False') == 'True'
+CHATBOT_LOAD_RETRY_SECONDS = int(os.getenv('CHATBOT_LOAD_RETRY_SECONDS', '30'))
+# Micro-batching (see medinexus.inference); replies that send no text for the
+# timeout fall back to the rule-based triage
+CHATBOT_MAX_BATCH_SIZE = int(os.getenv('CHATBOT_MAX_BATCH_SIZE', '8'))
+CHATBOT_MAX_WAIT_MS = float(os.getenv('CHATBOT_MAX_WAIT_MS', '50'))
+CHATBOT_MAX_QUEUE = int(os.getenv('CHATBOT_MAX_QUEUE', '64'))
+CHATBOT_REPLY_TIMEOUT = float(os.getenv('CHATBOT_REPLY_TIMEOUT', '10'))
+# Per-process cache of model replies to repeated questions
+CHATBOT_CACHE_SIZE = int(os.getenv('CHATBOT_CACHE_SIZE', '5000'))
+CHATBOT_CACHE_TTL = int(os.getenv('CHATBOT_CACHE_TTL', str(24 * 60 * 60)))
+# Conversation context window (see medinexus.chatbot_context)
+CHATBOT_CONTEXT_MESSAGES = int(os.getenv('CHATBOT_CONTEXT_MESSAGES', '6'))
+CHATBOT_CONTEXT_MESSAGE_CHARS = int(os.getenv('CHATBOT_CONTEXT_MESSAGE_CHARS', '200'))
+CHATBOT_SUMMARY_WORDS = int(os.getenv('CHATBOT_SUMMARY_WORDS', '40'))
+CHATBOT_CONTEXT_CACHE_SIZE = int(os.getenv('CHATBOT_CONTEXT_CACHE_SIZE', '10000'))
+CHATBOT_CONTEXT_CACHE_TTL = int(os.getenv('CHATBOT_CONTEXT_CACHE_TTL', str(30 * 60)))
+
+# Maximum median worker startup time (see the check_import_budget command)
+IMPORT_BUDGET_SECONDS = float(os.getenv('IMPORT_BUDGET_SECONDS', '3.0'))
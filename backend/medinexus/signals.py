@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, realtime, search, slots, thumbnails, timeline
+from .auth import invalidate_cached_user
+from .languages import parse_languages
+from .models import (
+    Appointment, ChatbotMessage, DoctorAvailability, DoctorProfile, MedicalRecord, Notification,
+    PatientProfile, Prescription
+)
+
+# Cache invalidation runs on commit so a concurrent reader cannot repopulate
+# the cache with rows from before the write
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=DoctorAvailability)
+def invalidate_doctor_slots(sender, instance, **kwargs):
+    """Invalidate cached slots when appointments or availability change"""
+    doctor_id = instance.doctor_id
+    transaction.on_commit(lambda: slots.invalidate_doctor(doctor_id))
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=MedicalRecord)
+def invalidate_patient_timeline(sender, instance, **kwargs):
+    """Appointments and records appear on the patient's timeline"""
+    patient_id = instance.patient_id
+    transaction.on_commit(lambda: timeline.invalidate_patient(patient_id))
+
+@receiver([post_save, post_delete], sender=Prescription)
+def invalidate_prescription_timeline(sender, instance, **kwargs):
+    """Prescriptions are shown on their appointment's timeline entry"""
+    patient_id = instance.appointment.patient_id
+    transaction.on_commit(lambda: timeline.invalidate_patient(patient_id))
+
+@receiver([post_save, post_delete], sender=ChatbotMessage)
+def invalidate_chatbot_timeline(sender, instance, **kwargs):
+    """Chatbot messages appear on the patient's timeline"""
+    patient_id = instance.conversation.patient_id
+    transaction.on_commit(lambda: timeline.invalidate_patient(patient_id))
+
+@receiver([post_save, post_delete], sender=DoctorProfile)
+def invalidate_specialization_slots(sender, instance, **kwargs):
+    """Invalidate specialization indexes when doctors join, leave or move"""
+    transaction.on_commit(slots.invalidate_specializations)
+
+@receiver(pre_save, sender=DoctorProfile)
+def normalize_doctor_languages(sender, instance, **kwargs):
+    """Derive indexed language codes from the free-text languages_spoken"""
+    instance.languages = parse_languages(instance.languages_spoken)
+
+@receiver(post_save, sender=DoctorProfile)
+def refresh_doctor_search(sender, instance, **kwargs):
+    """Keep the doctor search index in step with profile edits"""
+    search.refresh_doctor_index(instance)
+
+@receiver(post_save, sender=User)
+def refresh_user_doctor_search(sender, instance, update_fields=None, **kwargs):
+    """Doctor names live on User, so name changes refresh the index too"""
+    if update_fields and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    doctor = DoctorProfile.objects.select_related('user').filter(user_id=instance.id).first()
+    if doctor is not None:
+        search.refresh_doctor_index(doctor)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """Deactivation and other account changes drop the cached user"""
+    user_id = instance.id
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+@receiver([post_save, post_delete], sender=DoctorProfile)
+@receiver([post_save, post_delete], sender=PatientProfile)
+def invalidate_profile_auth_cache(sender, instance, **kwargs):
+    """Creating or removing a profile changes the user's role"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    """Push new notifications to the recipient's open WebSocket connections"""
+    if not created:
+        return
+    payload = {
+        'id': instance.id,
+        'notification_type': instance.notification_type,
+        'title': instance.title,
+        'message': instance.message,
+        'is_read': instance.is_read,
+        'created_at': instance.created_at.isoformat(),
+        'related_object_id': instance.related_object_id,
+    }
+    transaction.on_commit(lambda: realtime.push_notification(instance.user_id, payload))
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_save, sender=PatientProfile)
+def generate_profile_thumbnails(sender, instance, **kwargs):
+    """Render square thumbnails when a profile picture is added or replaced"""
+    thumbnails.refresh(instance, 'profile_picture', crop=True)
+
+@receiver(post_save, sender=MedicalRecord)
+def generate_record_previews(sender, instance, **kwargs):
+    """Render previews of image records; PDFs keep no preview"""
+    thumbnails.refresh(instance, 'file', crop=False, images_only=True)
+
+@receiver(post_delete, sender=MedicalRecord)
+def release_record_blob(sender, instance, **kwargs):
+    """Drop the deleted record's reference to its stored file"""
+    if instance.blob_id is not None:
+        blob_id = instance.blob_id
+        transaction.on_commit(lambda: blobs.release(blob_id))
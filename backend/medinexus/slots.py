@@ -0,0 +1,224 @@
+"""
+Bookable slot engine
+
+Expands DoctorAvailability weekly templates into concrete, timezone-aware
+slots, subtracts booked appointments and caches the result per doctor.
+Entries are stored under a per-doctor version token that signals replace
+whenever a doctor's appointments or availability change. Readers take the
+token before querying, so an entry built from data read before a change
+lands under the old token and is never served.
+"""
+
+import bisect
+import heapq
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, DoctorAvailability, DoctorProfile
+
+SLOT_MINUTES = getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+HORIZON_DAYS = getattr(settings, 'SLOT_HORIZON_DAYS', 28)
+CACHE_TIMEOUT = getattr(settings, 'SLOT_CACHE_TIMEOUT', 60 * 60)
+
+# Per-process copy of each specialization's merged slot index, tagged with
+# the version token held in the shared cache so invalidations are observed
+_specialization_index = {}
+
+def _doctor_key(doctor_id):
+    return f'slots:doctor:{doctor_id}'
+
+def _doctor_version_key(doctor_id):
+    return f'slots:doctor:{doctor_id}:version'
+
+def _specialization_key(specialization):
+    return f'slots:specialization:{specialization}'
+
+def slot_length():
+    return timedelta(minutes=SLOT_MINUTES)
+
+def expand_availability(windows, start_date, days, tz=None):
+    """
+    Expand weekly availability windows into concrete slots
+
+    Args:
+        windows: Iterable of (day_of_week, start_time, end_time)
+        start_date (date): First day of the horizon
+        days (int): Number of days to expand
+        tz: Timezone the windows are expressed in (default: TIME_ZONE)
+
+    Returns:
+        list: Sorted, de-duplicated (start, end) aware datetimes
+    """
+    tz = tz or timezone.get_default_timezone()
+    length = slot_length()
+
+    by_day = {}
+    for day_of_week, start_time, end_time in windows:
+        by_day.setdefault(day_of_week, []).append((start_time, end_time))
+
+    slots = set()
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        for start_time, end_time in by_day.get(day.weekday(), []):
+            start = timezone.make_aware(datetime.combine(day, start_time), tz)
+            window_end = timezone.make_aware(datetime.combine(day, end_time), tz)
+            while start + length <= window_end:
+                slots.add((start, start + length))
+                start += length
+
+    return sorted(slots)
+
+def subtract_intervals(slots, booked):
+    """
+    Remove every slot overlapping a booked interval
+
+    Booked intervals are sorted and merged first so a single forward pass
+    over both lists is enough.
+
+    Args:
+        slots: Sorted list of (start, end)
+        booked: Iterable of (start, end) in any order
+
+    Returns:
+        list: The free slots, still sorted
+    """
+    merged = []
+    for start, end in sorted(booked):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    free = []
+    position = 0
+    for start, end in slots:
+        while position < len(merged) and merged[position][1] <= start:
+            position += 1
+        if position < len(merged) and merged[position][0] < end:
+            continue
+        free.append((start, end))
+    return free
+
+def _build_doctor_entry(doctor_id, today):
+    length = slot_length()
+    tz = timezone.get_default_timezone()
+    horizon_start = timezone.make_aware(datetime.combine(today, datetime.min.time()), tz)
+    horizon_end = horizon_start + timedelta(days=HORIZON_DAYS)
+
+    windows = list(
+        DoctorAvailability.objects.filter(doctor_id=doctor_id, is_available=True)
+        .order_by('day_of_week', 'start_time')
+        .values_list('day_of_week', 'start_time', 'end_time')
+    )
+
+    booked = []
+    for date_time, end_time in Appointment.objects.filter(
+        Q(end_time__gt=horizon_start) | Q(end_time__isnull=True, date_time__gt=horizon_start - length),
+        doctor_id=doctor_id,
+        date_time__lt=horizon_end,
+        status__in=Appointment.BLOCKING_STATUSES
+    ).order_by('date_time').values_list('date_time', 'end_time'):
+        booked.append((date_time, end_time or date_time + length))
+
+    slots = expand_availability(windows, today, HORIZON_DAYS, tz)
+    return {
+        'generated_on': today,
+        'windows': windows,
+        'booked': booked,
+        'free': subtract_intervals(slots, booked),
+    }
+
+def doctor_schedule(doctor_id):
+    """
+    Get the cached schedule entry for a doctor, rebuilding it when missing
+
+    Returns:
+        dict: generated_on, windows, booked and free slot lists
+    """
+    today = timezone.localdate()
+    key = f"{_doctor_key(doctor_id)}:{_version(_doctor_version_key(doctor_id))}"
+    entry = cache.get(key)
+    if entry is None or entry['generated_on'] != today:
+        entry = _build_doctor_entry(doctor_id, today)
+        cache.set(key, entry, CACHE_TIMEOUT)
+    return entry
+
+def free_slots(doctor_id, start=None, end=None, limit=None):
+    """
+    Get a doctor's free slots between start (default: now) and end
+
+    Returns:
+        list: (start, end) aware datetimes
+    """
+    slots = doctor_schedule(doctor_id)['free']
+    position = bisect.bisect_left(slots, (start or timezone.now(),))
+
+    result = []
+    for slot in slots[position:]:
+        if end is not None and slot[0] >= end:
+            break
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(slot)
+    return result
+
+def _build_specialization_index(specialization):
+    doctor_ids = list(
+        DoctorProfile.objects.filter(specialization=specialization).values_list('id', flat=True)
+    )
+    streams = [
+        [(start, end, doctor_id) for start, end in doctor_schedule(doctor_id)['free']]
+        for doctor_id in doctor_ids
+    ]
+    return list(heapq.merge(*streams))
+
+def next_free_slots(specialization, count=10, after=None):
+    """
+    Get the next free slots across all doctors of a specialization
+
+    The merged index is kept in process memory and only rebuilt when the
+    version token in the shared cache changes, so a warm lookup is one
+    cache read plus a bisect.
+
+    Returns:
+        list: (start, end, doctor_id) tuples in chronological order
+    """
+    today = timezone.localdate()
+    version = _version(_specialization_key(specialization))
+
+    local = _specialization_index.get(specialization)
+    if local is None or local[0] != version or local[1] != today:
+        local = (version, today, _build_specialization_index(specialization))
+        _specialization_index[specialization] = local
+
+    index = local[2]
+    position = bisect.bisect_left(index, (after or timezone.now(),))
+    return index[position:position + count]
+
+def _version(key):
+    """Get the version token stored under key, publishing one if missing"""
+    version = cache.get(key)
+    if version is None:
+        # Only one process gets to publish a new version; the rest adopt it
+        cache.add(key, uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+def _bump(specializations):
+    cache.set_many({_specialization_key(value): uuid.uuid4().hex for value in specializations}, CACHE_TIMEOUT)
+
+def invalidate_specializations():
+    """Invalidate every specialization index; they are rebuilt from doctor entries"""
+    _bump(value for value, _label in DoctorProfile.SPECIALIZATION_CHOICES)
+
+def invalidate_doctor(doctor_id):
+    """Invalidate a doctor's cached schedule and their specialization's index"""
+    cache.set(_doctor_version_key(doctor_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+    specialization = DoctorProfile.objects.filter(id=doctor_id).values_list('specialization', flat=True).first()
+    if specialization is not None:
+        _bump([specialization])
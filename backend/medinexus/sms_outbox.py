@@ -0,0 +1,222 @@
+"""
+Durable SMS outbox
+
+Requests enqueue messages into the SMSOutbox table and return immediately;
+OutboxWorker (run by the run_sms_worker management command) claims due rows,
+sends them concurrently through the configured provider with rate limiting,
+and reschedules failures with exponential backoff.
+"""
+
+import hashlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import SMSOutbox
+from .notifications import SMSNotification, get_sms_provider
+
+logger = logging.getLogger(__name__)
+
+def make_idempotency_key(to_number, message_body, now=None):
+    """
+    Derive a key from the message itself so identical sends within one
+    SMS_DEDUPE_WINDOW_SECONDS window collapse
+
+    The window number is part of the key, so the same text can be sent
+    again later, e.g. a repeat prescription or a reminder on another date.
+    """
+    window = int((now or timezone.now()).timestamp() // settings.SMS_DEDUPE_WINDOW_SECONDS)
+    digest = hashlib.sha256(f"{to_number}\n{message_body}".encode()).hexdigest()
+    return f"sms:{digest}:{window}"
+
+def enqueue_sms(to_number, message_body, idempotency_key=None):
+    """
+    Add a message to the outbox unless its idempotency key is already there
+
+    Without a key, the message is deduplicated against identical messages
+    from the current and the previous window, so a retry just after a
+    window boundary still collapses.
+
+    Returns:
+        SMSOutbox: The new or previously queued message
+    """
+    key = idempotency_key
+    if key is None:
+        now = timezone.now()
+        key = make_idempotency_key(to_number, message_body, now)
+        previous = make_idempotency_key(
+            to_number, message_body, now - timedelta(seconds=settings.SMS_DEDUPE_WINDOW_SECONDS)
+        )
+        existing = SMSOutbox.objects.filter(idempotency_key__in=[key, previous]).first()
+        if existing is not None:
+            return existing
+
+    try:
+        with transaction.atomic():
+            return SMSOutbox.objects.create(
+                idempotency_key=key,
+                to_number=to_number,
+                body=message_body
+            )
+    except IntegrityError:
+        return SMSOutbox.objects.get(idempotency_key=key)
+
+class QueuedSMSNotification(SMSNotification):
+    """
+    SMSNotification that writes to the outbox instead of calling the provider
+
+    Args:
+        idempotency_key (str): Optional client-supplied key for the message
+    """
+    def __init__(self, idempotency_key=None):
+        self.idempotency_key = idempotency_key
+
+    def _send_sms(self, to_number, message_body):
+        message = enqueue_sms(to_number, message_body, self.idempotency_key)
+        return {
+            'status': 'queued',
+            'outbox_id': message.id,
+            'outbox_status': message.status,
+            'to': to_number
+        }
+
+class RateLimiter:
+    """
+    Thread-safe token bucket
+
+    Args:
+        rate (float): Tokens added per second
+        burst (int): Bucket size (default: one second's worth)
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class OutboxWorker:
+    """
+    Claims due outbox rows and sends them concurrently
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    workers can share one outbox. A claimed row is leased until
+    lease_seconds from now; if the worker dies mid-send, the row becomes
+    due again once the lease expires.
+
+    Args:
+        provider: Object with send(to_number, body) -> sid
+            (default: the configured provider)
+        concurrency (int): Number of sender threads
+        rate_per_second (float): Maximum sends per second
+        batch_size (int): Rows claimed per round
+        max_attempts (int): Attempts before a message is marked failed
+        backoff_seconds (float): Base delay for exponential backoff
+        lease_seconds (float): How long a claimed row stays reserved
+    """
+    def __init__(self, provider=None, concurrency=None, rate_per_second=None,
+                 batch_size=100, max_attempts=None, backoff_seconds=30, lease_seconds=300):
+        self.provider = provider or get_sms_provider()
+        self.concurrency = concurrency or getattr(settings, 'SMS_WORKER_CONCURRENCY', 8)
+        self.limiter = RateLimiter(rate_per_second or getattr(settings, 'SMS_RATE_PER_SECOND', 10))
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='sms-worker')
+
+    def claim(self):
+        """
+        Reserve a batch of due messages
+
+        Returns:
+            list: The claimed SMSOutbox rows
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                SMSOutbox.objects.select_for_update(skip_locked=True)
+                .filter(Q(status='pending') | Q(status='sending'), next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            SMSOutbox.objects.filter(id__in=ids).update(
+                status='sending',
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=self.lease_seconds)
+            )
+        return list(SMSOutbox.objects.filter(id__in=ids))
+
+    def _deliver(self, message):
+        self.limiter.acquire()
+        try:
+            return message, self.provider.send(message.to_number, message.body), None
+        except Exception as e:
+            return message, None, e
+
+    def _backoff(self, attempts):
+        delay = self.backoff_seconds * (2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def run_once(self):
+        """
+        Claim and send one batch
+
+        Returns:
+            int: Number of messages processed
+        """
+        messages = self.claim()
+        if not messages:
+            return 0
+
+        # Provider calls run in the pool; database writes stay on this thread
+        now = timezone.now()
+        for message, message_sid, error in self.executor.map(self._deliver, messages):
+            if error is None:
+                SMSOutbox.objects.filter(id=message.id).update(
+                    status='sent', message_sid=message_sid, sent_at=now, last_error=''
+                )
+            elif message.attempts >= self.max_attempts:
+                logger.error("Giving up on SMS %s after %s attempts: %s", message.id, message.attempts, error)
+                SMSOutbox.objects.filter(id=message.id).update(status='failed', last_error=str(error))
+            else:
+                SMSOutbox.objects.filter(id=message.id).update(
+                    status='pending',
+                    last_error=str(error),
+                    next_attempt_at=now + self._backoff(message.attempts)
+                )
+
+        return len(messages)
+
+    def run_forever(self, poll_interval=1.0, stop_event=None):
+        """
+        Process batches until stop_event is set, sleeping when idle
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            if not self.run_once():
+                stop_event.wait(poll_interval)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
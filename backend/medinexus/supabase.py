@@ -1,7 +1,13 @@
 import os
+import threading
+import uuid
+from datetime import datetime
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from .cache import TTLCache
+from .cursors import InvalidCursor, decode_cursor, encode_cursor
+
 # Load environment variables
 load_dotenv()
 
@@ -14,6 +20,81 @@ if not supabase_key:
 
 supabase: Client = create_client(supabase_url, supabase_key)
 
+class ProfileCache:
+    """
+    Read-through cache for profile rows keyed by (user_type, user_id)
+    
+    Args:
+        store: Backend with get(key), set(key, value) and delete(key);
+            defaults to an in-process LRU with TTL. Pass a SharedCacheStore
+            to share entries between workers.
+    """
+    def __init__(self, store=None):
+        self.store = store or TTLCache(
+            maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "5000")),
+            ttl=int(os.getenv("PROFILE_CACHE_TTL", "300"))
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(user_id, user_type):
+        return f"profile:{'doctor' if user_type == 'doctor' else 'patient'}:{user_id}"
+    
+    def get(self, user_id, user_type):
+        profile = self.store.get(self.key(user_id, user_type))
+        with self._lock:
+            if profile is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return profile
+    
+    def set(self, user_id, user_type, profile):
+        self.store.set(self.key(user_id, user_type), profile)
+    
+    def delete(self, user_id, user_type):
+        self.store.delete(self.key(user_id, user_type))
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+class SharedCacheStore:
+    """
+    Adapts a shared cache such as django.core.cache.cache (e.g. Redis)
+    to the ProfileCache store interface
+    """
+    def __init__(self, backend, timeout=300):
+        self.backend = backend
+        self.timeout = timeout
+    
+    def get(self, key):
+        return self.backend.get(key)
+    
+    def set(self, key, value):
+        self.backend.set(key, value, self.timeout)
+    
+    def delete(self, key):
+        self.backend.delete(key)
+
+profile_cache = ProfileCache()
+
+def configure_profile_cache(store):
+    """Swap the profile cache backend, e.g. for a shared store"""
+    global profile_cache
+    profile_cache = ProfileCache(store)
+
+def profile_cache_stats():
+    """Get profile cache hit/miss counters for this process"""
+    return profile_cache.stats()
+
 # User management functions
 def get_user(user_id):
     """Get user data from Supabase Auth"""
@@ -21,23 +102,40 @@ def get_user(user_id):
     return response.user if response else None
 
 def get_user_profile(user_id, user_type="patient"):
-    """Get user profile from the appropriate table"""
+    """Get user profile from the appropriate table, through the profile cache"""
+    profile = profile_cache.get(user_id, user_type)
+    if profile is not None:
+        return profile
+    
     table = "doctor_profiles" if user_type == "doctor" else "patient_profiles"
     response = supabase.table(table).select("*").eq("user_id", user_id).execute()
-    return response.data[0] if response.data else None
+    profile = response.data[0] if response.data else None
+    if profile is not None:
+        profile_cache.set(user_id, user_type, profile)
+    return profile
+
+def _refresh_cached_profile(user_id, user_type, profile):
+    if profile is not None:
+        profile_cache.set(user_id, user_type, profile)
+    else:
+        profile_cache.delete(user_id, user_type)
 
 def create_user_profile(user_id, profile_data, user_type="patient"):
     """Create a new user profile in the appropriate table"""
     table = "doctor_profiles" if user_type == "doctor" else "patient_profiles"
     profile_data["user_id"] = user_id
     response = supabase.table(table).insert(profile_data).execute()
-    return response.data[0] if response.data else None
+    profile = response.data[0] if response.data else None
+    _refresh_cached_profile(user_id, user_type, profile)
+    return profile
 
 def update_user_profile(user_id, profile_data, user_type="patient"):
     """Update an existing user profile"""
     table = "doctor_profiles" if user_type == "doctor" else "patient_profiles"
     response = supabase.table(table).update(profile_data).eq("user_id", user_id).execute()
-    return response.data[0] if response.data else None
+    profile = response.data[0] if response.data else None
+    _refresh_cached_profile(user_id, user_type, profile)
+    return profile
 
 # Appointment functions
 def get_appointments(user_id, user_type="patient"):
@@ -62,19 +160,121 @@ def get_chat_messages(conversation_id):
     response = supabase.table("chat_messages").select("*").eq("conversation_id", conversation_id).order("created_at").execute()
     return response.data
 
+def _keyset_values(timestamp, row_id):
+    """
+    Validate a (timestamp, uuid) keyset position before it is written into a
+    PostgREST filter, so client-supplied values cannot add filter terms
+    
+    Returns:
+        tuple: The timestamp in ISO format and the canonical uuid
+    
+    Raises:
+        InvalidCursor: If either value is malformed
+    """
+    try:
+        return datetime.fromisoformat(timestamp).isoformat(), str(uuid.UUID(row_id))
+    except (TypeError, ValueError, AttributeError):
+        raise InvalidCursor(f"{timestamp!r}, {row_id!r}")
+
+def _chat_cursor(message):
+    return encode_cursor(message["created_at"], message["id"])
+
+def get_chat_page(conversation_id, limit=50, before=None):
+    """
+    Get the latest page of a conversation, or the page before a cursor
+    
+    Uses the (conversation_id, created_at, id) index, so the cost depends on
+    the page size rather than on the length of the conversation.
+    
+    Args:
+        conversation_id: The conversation to read
+        limit: Maximum number of messages
+        before: before_cursor from a previous page, to load older messages
+        
+    Returns:
+        dict: messages in chronological order and before_cursor for the
+            next older page (None when the start was reached)
+    
+    Raises:
+        InvalidCursor: If before is not a valid cursor
+    """
+    query = supabase.table("chat_messages").select("*").eq("conversation_id", conversation_id)
+    if before:
+        created_at, message_id = _keyset_values(*decode_cursor(before, 2))
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{message_id})'
+        )
+    
+    response = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    messages = response.data or []
+    
+    before_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        before_cursor = _chat_cursor(messages[-1])
+    
+    messages.reverse()
+    return {"messages": messages, "before_cursor": before_cursor}
+
+def get_chat_messages_since(conversation_id, created_at, message_id=None, limit=200):
+    """
+    Get messages newer than a known message, for polling
+    
+    Args:
+        conversation_id: The conversation to read
+        created_at: created_at of the newest message the client has
+        message_id: id of that message, to break created_at ties
+        limit: Maximum number of messages
+        
+    Returns:
+        list: New messages in chronological order
+    
+    Raises:
+        InvalidCursor: If created_at or message_id is malformed
+    """
+    query = supabase.table("chat_messages").select("*").eq("conversation_id", conversation_id)
+    if message_id:
+        created_at, message_id = _keyset_values(created_at, message_id)
+        query = query.or_(
+            f'created_at.gt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.gt.{message_id})'
+        )
+    else:
+        query = query.gt("created_at", created_at)
+    
+    response = query.order("created_at").order("id").limit(limit).execute()
+    return response.data or []
+
 def create_chat_message(message_data):
-    """Create a new chat message"""
+    """
+    Create a new chat message
+    
+    Participants' WebSocket connections receive it through the database
+    trigger and the listen_realtime_events command (see realtime_listener).
+    """
     response = supabase.table("chat_messages").insert(message_data).execute()
     return response.data[0] if response.data else None
 
 # Real-time subscription helpers
 def get_subscription_client():
-    """Get the Supabase client for real-time subscriptions"""
+    """
+    Get the Supabase client for real-time subscriptions
+    
+    New chat messages and notifications, however they are written, are also
+    pushed to clients connected to the ws/events WebSocket (see
+    realtime_listener).
+    """
     return supabase
 
 # Storage functions
 def upload_file(bucket, file_path, file_content, content_type="application/octet-stream"):
-    """Upload a file to Supabase Storage"""
+    """
+    Upload a file to Supabase Storage
+    
+    file_content may be bytes or an open binary file; a file is streamed
+    rather than read into memory (see record_storage.SupabaseStorage).
+    """
     response = supabase.storage.from_(bucket).upload(file_path, file_content, {"content-type": content_type})
     return response
 
@@ -82,6 +282,21 @@ def get_file_url(bucket, file_path):
     """Get a public URL for a file in Supabase Storage"""
     return supabase.storage.from_(bucket).get_public_url(file_path)
 
+def get_signed_file_url(bucket, file_path, expires_in=300):
+    """
+    Get a short-lived URL for a file in a private Supabase Storage bucket
+    
+    Args:
+        bucket: The bucket name
+        file_path: Path of the file in the bucket
+        expires_in: Seconds the URL stays valid
+        
+    Returns:
+        str: The signed URL
+    """
+    response = supabase.storage.from_(bucket).create_signed_url(file_path, expires_in)
+    return response.get('signedURL') or response.get('signedUrl')
+
 # Notification functions
 def create_notification(user_id, type, message, link=None, data=None):
     """
@@ -106,13 +321,39 @@ def create_notification(user_id, type, message, link=None, data=None):
             'data': data
         }).execute()
         
-        if response.data:
-            return response.data[0]
-        return None
+        return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error creating notification: {e}")
         return None
 
+def create_notifications(user_ids, type, message, link=None, data=None):
+    """
+    Create the same notification for many users with a single insert
+    
+    Args:
+        user_ids: The user IDs to notify
+        type: The notification type (appointment, chat, alert, success, info)
+        message: The notification message
+        link: Optional link to redirect to when clicked
+        data: Optional JSON data to include with the notification
+        
+    Returns:
+        List of created notifications or empty list if there was an error
+    """
+    rows = [
+        {'user_id': user_id, 'type': type, 'message': message, 'link': link, 'data': data}
+        for user_id in user_ids
+    ]
+    if not rows:
+        return []
+    
+    try:
+        response = supabase.table('notifications').insert(rows).execute()
+        return response.data or []
+    except Exception as e:
+        print(f"Error creating notifications: {e}")
+        return []
+
 def get_user_notifications(user_id, limit=50, include_read=True):
     """
     Get notifications for a user
@@ -126,7 +367,7 @@ def get_user_notifications(user_id, limit=50, include_read=True):
         List of notifications or empty list if there was an error
     """
     try:
-        query = supabase.table('notifications').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(limit)
+        query = supabase.table('notifications').select('*').eq('user_id', user_id).order('updated_at', desc=True).limit(limit)
         
         if not include_read:
             query = query.eq('is_read', False)
@@ -172,4 +413,113 @@ def mark_all_notifications_as_read(user_id):
         return True
     except Exception as e:
         print(f"Error marking all notifications as read: {e}")
-        return False
\ No newline at end of file
+        return False
+
+# Notification inbox
+# Coalesced notifications move up the inbox when they absorb a new event, so
+# pages are keyed on updated_at rather than created_at
+def _notification_cursor(notification):
+    return encode_cursor(notification['updated_at'], notification['id'])
+
+def _keyset_filter(cursor, operator, inclusive=False):
+    """
+    PostgREST or-filter for rows before/after an (updated_at, id) cursor
+    
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    updated_at, notification_id = _keyset_values(*decode_cursor(cursor, 2))
+    id_operator = f"{operator}e" if inclusive else operator
+    return (
+        f'updated_at.{operator}."{updated_at}",'
+        f'and(updated_at.eq."{updated_at}",id.{id_operator}.{notification_id})'
+    )
+
+def get_unread_notification_count(user_id):
+    """
+    Get the unread badge count from the trigger-maintained counter
+    
+    Returns:
+        int: Number of unread notifications
+    """
+    try:
+        response = supabase.table('notification_counters').select('unread_count').eq('user_id', user_id).execute()
+        return response.data[0]['unread_count'] if response.data else 0
+    except Exception as e:
+        print(f"Error getting unread notification count: {e}")
+        return 0
+
+def get_notification_page(user_id, limit=20, cursor=None, unread_only=False):
+    """
+    Get one page of a user's inbox, newest first
+    
+    Args:
+        user_id: The user ID to get notifications for
+        limit: Maximum number of notifications to return
+        cursor: next_cursor from a previous page
+        unread_only: Only return unread notifications (partial index)
+        
+    Returns:
+        dict: notifications, next_cursor for the following page (None at
+            the end) and newest_cursor, usable as a mark-read boundary
+    
+    Raises:
+        InvalidCursor: If cursor is malformed
+    """
+    keyset = _keyset_filter(cursor, 'lt') if cursor else None
+    try:
+        query = supabase.table('notifications').select('*').eq('user_id', user_id)
+        if unread_only:
+            query = query.eq('is_read', False)
+        if keyset:
+            query = query.or_(keyset)
+        
+        response = query.order('updated_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        notifications = response.data or []
+    except Exception as e:
+        print(f"Error getting notification page: {e}")
+        notifications = []
+    
+    next_cursor = None
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = _notification_cursor(notifications[-1])
+    
+    return {
+        'notifications': notifications,
+        'next_cursor': next_cursor,
+        'newest_cursor': _notification_cursor(notifications[0]) if notifications else None
+    }
+
+def mark_notifications_read(user_id, notification_ids=None, up_to_cursor=None):
+    """
+    Mark many notifications as read in one update
+    
+    Args:
+        user_id: The user whose notifications to mark
+        notification_ids: Explicit notification IDs to mark
+        up_to_cursor: Mark every unread notification at or older than this
+            cursor (e.g. newest_cursor of the page the user has seen).
+            Notifications that absorbed new events since stay unread.
+        
+    Returns:
+        int: Number of notifications marked as read, or -1 on error
+    
+    Raises:
+        InvalidCursor: If up_to_cursor is malformed
+    """
+    if not notification_ids and not up_to_cursor:
+        return 0
+    
+    keyset = _keyset_filter(up_to_cursor, 'lt', inclusive=True) if up_to_cursor else None
+    try:
+        query = supabase.table('notifications').update({'is_read': True}).eq('user_id', user_id).eq('is_read', False)
+        if notification_ids:
+            query = query.in_('id', list(notification_ids))
+        if keyset:
+            query = query.or_(keyset)
+        response = query.execute()
+        return len(response.data or [])
+    except Exception as e:
+        print(f"Error marking notifications as read: {e}")
+        return -1
@@ -0,0 +1,206 @@
+"""
+Async Supabase data-access layer
+
+Talks to the PostgREST API directly over one pooled httpx.AsyncClient per
+event loop, so independent reads can run concurrently and many rows can be
+written in one request.
+
+    async with AsyncSupabase() as db:
+        profile, appointments = await db.gather(
+            db.select('patient_profiles', {'user_id': user_id}),
+            db.select('appointments', {'patient_id': user_id}),
+        )
+"""
+
+import asyncio
+import os
+import weakref
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL", "https://vlszfbcbtxnksbxnbhnf.supabase.co")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+
+# One shared client per running event loop
+_clients = weakref.WeakKeyDictionary()
+
+def _encode_filter(value):
+    """
+    Encode a filter value in PostgREST syntax
+
+    Plain values mean equality; (operator, value) tuples pass other
+    operators through, e.g. ('gt', '2024-01-01') or ('in', [1, 2]).
+    """
+    if isinstance(value, tuple):
+        operator, operand = value
+        if isinstance(operand, (list, tuple, set)):
+            operand = f"({','.join(str(item) for item in operand)})"
+        return f"{operator}.{operand}"
+    if value is None:
+        return "is.null"
+    if isinstance(value, bool):
+        return f"is.{str(value).lower()}"
+    return f"eq.{value}"
+
+class AsyncSupabase:
+    """
+    Async PostgREST client sharing a pooled HTTP session
+
+    Args:
+        url (str): Supabase project URL (default: SUPABASE_URL)
+        key (str): Service or anon key (default: SUPABASE_KEY)
+        max_connections (int): Connection pool size
+        timeout (float): Request timeout in seconds
+        client (httpx.AsyncClient): Existing client to reuse
+    """
+    def __init__(self, url=None, key=None, max_connections=MAX_CONNECTIONS, timeout=10.0, client=None):
+        key = key or SUPABASE_KEY
+        if not key:
+            raise ValueError("SUPABASE_KEY environment variable is not set")
+
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            base_url=f"{(url or SUPABASE_URL).rstrip('/')}/rest/v1/",
+            headers={
+                'apikey': key,
+                'Authorization': f"Bearer {key}",
+                'Content-Type': 'application/json',
+            },
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    @staticmethod
+    def _params(filters=None, **extra):
+        params = {column: _encode_filter(value) for column, value in (filters or {}).items()}
+        params.update({name: value for name, value in extra.items() if value is not None})
+        return params
+
+    async def _request(self, method, table, params=None, json=None, prefer=None):
+        headers = {'Prefer': prefer} if prefer else None
+        response = await self.client.request(method, table, params=params, json=json, headers=headers)
+        response.raise_for_status()
+        return response.json() if response.content else []
+
+    async def select(self, table, filters=None, columns='*', order=None, limit=None):
+        """
+        Select rows
+
+        Args:
+            table (str): Table name
+            filters (dict): Column filters (see _encode_filter)
+            columns (str): Columns to return
+            order (str): PostgREST order, e.g. 'created_at.desc'
+            limit (int): Maximum number of rows
+
+        Returns:
+            list: Matching rows
+        """
+        params = self._params(filters, select=columns, order=order, limit=limit)
+        return await self._request('GET', table, params=params)
+
+    async def insert(self, table, rows):
+        """
+        Insert one row or many rows in a single request
+
+        Returns:
+            list: The inserted rows
+        """
+        return await self._request('POST', table, json=rows, prefer='return=representation')
+
+    async def update(self, table, values, filters):
+        """
+        Apply the same values to every row matching filters
+
+        Returns:
+            list: The updated rows
+        """
+        if not filters:
+            raise ValueError("update() requires at least one filter")
+        return await self._request(
+            'PATCH', table, params=self._params(filters), json=values, prefer='return=representation'
+        )
+
+    async def upsert(self, table, rows, on_conflict='id'):
+        """
+        Insert or update many rows in one request, merging on on_conflict
+
+        Rows must include every NOT NULL column without a default, since
+        PostgREST runs this as INSERT ... ON CONFLICT DO UPDATE.
+
+        Returns:
+            list: The written rows
+        """
+        return await self._request(
+            'POST', table,
+            params={'on_conflict': on_conflict},
+            json=rows,
+            prefer='resolution=merge-duplicates,return=representation'
+        )
+
+    async def gather(self, *aws):
+        """Run independent operations concurrently over the shared pool"""
+        return await asyncio.gather(*aws)
+
+def get_async_supabase():
+    """
+    Get the shared AsyncSupabase for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    db = _clients.get(loop)
+    if db is None:
+        db = AsyncSupabase()
+        _clients[loop] = db
+    return db
+
+async def create_notifications(user_ids, type, message, link=None, data=None):
+    """
+    Create the same notification for many users with one insert
+
+    Returns:
+        list: The created notifications
+    """
+    rows = [
+        {'user_id': user_id, 'type': type, 'message': message, 'link': link, 'data': data}
+        for user_id in user_ids
+    ]
+    if not rows:
+        return []
+    return await get_async_supabase().insert('notifications', rows)
+
+async def get_dashboard(user_id, user_type="patient", notification_limit=20):
+    """
+    Load a user's profile, appointments and notifications concurrently
+
+    Returns:
+        dict: profile, appointments and notifications
+    """
+    db = get_async_supabase()
+    profile_table = "doctor_profiles" if user_type == "doctor" else "patient_profiles"
+    appointment_field = "doctor_id" if user_type == "doctor" else "patient_id"
+
+    profiles, appointments, notifications = await db.gather(
+        db.select(profile_table, {'user_id': user_id}),
+        db.select('appointments', {appointment_field: user_id}, order='appointment_date'),
+        db.select('notifications', {'user_id': user_id}, order='updated_at.desc', limit=notification_limit),
+    )
+    return {
+        'profile': profiles[0] if profiles else None,
+        'appointments': appointments,
+        'notifications': notifications,
+    }
@@ -0,0 +1,388 @@
+"""
+Run with: python manage.py test medinexus.tests
+
+TestCase classes need the PostgreSQL database from settings, with the
+btree_gist and pg_trgm extensions available to the test database.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from datetime import time, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .appointment_views import list_appointments
+from .inference import InferenceEngine, reply_cache_key, stream_answer
+from .languages import language_code, parse_languages
+from .models import (
+    Appointment, DoctorAvailability, DoctorProfile, PatientProfile, SMSOutbox, UploadSession
+)
+from .notifications import FakeSMSProvider
+from .record_storage import get_record_storage
+from .sms_outbox import OutboxWorker, enqueue_sms
+from .triage import triage
+from .uploads import UploadError, complete_session, create_session, staging_dir, write_chunk
+from . import chatbot, record_storage, slots
+
+User = get_user_model()
+
+class ParseLanguagesTests(SimpleTestCase):
+    def test_gurmukhi_and_separates_languages(self):
+        self.assertEqual(parse_languages('ਹਿੰਦੀ ਅਤੇ ਪੰਜਾਬੀ'), ['hi', 'pa'])
+
+    def test_gurmukhi_english(self):
+        self.assertEqual(language_code('ਅੰਗਰੇਜ਼ੀ'), 'en')
+
+    def test_mixed_scripts_and_separators(self):
+        self.assertEqual(parse_languages('ਅੰਗਰੇਜ਼ੀ, ਹਿੰਦੀ ਅਤੇ ਪੰਜਾਬੀ'), ['en', 'hi', 'pa'])
+        self.assertEqual(parse_languages('हिंदी और अंग्रेज़ी'), ['hi', 'en'])
+        self.assertEqual(parse_languages('English and Hindi'), ['en', 'hi'])
+
+    def test_and_inside_a_word_is_not_a_separator(self):
+        self.assertEqual(parse_languages('Band'), ['band'])
+
+class ReplyCacheKeyTests(SimpleTestCase):
+    def test_word_order_without_negation_is_ignored(self):
+        self.assertEqual(reply_cache_key('fever and headache'), reply_cache_key('headache and fever'))
+
+    def test_negation_scope_is_kept(self):
+        self.assertNotEqual(
+            reply_cache_key('I have fever but no headache'),
+            reply_cache_key('I have headache but no fever')
+        )
+
+class StepModel:
+    """Fake model that decodes one word per step, waiting for each release"""
+    def __init__(self, words, steps=None):
+        self.words = words
+        self.steps = steps
+        self.batches = []
+
+    def generate_stream(self, prompts):
+        self.batches.append(list(prompts))
+        for word in self.words:
+            if self.steps is not None:
+                self.steps.acquire()
+            yield [f'{word} '] * len(prompts)
+
+class InferenceStreamingTests(SimpleTestCase):
+    def engine(self, model):
+        engine = InferenceEngine(model_loader=lambda: model, max_batch_size=4, max_wait_ms=50, max_queue=8)
+        self.addCleanup(engine.stop, 2)
+        return engine.start()
+
+    def test_chunks_arrive_while_decoding(self):
+        steps = threading.Semaphore(0)
+        engine = self.engine(StepModel(['rest', 'and', 'fluids'], steps))
+        chunks = engine.submit('prompt').chunks(timeout=2)
+
+        steps.release()
+        self.assertEqual(next(chunks), 'rest ')
+        steps.release(2)
+        self.assertEqual(list(chunks), ['and ', 'fluids '])
+
+    def test_concurrent_prompts_share_a_batch(self):
+        model = StepModel(['ok'])
+        engine = self.engine(model)
+        streams = [engine.submit(f'prompt {index}') for index in range(3)]
+
+        self.assertEqual([''.join(stream.chunks(timeout=2)) for stream in streams], ['ok '] * 3)
+        self.assertEqual(model.batches, [['prompt 0', 'prompt 1', 'prompt 2']])
+
+    def test_model_reply_is_streamed(self):
+        engine = self.engine(StepModel(['drink', 'water']))
+        with mock.patch('medinexus.inference._engine', engine):
+            answer = stream_answer('mild cough', context='Patient: hello\n')
+            self.assertEqual(list(answer), ['drink ', 'water '])
+        self.assertEqual((answer.reply, answer.source), ('drink water', 'model'))
+
+    def test_stalled_model_falls_back_to_triage(self):
+        steps = threading.Semaphore(1)
+        engine = self.engine(StepModel(['drink', 'water'], steps))
+        self.addCleanup(steps.release)
+        with mock.patch('medinexus.inference._engine', engine):
+            answer = stream_answer('mild cough', timeout=0.2, context='Patient: hello\n')
+            chunks = list(answer)
+        self.assertEqual(chunks[0], 'drink ')
+        self.assertEqual(answer.source, 'triage')
+        self.assertTrue(answer.reply.startswith('drink'))
+        self.assertTrue(answer.reply.endswith(triage('mild cough').reply))
+
+    def test_unavailable_model_falls_back_to_triage(self):
+        def unavailable():
+            raise chatbot.ChatbotUnavailable('no model')
+
+        engine = InferenceEngine(model_loader=unavailable, max_batch_size=4, max_wait_ms=10, max_queue=8).start()
+        self.addCleanup(engine.stop, 2)
+        with mock.patch('medinexus.inference._engine', engine):
+            answer = stream_answer('mild cough', context='Patient: hello\n').collect()
+        self.assertEqual((answer.source, answer.reply), ('triage', triage('mild cough').reply))
+
+class ListAppointmentsQueryTests(TestCase):
+    def setUp(self):
+        self.doctor = DoctorProfile.objects.create(
+            user=User.objects.create_user('doctor', first_name='Asha', last_name='Gill'),
+            specialization='cardiology'
+        )
+        self.patient = PatientProfile.objects.create(
+            user=User.objects.create_user('patient', first_name='Ravi', last_name='Kumar')
+        )
+
+    def book(self, count):
+        # One non-overlapping half hour slot per hour after those booked
+        start = timezone.now() + timedelta(days=1, hours=Appointment.objects.count())
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient=self.patient,
+                doctor=self.doctor,
+                date_time=start + timedelta(hours=index),
+                end_time=start + timedelta(hours=index, minutes=30),
+                status='scheduled'
+            )
+            for index in range(count)
+        ])
+
+    def list_as(self, user):
+        request = APIRequestFactory().get('/api/appointments')
+        force_authenticate(request, user=user)
+        return list_appointments(request)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for user in (self.doctor.user, self.patient.user):
+            # Loaded the way StatelessJWTAuthentication loads users
+            user = User.objects.select_related('doctor_profile', 'patient_profile').get(pk=user.pk)
+            Appointment.objects.all().delete()
+            self.book(1)
+            with self.assertNumQueries(1):
+                response = self.list_as(user)
+            self.assertEqual(len(response.data['results']), 1)
+
+            self.book(24)
+            with self.assertNumQueries(1):
+                response = self.list_as(user)
+            self.assertEqual(len(response.data['results']), 25)
+
+    def test_display_fields_come_from_annotations(self):
+        self.book(1)
+        appointment = self.list_as(self.patient.user).data['results'][0]
+        self.assertEqual(appointment['patient_name'], 'Ravi Kumar')
+        self.assertEqual(appointment['doctor_name'], 'Dr. Asha Gill')
+        self.assertEqual(appointment['doctor_specialization'], 'Cardiology')
+
+class SlotCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = DoctorProfile.objects.create(user=User.objects.create_user('doctor'))
+        self.patient = PatientProfile.objects.create(user=User.objects.create_user('patient'))
+        DoctorAvailability.objects.bulk_create([
+            DoctorAvailability(doctor=self.doctor, day_of_week=day, start_time=time(9), end_time=time(17))
+            for day in range(7)
+        ])
+
+    def book_first_free_slot(self):
+        start, end = slots.free_slots(self.doctor.id, limit=1)[0]
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date_time=start, end_time=end, status='scheduled'
+        )
+        return start, end
+
+    def test_invalidation_drops_booked_slot(self):
+        booked = self.book_first_free_slot()
+        slots.invalidate_doctor(self.doctor.id)
+        self.assertNotIn(booked, slots.free_slots(self.doctor.id))
+
+    def test_schedule_read_before_booking_is_not_served_after_it(self):
+        # A reader takes the version and reads the schedule, then a booking
+        # commits and invalidates before the reader writes its entry back
+        version = slots._version(slots._doctor_version_key(self.doctor.id))
+        stale_key = f"{slots._doctor_key(self.doctor.id)}:{version}"
+        stale = slots._build_doctor_entry(self.doctor.id, timezone.localdate())
+        booked = self.book_first_free_slot()
+        slots.invalidate_doctor(self.doctor.id)
+        cache.set(stale_key, stale)
+
+        self.assertIn(booked, stale['free'])
+        self.assertNotIn(booked, slots.free_slots(self.doctor.id))
+
+class SMSOutboxTests(TestCase):
+    def make_worker(self, provider, **kwargs):
+        kwargs.setdefault('rate_per_second', 1000)
+        worker = OutboxWorker(provider=provider, concurrency=2, **kwargs)
+        self.addCleanup(worker.close)
+        return worker
+
+    def make_due(self):
+        SMSOutbox.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_in_batches(self):
+        for index in range(5):
+            enqueue_sms('+911234567890', f'Message {index}')
+        provider = FakeSMSProvider()
+        worker = self.make_worker(provider, batch_size=2)
+
+        self.assertEqual([worker.run_once() for _ in range(4)], [2, 2, 1, 0])
+        self.assertEqual(len(provider.sent), 5)
+        self.assertFalse(SMSOutbox.objects.exclude(status='sent').exists())
+        self.assertEqual(
+            sorted(SMSOutbox.objects.values_list('message_sid', flat=True)),
+            sorted(message['sid'] for message in provider.sent)
+        )
+
+    def test_claimed_messages_are_leased(self):
+        enqueue_sms('+911234567890', 'Hello')
+        worker = self.make_worker(FakeSMSProvider())
+
+        self.assertEqual(len(worker.claim()), 1)
+        self.assertEqual(worker.claim(), [])
+
+    def test_failed_send_backs_off_then_succeeds(self):
+        message = enqueue_sms('+911234567890', 'Hello')
+        provider = FakeSMSProvider(failures=1)
+        worker = self.make_worker(provider, backoff_seconds=30)
+
+        before = timezone.now()
+        worker.run_once()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=24))
+        self.assertEqual(worker.run_once(), 0)
+
+        self.make_due()
+        worker.run_once()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('sent', 2))
+        self.assertEqual(len(provider.sent), 1)
+
+    def test_backoff_doubles_per_attempt(self):
+        worker = self.make_worker(FakeSMSProvider(), backoff_seconds=30)
+        for attempts, base in ((1, 30), (2, 60), (3, 120)):
+            delay = worker._backoff(attempts).total_seconds()
+            self.assertTrue(base * 0.8 <= delay <= base * 1.2, delay)
+
+    def test_gives_up_after_max_attempts(self):
+        message = enqueue_sms('+911234567890', 'Hello')
+        worker = self.make_worker(FakeSMSProvider(failures=10), max_attempts=2)
+
+        worker.run_once()
+        self.make_due()
+        with self.assertLogs('medinexus.sms_outbox', 'ERROR'):
+            worker.run_once()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertEqual(message.last_error, 'Simulated SMS provider failure')
+
+    def test_identical_messages_collapse_within_window(self):
+        first = enqueue_sms('+911234567890', 'Hello')
+        self.assertEqual(enqueue_sms('+911234567890', 'Hello').id, first.id)
+        self.assertNotEqual(enqueue_sms('+911234567890', 'Goodbye').id, first.id)
+
+        # Just after the next window boundary the previous window still counts
+        window = timedelta(seconds=settings.SMS_DEDUPE_WINDOW_SECONDS)
+        with mock.patch('medinexus.sms_outbox.timezone.now', return_value=timezone.now() + window):
+            self.assertEqual(enqueue_sms('+911234567890', 'Hello').id, first.id)
+        with mock.patch('medinexus.sms_outbox.timezone.now', return_value=timezone.now() + 2 * window):
+            self.assertNotEqual(enqueue_sms('+911234567890', 'Hello').id, first.id)
+
+    def test_explicit_key_deduplicates(self):
+        first = enqueue_sms('+911234567890', 'Hello', idempotency_key='reminder:1')
+        again = enqueue_sms('+911234567890', 'Hello again', idempotency_key='reminder:1')
+        self.assertEqual(again.id, first.id)
+        self.assertEqual(SMSOutbox.objects.count(), 1)
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        settings_override = override_settings(
+            MEDIA_ROOT=root,
+            UPLOAD_STAGING_DIR=os.path.join(root, 'uploads'),
+            RECORD_STORAGE_BACKEND='local'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # LocalStorage stands in for Supabase Storage; drop any backend
+        # created for the real MEDIA_ROOT
+        record_storage._backends.clear()
+        self.addCleanup(record_storage._backends.clear)
+
+        self.patient = PatientProfile.objects.create(user=User.objects.create_user('patient'))
+        self.data = os.urandom(2500)
+
+    def open_session(self, data=None, **kwargs):
+        data = self.data if data is None else data
+        return create_session(self.patient, 'scan.pdf', len(data), 'application/pdf', chunk_size=1000, **kwargs)
+
+    def send(self, session, index, data=None):
+        data = self.data if data is None else data
+        chunk = data[index * 1000:(index + 1) * 1000]
+        return write_chunk(session, index, io.BytesIO(chunk), hashlib.sha256(chunk).hexdigest())
+
+    def stored(self, record):
+        with get_record_storage().open(record.file.name) as file:
+            return file.read()
+
+    def test_chunks_assemble_in_any_order(self):
+        session = self.open_session(sha256=hashlib.sha256(self.data).hexdigest())
+        for index in (2, 0, 1):
+            session = self.send(session, index)
+
+        record = complete_session(session)
+        self.assertEqual(self.stored(record), self.data)
+        self.assertFalse(os.path.exists(staging_dir(session)))
+        self.assertEqual(complete_session(session), record)
+
+    def test_bad_chunk_checksum_is_rejected(self):
+        session = self.open_session()
+        with self.assertRaisesMessage(UploadError, 'Chunk checksum does not match'):
+            write_chunk(session, 0, io.BytesIO(self.data[:1000]), hashlib.sha256(b'other').hexdigest())
+
+        session.refresh_from_db()
+        self.assertEqual(session.missing_chunks, [0, 1, 2])
+        self.assertEqual(os.listdir(staging_dir(session)), [])
+
+    def test_bad_file_checksum_is_rejected(self):
+        session = self.open_session(sha256=hashlib.sha256(b'other').hexdigest())
+        for index in range(3):
+            session = self.send(session, index)
+
+        with self.assertRaisesMessage(UploadError, 'File checksum does not match'):
+            complete_session(session)
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'pending')
+        self.assertIsNone(session.record)
+
+    def test_resume_after_missing_chunks(self):
+        session = self.open_session()
+        self.send(session, 0)
+        self.send(session, 2)
+
+        with self.assertRaisesMessage(UploadError, 'Upload is missing chunks'):
+            complete_session(session)
+
+        # A reconnecting client reloads the session and sends what is missing
+        session = UploadSession.objects.get(pk=session.pk)
+        self.assertEqual(session.missing_chunks, [1])
+        self.send(session, 1)
+        self.assertEqual(self.stored(complete_session(session)), self.data)
+
+    def test_known_file_completes_without_chunks(self):
+        session = self.open_session()
+        for index in range(3):
+            session = self.send(session, index)
+        record = complete_session(session)
+
+        again = self.open_session(sha256=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(again.status, 'complete')
+        self.assertEqual(again.record.blob_id, record.blob_id)
+        record.blob.refresh_from_db()
+        self.assertEqual(record.blob.ref_count, 2)
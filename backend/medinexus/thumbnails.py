@@ -0,0 +1,130 @@
+"""
+Background thumbnails for profile pictures and medical record previews
+
+Saving a profile picture or an image record schedules rendering in a
+process pool once the transaction commits; the thumbnail names are stored
+in the model's thumbnails field, together with the source file name they
+were made from. Until they exist, URLs fall back to the original.
+"""
+
+import logging
+import mimetypes
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from . import imaging
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """
+    Get this process's rendering pool, starting it on first use
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers do not inherit the parent's database connections
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def is_current(instance, field):
+    """Whether instance.thumbnails was made from the field's current file"""
+    file = getattr(instance, field)
+    return bool(file) and instance.thumbnails.get('source') == file.name
+
+def is_image(name):
+    return (mimetypes.guess_type(name)[0] or '').startswith('image/')
+
+def thumbnail_name(instance, field, size):
+    if not is_current(instance, field):
+        return None
+    return instance.thumbnails.get(size)
+
+def thumbnail_url(instance, field='profile_picture', size='small'):
+    """
+    URL of a thumbnail, falling back to the original until it is ready
+
+    Returns:
+        str: The URL, or None without a file
+    """
+    file = getattr(instance, field)
+    if not file:
+        return None
+    name = thumbnail_name(instance, field, size)
+    return default_storage.url(name) if name else file.url
+
+def refresh(instance, field, crop=True, images_only=False):
+    """
+    Schedule thumbnails for instance's file unless they are up to date
+
+    Only files on local disk are rendered; with images_only, files that do
+    not look like images (e.g. PDFs) are skipped.
+    """
+    file = getattr(instance, field)
+    if not file:
+        if instance.thumbnails:
+            type(instance).objects.filter(pk=instance.pk).update(thumbnails={})
+        return
+    if is_current(instance, field):
+        return
+    if images_only and not is_image(file.name):
+        return
+
+    try:
+        path = file.path
+    except NotImplementedError:
+        return
+    if not os.path.exists(path):
+        return
+
+    model, pk, source = type(instance), instance.pk, file.name
+    transaction.on_commit(lambda: schedule(model, pk, field, source, path, crop))
+
+def schedule(model, pk, field, source, path, crop=True):
+    """
+    Render thumbnails in the pool and store their names when done
+
+    Returns:
+        Future: Resolves to the thumbnail names once they are stored
+    """
+    stored = Future()
+
+    def on_rendered(rendered):
+        try:
+            stored.set_result(_store(model, pk, field, source, rendered))
+        except Exception as e:
+            logger.exception("Thumbnail rendering failed for %s %s", model.__name__, pk)
+            stored.set_exception(e)
+
+    rendered = get_executor().submit(
+        imaging.render_thumbnails,
+        path,
+        settings.MEDIA_ROOT,
+        settings.THUMBNAIL_SIZES,
+        settings.THUMBNAIL_FORMAT,
+        settings.THUMBNAIL_QUALITY,
+        crop
+    )
+    rendered.add_done_callback(on_rendered)
+    return stored
+
+def _store(model, pk, field, source, rendered):
+    names = rendered.result()
+
+    # Runs on the pool's callback thread, which keeps its own connection;
+    # the source filter skips rows whose file changed while rendering
+    close_old_connections()
+    model.objects.filter(pk=pk, **{field: source}).update(thumbnails={'source': source, **names})
+    return names
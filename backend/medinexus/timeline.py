@@ -0,0 +1,195 @@
+"""
+Patient timeline
+
+Merges a patient's appointments (with their prescriptions), medical records
+and chatbot messages into one newest-first stream. Each source is read with
+its own keyset query of at most one page, already sorted, and the streams
+are combined with a k-way heapq.merge, so a page costs one query per source
+however long the history is.
+
+Pages are cached in the shared cache (see CACHES and check medinexus.E001)
+under a per-patient version token that signals replace whenever one of the
+sources is written, so every worker stops serving the old pages at once. The
+short timeout bounds staleness from writes that bypass signals, such as
+queryset updates.
+"""
+
+import heapq
+import uuid
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+
+from .cursors import InvalidCursor, decode_cursor, encode_cursor
+from .models import Appointment, ChatbotMessage, MedicalRecord
+from .thumbnails import is_image
+
+CACHE_TIMEOUT = getattr(settings, 'TIMELINE_CACHE_TIMEOUT', 60)
+
+APPOINTMENT = 'appointment'
+CHATBOT_MESSAGE = 'chatbot_message'
+RECORD = 'record'
+KINDS = (APPOINTMENT, CHATBOT_MESSAGE, RECORD)
+
+def _version_key(patient_id):
+    return f'timeline:patient:{patient_id}'
+
+def _appointment_entry(appointment):
+    prescription = getattr(appointment, 'prescription', None)
+    return {
+        'id': appointment.id,
+        'date_time': appointment.date_time,
+        'end_time': appointment.end_time,
+        'status': appointment.status,
+        'appointment_type': appointment.appointment_type,
+        'symptoms': appointment.symptoms,
+        'notes': appointment.notes,
+        'doctor': appointment.doctor_id,
+        'doctor_name': f"Dr. {appointment.doctor.user.first_name} {appointment.doctor.user.last_name}",
+        'prescription': {
+            'id': prescription.id,
+            'medications': prescription.medications,
+            'instructions': prescription.instructions,
+            'follow_up_date': prescription.follow_up_date,
+            'created_at': prescription.created_at
+        } if prescription else None
+    }
+
+def _record_entry(record):
+    file_url = reverse('download_record', args=[record.id])
+    return {
+        'id': record.id,
+        'title': record.title,
+        'description': record.description,
+        'record_date': record.record_date,
+        'record_type': record.record_type,
+        'file_url': file_url,
+        # Falls back to the original until the preview has been rendered
+        'preview_url': f"{file_url}?preview=small" if record.file and is_image(record.file.name) else None
+    }
+
+def _chatbot_message_entry(message):
+    return {
+        'id': message.id,
+        'conversation_id': message.conversation.conversation_id,
+        'message_type': message.message_type,
+        'content': message.content
+    }
+
+# kind -> (queryset for a patient, timestamp field, entry builder)
+SOURCES = {
+    APPOINTMENT: (
+        lambda patient_id: Appointment.objects.filter(patient_id=patient_id)
+        .select_related('prescription', 'doctor__user'),
+        'date_time',
+        _appointment_entry
+    ),
+    CHATBOT_MESSAGE: (
+        lambda patient_id: ChatbotMessage.objects.filter(conversation__patient_id=patient_id)
+        .select_related('conversation'),
+        'timestamp',
+        _chatbot_message_entry
+    ),
+    RECORD: (
+        lambda patient_id: MedicalRecord.objects.filter(patient_id=patient_id),
+        'uploaded_at',
+        _record_entry
+    ),
+}
+
+def _before(kind, field, position):
+    """
+    Filter for rows of one source that sort after position in the
+    timeline's (timestamp, kind, id) descending order
+    """
+    timestamp, cursor_kind, cursor_id = position
+    if kind < cursor_kind:
+        return Q(**{f'{field}__lte': timestamp})
+    if kind > cursor_kind:
+        return Q(**{f'{field}__lt': timestamp})
+    return Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': cursor_id})
+
+def _stream(kind, patient_id, position, limit):
+    queryset, field, build = SOURCES[kind]
+    rows = queryset(patient_id).order_by(f'-{field}', '-id')
+    if position is not None:
+        rows = rows.filter(_before(kind, field, position))
+    for row in rows[:limit]:
+        yield (getattr(row, field), kind, row.id), build(row)
+
+def _decode(cursor):
+    timestamp, kind, item_id = decode_cursor(cursor, 3)
+    timestamp = parse_datetime(timestamp) if isinstance(timestamp, str) else None
+    if timestamp is None or kind not in KINDS or not isinstance(item_id, int):
+        raise InvalidCursor(cursor)
+    return timestamp, kind, item_id
+
+def build_page(patient_id, kinds=KINDS, position=None, limit=50):
+    """
+    Read one page of a patient's timeline from the database
+
+    Args:
+        patient_id (int): PatientProfile id
+        kinds: Sources to include
+        position (tuple): Decoded cursor of the previous page, or None
+        limit (int): Page size
+
+    Returns:
+        dict: results (newest first) and next_cursor (or None)
+    """
+    # One extra row from each source tells whether another page exists
+    streams = [_stream(kind, patient_id, position, limit + 1) for kind in kinds]
+    merged = list(islice(heapq.merge(*streams, key=lambda item: item[0], reverse=True), limit + 1))
+
+    next_cursor = None
+    if len(merged) > limit:
+        merged = merged[:limit]
+        timestamp, kind, item_id = merged[-1][0]
+        next_cursor = encode_cursor(timestamp.isoformat(), kind, item_id)
+
+    return {
+        'results': [
+            {'type': kind, 'timestamp': timestamp, 'data': data}
+            for (timestamp, kind, _), data in merged
+        ],
+        'next_cursor': next_cursor
+    }
+
+def patient_timeline(patient_id, kinds=KINDS, cursor=None, limit=50):
+    """
+    Get one page of a patient's timeline, from the cache when possible
+
+    Args:
+        patient_id (int): PatientProfile id
+        kinds: Sources to include
+        cursor (str): Opaque cursor from a previous page, or None
+        limit (int): Page size
+
+    Returns:
+        dict: As build_page
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
+    """
+    position = _decode(cursor) if cursor else None
+
+    version = cache.get(_version_key(patient_id))
+    if version is None:
+        # Publish a version only if no other reader or writer has meanwhile
+        cache.add(_version_key(patient_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+        version = cache.get(_version_key(patient_id))
+
+    key = f"timeline:{patient_id}:{version}:{','.join(kinds)}:{cursor or ''}:{limit}"
+    page = cache.get(key)
+    if page is None:
+        page = build_page(patient_id, kinds, position, limit)
+        cache.set(key, page, CACHE_TIMEOUT)
+    return page
+
+def invalidate_patient(patient_id):
+    """Drop every cached timeline page of a patient"""
+    cache.set(_version_key(patient_id), uuid.uuid4().hex, CACHE_TIMEOUT)
@@ -0,0 +1,68 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.utils.translation import gettext_lazy as _
+
+from .cursors import InvalidCursor
+from .models import Appointment
+from .roles import request_role
+from . import timeline
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _can_view(role, patient_id):
+    """
+    A patient may view their own timeline, a doctor that of any patient
+    they have an appointment with
+    """
+    if role.is_patient:
+        return role.patient.id == patient_id
+    if role.is_doctor:
+        return Appointment.objects.filter(patient_id=patient_id, doctor=role.doctor).exists()
+    return False
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def patient_timeline(request, patient_id):
+    """
+    Get a patient's appointments (with prescriptions), medical records and
+    chatbot messages as one timeline, newest first
+
+    Results are keyset-paginated: pass the returned next_cursor back as
+    ?cursor= to get the following page. ?types= takes a comma-separated
+    subset of appointment, chatbot_message and record.
+    """
+    if not _can_view(request_role(request), patient_id):
+        return Response(
+            {'error': _('Patient not found')},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    kinds = timeline.KINDS
+    types = request.query_params.get('types')
+    if types:
+        requested = set(types.split(','))
+        if not requested <= set(timeline.KINDS):
+            return Response(
+                {'error': _('Invalid timeline types')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        kinds = tuple(kind for kind in timeline.KINDS if kind in requested)
+
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    try:
+        page = timeline.patient_timeline(patient_id, kinds, request.query_params.get('cursor'), limit)
+    except InvalidCursor:
+        return Response(
+            {'error': _('Invalid cursor')},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(page)
@@ -0,0 +1,82 @@
+"""
+Romanization and normalization of Devanagari (Hindi) and Gurmukhi (Punjabi)
+text, so native-script input can be matched against Latin-script data
+"""
+
+import re
+import unicodedata
+
+# Offsets within the Devanagari (U+0900) and Gurmukhi (U+0A00) blocks, which
+# share the same layout for the letters we care about
+_CONSONANTS = {
+    0x15: 'k', 0x16: 'kh', 0x17: 'g', 0x18: 'gh', 0x19: 'n',
+    0x1A: 'ch', 0x1B: 'chh', 0x1C: 'j', 0x1D: 'jh', 0x1E: 'n',
+    0x1F: 't', 0x20: 'th', 0x21: 'd', 0x22: 'dh', 0x23: 'n',
+    0x24: 't', 0x25: 'th', 0x26: 'd', 0x27: 'dh', 0x28: 'n',
+    0x2A: 'p', 0x2B: 'ph', 0x2C: 'b', 0x2D: 'bh', 0x2E: 'm',
+    0x2F: 'y', 0x30: 'r', 0x32: 'l', 0x33: 'l', 0x35: 'v',
+    0x36: 'sh', 0x37: 'sh', 0x38: 's', 0x39: 'h',
+    0x58: 'q', 0x59: 'kh', 0x5A: 'g', 0x5B: 'z', 0x5C: 'r', 0x5D: 'rh', 0x5E: 'f',
+}
+_VOWELS = {
+    0x05: 'a', 0x06: 'a', 0x07: 'i', 0x08: 'i', 0x09: 'u', 0x0A: 'u',
+    0x0B: 'ri', 0x0F: 'e', 0x10: 'ai', 0x13: 'o', 0x14: 'au',
+}
+_VOWEL_SIGNS = {
+    0x3E: 'a', 0x3F: 'i', 0x40: 'i', 0x41: 'u', 0x42: 'u',
+    0x43: 'ri', 0x47: 'e', 0x48: 'ai', 0x4B: 'o', 0x4C: 'au',
+}
+_NASALS = {0x01, 0x02, 0x70}
+_VIRAMA = 0x4D
+_SILENT = {0x3C, 0x71}
+_INDIC_BLOCKS = {0x0900, 0x0A00}
+
+def transliterate(text):
+    """
+    Romanize Devanagari and Gurmukhi text; other characters pass through
+
+    The inherent vowel is written between consonants and dropped at the end
+    of a word, which matches the usual romanization of names (राम -> ram).
+    """
+    out = []
+    pending = False
+
+    for ch in text:
+        codepoint = ord(ch)
+        block = codepoint & 0xFF80
+        if block not in _INDIC_BLOCKS:
+            pending = False
+            out.append(ch)
+            continue
+
+        offset = codepoint & 0x7F
+        if offset in _CONSONANTS:
+            if pending:
+                out.append('a')
+            out.append(_CONSONANTS[offset])
+            pending = True
+        elif offset in _VOWEL_SIGNS:
+            out.append(_VOWEL_SIGNS[offset])
+            pending = False
+        elif offset == _VIRAMA:
+            pending = False
+        elif offset in _SILENT:
+            continue
+        else:
+            if pending:
+                out.append('a')
+            pending = False
+            if offset in _VOWELS:
+                out.append(_VOWELS[offset])
+            elif offset in _NASALS:
+                out.append('n')
+            elif 0x66 <= offset <= 0x6F:
+                out.append(str(offset - 0x66))
+
+    return ''.join(out)
+
+def normalize(text):
+    """Transliterate, strip accents, lowercase and collapse punctuation"""
+    text = unicodedata.normalize('NFKD', transliterate(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
@@ -0,0 +1,117 @@
+"""
+Rule-based symptom triage
+
+A fast keyword screen that answers without the model. It handles red-flag
+symptoms directly and stands in for the model when the inference queue is
+saturated or the model is unavailable. Messages are matched after
+transliteration, so Hindi and Punjabi work in native script and in Latin
+script alike.
+"""
+
+import re
+from dataclasses import dataclass
+
+from .transliteration import normalize
+
+EMERGENCY = 'emergency'
+CONSULT = 'consult'
+GENERAL = 'general'
+
+# Matched against normalize(message): lowercase romanized words
+EMERGENCY_PATTERNS = [
+    r'\bchest pain\b', r'\b(sine|chhati)\b.*\b(dard|darad)\b',
+    r'\b(breath|breathe|breathing|breathless)\b', r'\bsans\b', r'\bsah\b',
+    r'\b(unconscious|fainted|fainting)\b', r'\bbehos?h\b',
+    r'\b(seizure|fits)\b', r'\bdaura\b',
+    r'\b(stroke|paralysis)\b', r'\blakava\b',
+    r'\bsevere bleeding\b', r'\bsuicid',
+]
+CONSULT_PATTERNS = [
+    r'\bfever\b', r'\bbukhar\b', r'\btap\b',
+    r'\bcough\b', r'\bkhansi\b', r'\bkhangh\b',
+    r'\bheadache\b', r'\bsira?dard\b', r'\bsir dara?d\b',
+    r'\bcold\b', r'\bjukam\b', r'\bsore throat\b', r'\bkharash\b',
+    r'\b(stomach|abdominal)\b', r'\bpet dara?d\b',
+    r'\b(vomit|vomiting|diarrhoea|diarrhea)\b', r'\bula?ti\b', r'\bdasa?t\b',
+    r'\bpain\b', r'\bdara?d\b',
+]
+
+_EMERGENCY_RE = re.compile('|'.join(EMERGENCY_PATTERNS))
+_CONSULT_RE = re.compile('|'.join(CONSULT_PATTERNS))
+
+REPLIES = {
+    EMERGENCY: {
+        'en': (
+            "Your symptoms may need urgent care. Please call 108 or go to the "
+            "nearest hospital now. Do not wait for an online appointment."
+        ),
+        'hi': (
+            "आपके लक्षणों में तुरंत इलाज की ज़रूरत हो सकती है। कृपया अभी 108 पर कॉल करें "
+            "या नज़दीकी अस्पताल जाएँ। ऑनलाइन अपॉइंटमेंट का इंतज़ार न करें।"
+        ),
+        'pa': (
+            "ਤੁਹਾਡੇ ਲੱਛਣਾਂ ਨੂੰ ਤੁਰੰਤ ਇਲਾਜ ਦੀ ਲੋੜ ਹੋ ਸਕਦੀ ਹੈ। ਕਿਰਪਾ ਕਰਕੇ ਹੁਣੇ 108 'ਤੇ ਕਾਲ ਕਰੋ "
+            "ਜਾਂ ਨੇੜਲੇ ਹਸਪਤਾਲ ਜਾਓ। ਔਨਲਾਈਨ ਮੁਲਾਕਾਤ ਦੀ ਉਡੀਕ ਨਾ ਕਰੋ।"
+        ),
+    },
+    CONSULT: {
+        'en': (
+            "Thank you for describing your symptoms. Please book an appointment "
+            "with a doctor on MediNexus. If they get worse, seek care immediately."
+        ),
+        'hi': (
+            "अपने लक्षण बताने के लिए धन्यवाद। कृपया MediNexus पर डॉक्टर के साथ अपॉइंटमेंट बुक करें। "
+            "अगर लक्षण बढ़ें तो तुरंत इलाज करवाएँ।"
+        ),
+        'pa': (
+            "ਆਪਣੇ ਲੱਛਣ ਦੱਸਣ ਲਈ ਧੰਨਵਾਦ। ਕਿਰਪਾ ਕਰਕੇ MediNexus 'ਤੇ ਡਾਕਟਰ ਨਾਲ ਮੁਲਾਕਾਤ ਬੁੱਕ ਕਰੋ। "
+            "ਜੇ ਲੱਛਣ ਵਧਣ ਤਾਂ ਤੁਰੰਤ ਇਲਾਜ ਕਰਵਾਓ।"
+        ),
+    },
+    GENERAL: {
+        'en': (
+            "Please tell me more about your symptoms: what you feel, since when, "
+            "and how severe it is."
+        ),
+        'hi': (
+            "कृपया अपने लक्षणों के बारे में और बताएँ: आपको क्या महसूस हो रहा है, कब से, "
+            "और कितना गंभीर है।"
+        ),
+        'pa': (
+            "ਕਿਰਪਾ ਕਰਕੇ ਆਪਣੇ ਲੱਛਣਾਂ ਬਾਰੇ ਹੋਰ ਦੱਸੋ: ਤੁਹਾਨੂੰ ਕੀ ਮਹਿਸੂਸ ਹੋ ਰਿਹਾ ਹੈ, ਕਦੋਂ ਤੋਂ, "
+            "ਅਤੇ ਕਿੰਨਾ ਗੰਭੀਰ ਹੈ।"
+        ),
+    },
+}
+
+@dataclass(frozen=True)
+class Triage:
+    """
+    The outcome of screening one message
+    """
+    level: str
+    reply: str
+
+    @property
+    def is_emergency(self):
+        return self.level == EMERGENCY
+
+def triage_level(message):
+    text = normalize(message)
+    if _EMERGENCY_RE.search(text):
+        return EMERGENCY
+    if _CONSULT_RE.search(text):
+        return CONSULT
+    return GENERAL
+
+def triage(message, language='en'):
+    """
+    Screen a message with keyword rules
+
+    Returns:
+        Triage: The urgency level and a reply in the patient's language
+            (English for unknown languages)
+    """
+    level = triage_level(message)
+    replies = REPLIES[level]
+    return Triage(level=level, reply=replies.get(language, replies['en']))
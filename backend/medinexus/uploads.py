@@ -0,0 +1,221 @@
+"""
+Chunked, resumable uploads of medical record files
+
+A client opens an UploadSession with the file's size, sends the chunks in
+any order (each with its SHA-256), and completes the session once every
+chunk is in. Chunks are streamed from the request to staging files under
+UPLOAD_STAGING_DIR in fixed-size pieces, so memory use does not depend on
+the file size, and a client that loses its connection only resends the
+chunks listed as missing. Completing the session concatenates the chunks,
+stores the result through the record storage backend and creates the
+MedicalRecord.
+
+Files are stored content-addressed (see medinexus.blobs): a file that is
+already stored is not stored again, and a session opened with the SHA-256
+of a file the patient has uploaded before completes immediately, without
+sending any chunks.
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import MedicalRecord, UploadSession
+from . import blobs
+
+# Bytes read from the request or a staging file at a time
+COPY_BUFFER_SIZE = 64 * 1024
+
+class UploadError(Exception):
+    """A chunk or upload was rejected; the message is safe to show"""
+
+def staging_dir(session):
+    return os.path.join(settings.UPLOAD_STAGING_DIR, str(session.id))
+
+def chunk_path(session, index):
+    return os.path.join(staging_dir(session), f"{index:06d}.part")
+
+def _create_record(session, blob):
+    fields = session.record_fields
+    return MedicalRecord.objects.create(
+        patient=session.patient,
+        title=fields.get('title') or session.filename,
+        description=fields.get('description', ''),
+        record_date=fields.get('record_date') or timezone.localdate(),
+        record_type=fields.get('record_type', ''),
+        file=blob.storage_name,
+        blob=blob
+    )
+
+def create_session(patient, filename, total_size, content_type='', sha256='', chunk_size=None, record_fields=None):
+    """
+    Open an upload session
+
+    With the SHA-256 of a file the patient already has on record, the
+    session is created complete, with its record.
+
+    Returns:
+        UploadSession: The new session
+    """
+    chunk_size = min(chunk_size or settings.UPLOAD_CHUNK_SIZE, settings.UPLOAD_MAX_CHUNK_SIZE)
+    if total_size <= 0:
+        raise UploadError('File size must be positive')
+    if total_size > settings.UPLOAD_MAX_FILE_SIZE:
+        raise UploadError('File is too large')
+
+    with transaction.atomic():
+        session = UploadSession.objects.create(
+            patient=patient,
+            filename=get_valid_filename(os.path.basename(filename)) or 'upload',
+            content_type=content_type,
+            total_size=total_size,
+            chunk_size=chunk_size,
+            sha256=sha256.lower(),
+            record_fields=record_fields or {},
+            expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        )
+        blob = blobs.acquire_known(patient, session.sha256, total_size) if session.sha256 else None
+        if blob is not None:
+            session.record = _create_record(session, blob)
+            session.status = 'complete'
+            session.save(update_fields=['status', 'record'])
+    return session
+
+def write_chunk(session, index, stream, checksum):
+    """
+    Stream one chunk from a file-like object to its staging file
+
+    The chunk is hashed while it is written and only replaces an earlier
+    copy once its size and SHA-256 have been verified, so a retried chunk
+    never leaves a partial file behind.
+
+    Raises:
+        UploadError: If the session is closed or the chunk is invalid
+    """
+    if session.status != 'pending' or session.expires_at <= timezone.now():
+        raise UploadError('Upload session is no longer open')
+    if not 0 <= index < session.chunk_count:
+        raise UploadError('Chunk index out of range')
+
+    expected = session.chunk_length(index)
+    target = chunk_path(session, index)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        with open(temp_path, 'wb') as temp:
+            while True:
+                piece = stream.read(min(COPY_BUFFER_SIZE, expected - received + 1))
+                if not piece:
+                    break
+                received += len(piece)
+                if received > expected:
+                    raise UploadError('Chunk is larger than expected')
+                digest.update(piece)
+                temp.write(piece)
+
+        if received != expected:
+            raise UploadError('Chunk is smaller than expected')
+        if digest.hexdigest() != checksum.lower():
+            raise UploadError('Chunk checksum does not match')
+
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Chunks may arrive in parallel; lock the row to merge the checksums
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        locked.chunk_checksums[str(index)] = digest.hexdigest()
+        locked.save(update_fields=['chunk_checksums'])
+    session.chunk_checksums = locked.chunk_checksums
+    return session
+
+def complete_session(session):
+    """
+    Assemble the chunks, store the file and create the MedicalRecord
+
+    The file is assembled and stored outside any transaction; the record is
+    created once it is in storage. Completing an already completed session
+    returns its record.
+
+    Returns:
+        MedicalRecord: The new record
+
+    Raises:
+        UploadError: If chunks are missing or the file checksum does not match
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status == 'complete' and session.record is not None:
+            return session.record
+        if session.status != 'pending':
+            raise UploadError('Upload session is no longer open')
+        if session.missing_chunks:
+            raise UploadError('Upload is missing chunks')
+
+    # A unique name, so concurrent completions do not write the same file
+    assembled = os.path.join(staging_dir(session), f"assembled.{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    with open(assembled, 'wb') as output:
+        for index in range(session.chunk_count):
+            with open(chunk_path(session, index), 'rb') as chunk:
+                while True:
+                    piece = chunk.read(COPY_BUFFER_SIZE)
+                    if not piece:
+                        break
+                    digest.update(piece)
+                    output.write(piece)
+
+    if session.sha256 and digest.hexdigest() != session.sha256:
+        os.remove(assembled)
+        raise UploadError('File checksum does not match')
+
+    blob = blobs.store_file(
+        assembled, digest.hexdigest(), session.total_size, session.content_type, session.filename
+    )
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status == 'complete' and session.record is not None:
+                # A concurrent completion got there first
+                blobs.release(blob.pk)
+                return session.record
+            if session.status != 'pending':
+                raise UploadError('Upload session is no longer open')
+            record = _create_record(session, blob)
+            session.status = 'complete'
+            session.record = record
+            session.save(update_fields=['status', 'record'])
+    except Exception:
+        blobs.release(blob.pk)
+        raise
+
+    shutil.rmtree(staging_dir(session), ignore_errors=True)
+    return record
+
+def expire_sessions(now=None):
+    """
+    Mark pending sessions past their expiry as expired and delete their chunks
+
+    Returns:
+        int: Number of sessions expired
+    """
+    now = now or timezone.now()
+    expired = list(
+        UploadSession.objects.filter(status='pending', expires_at__lte=now).values_list('id', flat=True)
+    )
+    UploadSession.objects.filter(id__in=expired).update(status='expired')
+    for session_id in expired:
+        shutil.rmtree(os.path.join(settings.UPLOAD_STAGING_DIR, str(session_id)), ignore_errors=True)
+    return len(expired)
@@ -1,11 +1,32 @@
 from django.urls import path
-from . import views, auth_views
+from . import views, auth_views, appointment_views, chatbot_views, record_views, timeline_views
 
 urlpatterns = [
     # Authentication endpoints
     path('api/auth/login', auth_views.login_view, name='login'),
     path('api/auth/register', auth_views.register_view, name='register'),
     
+    # Appointment endpoints
+    path('api/appointments', appointment_views.list_appointments, name='list_appointments'),
+    path('api/doctors/search', appointment_views.search_doctors, name='search_doctors'),
+    path('api/doctors/<int:doctor_id>/availability', appointment_views.get_doctor_availability, name='doctor_availability'),
+    path('api/doctors/available-slots', appointment_views.next_available_slots, name='next_available_slots'),
+    
+    # Chatbot endpoints
+    path('api/chatbot/messages', chatbot_views.send_chatbot_message, name='send_chatbot_message'),
+    path('api/chatbot/metrics', chatbot_views.chatbot_metrics, name='chatbot_metrics'),
+    
+    # Medical record endpoints
+    path('api/records/uploads', record_views.create_upload, name='create_upload'),
+    path('api/records/uploads/<uuid:upload_id>', record_views.get_upload, name='get_upload'),
+    path('api/records/uploads/<uuid:upload_id>/chunks/<int:index>', record_views.upload_chunk, name='upload_chunk'),
+    path('api/records/uploads/<uuid:upload_id>/complete', record_views.complete_upload, name='complete_upload'),
+    path('api/records/<int:record_id>/file', record_views.download_record, name='download_record'),
+    path('api/records/<int:record_id>/signed-url', record_views.record_signed_url, name='record_signed_url'),
+    
+    # Patient timeline
+    path('api/patients/<int:patient_id>/timeline', timeline_views.patient_timeline, name='patient_timeline'),
+    
     # Notification endpoints
     path('api/notifications/appointment', views.send_appointment_notification, name='send_appointment_notification'),
     path('api/notifications/prescription', views.send_prescription_notification, name='send_prescription_notification'),
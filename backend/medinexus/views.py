@@ -2,13 +2,20 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
-from .notifications import SMSNotification
+from .sms_outbox import QueuedSMSNotification
+
+def _idempotency_key(request, data):
+    """Client-supplied idempotency key from the header or the body"""
+    return request.headers.get('Idempotency-Key') or data.get('idempotency_key')
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def send_appointment_notification(request):
     """
-    View to send appointment notifications via SMS
+    View to queue appointment notifications via SMS
+
+    Messages are written to the outbox and sent by the SMS worker, so the
+    response is 202 Accepted as soon as the message is queued.
     """
     try:
         data = json.loads(request.body)
@@ -29,7 +36,7 @@ def send_appointment_notification(request):
             }, status=400)
         
         # Initialize SMS notification service
-        sms_service = SMSNotification()
+        sms_service = QueuedSMSNotification(_idempotency_key(request, data))
         
         # Send appropriate notification based on type
         if notification_type == 'confirmation':
@@ -38,7 +45,8 @@ def send_appointment_notification(request):
             )
         elif notification_type == 'reminder':
             result = sms_service.send_appointment_reminder(
-                to_number, patient_name, doctor_name, date, time
+                to_number, patient_name, doctor_name, date, time,
+                data.get('language', 'en')
             )
         else:
             return JsonResponse({
@@ -47,18 +55,11 @@ def send_appointment_notification(request):
             }, status=400)
         
         # Return response
-        if result['status'] == 'success':
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Notification sent successfully',
-                'data': result
-            })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Failed to send notification',
-                'error': result['error']
-            }, status=500)
+        return JsonResponse({
+            'status': 'queued',
+            'message': 'Notification queued',
+            'data': result
+        }, status=202)
             
     except json.JSONDecodeError:
         return JsonResponse({
@@ -75,7 +76,7 @@ def send_appointment_notification(request):
 @require_http_methods(["POST"])
 def send_prescription_notification(request):
     """
-    View to send prescription notifications via SMS
+    View to queue prescription notifications via SMS
     """
     try:
         data = json.loads(request.body)
@@ -92,24 +93,17 @@ def send_prescription_notification(request):
             }, status=400)
         
         # Initialize SMS notification service
-        sms_service = SMSNotification()
+        sms_service = QueuedSMSNotification(_idempotency_key(request, data))
         
-        # Send prescription notification
+        # Queue prescription notification
         result = sms_service.send_prescription_notification(to_number, patient_name)
         
         # Return response
-        if result['status'] == 'success':
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Prescription notification sent successfully',
-                'data': result
-            })
-        else:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Failed to send prescription notification',
-                'error': result['error']
-            }, status=500)
+        return JsonResponse({
+            'status': 'queued',
+            'message': 'Prescription notification queued',
+            'data': result
+        }, status=202)
             
     except json.JSONDecodeError:
         return JsonResponse({
@@ -90,6 +90,10 @@ CREATE TABLE chat_messages (
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Keyset index for paging and polling chat history
+CREATE INDEX IF NOT EXISTS chat_messages_conversation_created_idx
+  ON chat_messages(conversation_id, created_at, id);
+
 -- Video Sessions Table
 CREATE TABLE video_sessions (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -112,7 +116,11 @@ CREATE TABLE notifications (
   type TEXT NOT NULL,
   related_id UUID,
   is_read BOOLEAN DEFAULT FALSE,
-  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+  -- Unread notifications with the same type and related_id are merged into
+  -- one row; count is how many events it stands for
+  count INTEGER NOT NULL DEFAULT 1,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- Row Level Security Policies
@@ -245,7 +253,8 @@ CREATE POLICY "Users can view their own notifications"
 CREATE OR REPLACE FUNCTION handle_new_chat_message()
 RETURNS TRIGGER AS $$
 BEGIN
-  -- Create notification for recipient
+  -- Create notification for recipient, or fold the message into their
+  -- unread notification for this conversation
   INSERT INTO notifications (user_id, title, message, type, related_id)
   SELECT 
     CASE 
@@ -257,7 +266,12 @@ BEGIN
     'chat',
     NEW.conversation_id
   FROM chat_conversations c
-  WHERE c.id = NEW.conversation_id;
+  WHERE c.id = NEW.conversation_id
+  ON CONFLICT (user_id, type, related_id) WHERE NOT is_read AND related_id IS NOT NULL
+  DO UPDATE SET
+    count = notifications.count + 1,
+    message = 'You have received ' || (notifications.count + 1) || ' new messages',
+    updated_at = NOW();
   
   RETURN NEW;
 END;
@@ -298,7 +312,8 @@ CREATE OR REPLACE FUNCTION handle_appointment_update()
 RETURNS TRIGGER AS $$
 BEGIN
   IF OLD.status <> NEW.status THEN
-    -- Create notification for patient
+    -- Create notification for patient, or update their unread one for
+    -- this appointment to the latest status
     INSERT INTO notifications (user_id, title, message, type, related_id)
     VALUES (
       NEW.patient_id,
@@ -306,7 +321,13 @@ BEGIN
       'Your appointment status has been updated to ' || NEW.status,
       'appointment',
       NEW.id
-    );
+    )
+    ON CONFLICT (user_id, type, related_id) WHERE NOT is_read AND related_id IS NOT NULL
+    DO UPDATE SET
+      count = notifications.count + 1,
+      title = EXCLUDED.title,
+      message = EXCLUDED.message,
+      updated_at = NOW();
   END IF;
   
   RETURN NEW;
@@ -329,6 +350,7 @@ CREATE TABLE IF NOT EXISTS notifications (
     link TEXT,
     data JSONB,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     
     CONSTRAINT valid_notification_type CHECK (type IN ('appointment', 'chat', 'alert', 'success', 'info'))
 );
@@ -351,9 +373,127 @@ CREATE POLICY "Users can update their own notifications"
     FOR UPDATE
     USING (auth.uid() = user_id);
 
--- Create index for faster notification queries
-CREATE INDEX IF NOT EXISTS notifications_user_id_idx ON notifications(user_id);
-CREATE INDEX IF NOT EXISTS notifications_created_at_idx ON notifications(created_at);
+-- Coalescing columns, for databases created before they existed
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Merge unread duplicates left from before coalescing, so the unique index
+-- below can be built: the newest row of each group takes the group's total
+-- count and the others are marked read
+WITH ranked AS (
+  SELECT id,
+         SUM(count) OVER grp AS total,
+         ROW_NUMBER() OVER (grp ORDER BY updated_at DESC, id DESC) AS position
+  FROM notifications
+  WHERE NOT is_read AND related_id IS NOT NULL
+  WINDOW grp AS (PARTITION BY user_id, type, related_id)
+),
+merged AS (
+  UPDATE notifications n SET count = r.total
+  FROM ranked r
+  WHERE n.id = r.id AND r.position = 1 AND n.count <> r.total
+)
+UPDATE notifications n SET is_read = TRUE
+FROM ranked r
+WHERE n.id = r.id AND r.position > 1;
+
+-- At most one unread notification per (user, type, related row); the
+-- triggers above upsert against it with ON CONFLICT
+CREATE UNIQUE INDEX IF NOT EXISTS notifications_coalesce_idx
+  ON notifications(user_id, type, related_id)
+  WHERE NOT is_read AND related_id IS NOT NULL;
+
+-- Keyset index for the notification inbox, most recently updated first
+CREATE INDEX IF NOT EXISTS notifications_inbox_idx
+  ON notifications(user_id, updated_at DESC, id DESC);
+
+-- Partial index covering only unread rows, for unread pages and mark-read
+CREATE INDEX IF NOT EXISTS notifications_unread_idx
+  ON notifications(user_id, updated_at DESC, id DESC)
+  WHERE NOT is_read;
+
+-- Per-user unread counter, maintained by trigger so the badge count is a
+-- single-row read
+CREATE TABLE IF NOT EXISTS notification_counters (
+  user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+  unread_count INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE notification_counters ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own notification counter" ON notification_counters;
+CREATE POLICY "Users can view their own notification counter"
+  ON notification_counters FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE OR REPLACE FUNCTION maintain_notification_counter()
+RETURNS TRIGGER AS $$
+DECLARE
+  delta INTEGER := 0;
+  target UUID;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    target := NEW.user_id;
+    IF NOT COALESCE(NEW.is_read, FALSE) THEN delta := 1; END IF;
+  ELSIF TG_OP = 'DELETE' THEN
+    target := OLD.user_id;
+    IF NOT COALESCE(OLD.is_read, FALSE) THEN delta := -1; END IF;
+  ELSE
+    target := NEW.user_id;
+    IF COALESCE(OLD.is_read, FALSE) AND NOT COALESCE(NEW.is_read, FALSE) THEN delta := 1;
+    ELSIF NOT COALESCE(OLD.is_read, FALSE) AND COALESCE(NEW.is_read, FALSE) THEN delta := -1;
+    END IF;
+  END IF;
+
+  IF delta <> 0 THEN
+    INSERT INTO notification_counters (user_id, unread_count)
+    VALUES (target, GREATEST(delta, 0))
+    ON CONFLICT (user_id) DO UPDATE
+      SET unread_count = GREATEST(notification_counters.unread_count + delta, 0);
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS on_notification_change ON notifications;
+CREATE TRIGGER on_notification_change
+  AFTER INSERT OR DELETE OR UPDATE OF is_read ON notifications
+  FOR EACH ROW
+  EXECUTE PROCEDURE maintain_notification_counter();
+
+-- Backfill counters from unread notifications that predate the trigger
+INSERT INTO notification_counters (user_id, unread_count)
+SELECT user_id, COUNT(*) FROM notifications WHERE NOT is_read GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET unread_count = EXCLUDED.unread_count;
+
+-- Announce new chat messages and new or coalesced notifications, including
+-- those written by the triggers above, to the listen_realtime_events
+-- command, which pushes them to connected WebSocket clients. Only the table
+-- and id are sent, keeping payloads far below the NOTIFY size limit.
+CREATE OR REPLACE FUNCTION notify_realtime_event()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM pg_notify(
+    'medinexus_events',
+    json_build_object('table', TG_TABLE_NAME, 'id', NEW.id)::text
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS on_chat_message_realtime ON chat_messages;
+CREATE TRIGGER on_chat_message_realtime
+  AFTER INSERT ON chat_messages
+  FOR EACH ROW
+  EXECUTE PROCEDURE notify_realtime_event();
+
+-- Coalescing upserts update count; marking read does not re-announce
+DROP TRIGGER IF EXISTS on_notification_realtime ON notifications;
+CREATE TRIGGER on_notification_realtime
+  AFTER INSERT OR UPDATE OF count ON notifications
+  FOR EACH ROW
+  EXECUTE PROCEDURE notify_realtime_event();
 
 -- Create storage buckets
 INSERT INTO storage.buckets (id, name, public) VALUES ('medical_records', 'Medical Records', false);